@@ -0,0 +1,53 @@
+"""
+Benchmark: memory used by many same-shape records.
+
+Compares DictRecord, plain dict and ShapedDictRecord (shared key table),
+measured with tracemalloc, plus attribute read time.
+
+Run from the repository root:
+    python bench/ShapedDictRecord_memory_bench.py [record_count]
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from spinward.core.DictRecord import DictRecord                                 # noqa: E402
+from spinward.core.ShapedDictRecord import ShapedDictRecord                     # noqa: E402
+
+KEYS = ('id', 'name', 'price', 'qty', 'active', 'region', 'code', 'note')
+
+
+def make_rows(count):
+    return [(idx, 'name', 0.5, 3, True, 'west', 'C', None) for idx in range(count)]
+
+
+def measure(label, factory, rows, attribute=True):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [factory(zip(KEYS, row)) for row in rows]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    sample = records[:100000]
+    if attribute:
+        read = min(timeit.repeat(lambda: [rec.price for rec in sample], number=1, repeat=3))
+    else:
+        read = min(timeit.repeat(lambda: [rec['price'] for rec in sample], number=1, repeat=3))
+    print("%-18s %10.1f MB  %6.1f bytes/record  read 100k=%.4fs"
+          % (label, used / 1e6, used / len(records), read))
+    return used
+
+
+def main(count):
+    rows = make_rows(count)
+    print("%d records, %d keys each" % (count, len(KEYS)))
+    base = measure('dict', dict, rows, attribute=False)
+    measure('DictRecord', DictRecord, rows)
+    shaped = measure('ShapedDictRecord', ShapedDictRecord, rows)
+    print("ShapedDictRecord saves %.0f%% vs dict" % (100.0 * (base - shaped) / base))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,70 @@
+"""
+Benchmark: transport of DictRecords vs. plain dicts.
+
+Compares pickle size and dumps/loads time for
+- plain dicts
+- DictRecords (pickled individually, via DictRecord.__reduce__)
+- DictRecords packed with record_pickle.dumps_records (shared key table)
+and round-trip time through a process pool.
+
+Run from the repository root:
+    python bench/record_pickle_bench.py [record_count]
+"""
+import os
+import pickle
+import sys
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from spinward.core.DictRecord import DictRecord                                 # noqa: E402
+from spinward.core.record_pickle import dumps_records, loads_records            # noqa: E402
+
+
+def make_dicts(count):
+    return [dict(id=idx, name='name%d' % idx, price=idx * 0.25, active=bool(idx % 2),
+                 addr=dict(street='%d Main St' % idx, zip='%05d' % idx))
+            for idx in range(count)]
+
+
+def identity(data):
+    return data
+
+
+def bench_codec(label, dumps, loads, records, repeat=5):
+    data = dumps(records)
+    t_dumps = min(timeit.repeat(lambda: dumps(records), number=1, repeat=repeat))
+    t_loads = min(timeit.repeat(lambda: loads(data), number=1, repeat=repeat))
+    print("%-28s size=%10d  dumps=%8.4fs  loads=%8.4fs" % (label, len(data), t_dumps, t_loads))
+
+
+def bench_pool(label, dumps, loads, records, chunks=8):
+    size = (len(records) + chunks - 1) // chunks
+    parts = [records[idx:idx + size] for idx in range(0, len(records), size)]
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        list(pool.map(identity, [b''] * 2))     # warm up workers
+        def run():
+            return [loads(data) for data in pool.map(identity, [dumps(part) for part in parts])]
+        elapsed = min(timeit.repeat(run, number=1, repeat=3))
+    print("%-28s pool round trip=%8.4fs" % (label, elapsed))
+
+
+def main(count):
+    dicts = make_dicts(count)
+    records = [DictRecord.from_dict(dct) for dct in dicts]
+    protocol = pickle.HIGHEST_PROTOCOL
+    codecs = [
+        ('plain dicts', lambda recs: pickle.dumps(recs, protocol), pickle.loads, dicts),
+        ('DictRecords (pickle)', lambda recs: pickle.dumps(recs, protocol), pickle.loads, records),
+        ('DictRecords (dumps_records)', dumps_records, loads_records, records),
+    ]
+    print("%d records" % (count,))
+    for label, dumps, loads, recs in codecs:
+        bench_codec(label, dumps, loads, recs)
+    for label, dumps, loads, recs in codecs:
+        bench_pool(label, dumps, loads, recs)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
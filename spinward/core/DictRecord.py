@@ -1,42 +1,75 @@
 """
 Dictionary with dict-style and attribute-style access.
 """
+import copyreg
 import logging
 import sys
-from .dict_util import dict_get_nested, dict_set_nested, dict_update_recursive
+from copy import deepcopy
+from .dict_util import dict_get_nested, dict_set_nested, dict_update_recursive, fingerprint_invalidate
+from .dict_util import _fingerprint_caches
 
 logger = logging.getLogger(__name__)
 
 
-class DictRecord(dict):
+class DictRecordAttributeError(AttributeError, KeyError):
     """
-    Dictionary with dict-style and attribute-style access.
+    Raised for attribute access to a missing DictRecord key.
+    Subclasses both AttributeError (for getattr/hasattr/copy/pickle protocol probing)
+    and KeyError (for backward compatibility).
     """
 
-    def __init__(self, *args, **kwargs):
-        super(DictRecord, self).__init__(*args, **kwargs)
 
+class DictRecord(dict):
+    """
+    Dictionary with dict-style and attribute-style access.
+    """
 
     def __setattr__(self, key, value):
-        super(DictRecord, self).__setitem__(key, value)
+        dict.__setitem__(self, key, value)
+        if _fingerprint_caches:
+            fingerprint_invalidate(self)
 
 
     def __getattr__(self, key):
-        return super(DictRecord, self).__getitem__(key)
+        try:
+            return super(DictRecord, self).__getitem__(key)
+        except KeyError:
+            raise DictRecordAttributeError(key) from None
 
 
     def __repr__(self):
         return "%s(%s)" % (self.__class__.__name__, super(DictRecord, self).__repr__())
 
 
+    def __reduce__(self):
+        # Pickle as NEWOBJ + SETITEMS of the raw contents (no __init__ call, no temporary dict).
+        return (copyreg.__newobj__, (self.__class__,), None, None, iter(dict.items(self)))
+
+
+    def __copy__(self):
+        return self.__class__(self)
+
+
+    def __deepcopy__(self, memo):
+        result = self.__class__()
+        memo[id(self)] = result
+        for key, value in self.items():
+            dict.__setitem__(result, key, deepcopy(value, memo))
+        return result
+
+
     @staticmethod
-    def from_dict(source, normalize=True):
+    def from_dict(source, normalize=True, lazy=False):
         """
         Return a new DictRecord created from a dict.
 
         @param source:      Source dict.
         @param normalize:   If True, make sure all contained dicts are converted, as well.
+        @param lazy:        If True, return a LazyDictRecord, which converts contained dicts
+                            only when they are first accessed (normalize is ignored).
         """
+        if lazy:
+            return LazyDictRecord(source)
         rec = DictRecord(source)
         if normalize:
             rec.normalize()
@@ -101,11 +134,16 @@ class DictRecord(dict):
         """
         Recursively convert all contained dicts to DictRecords.
         """
+        converted = False
         for key, value in self.items():
             if isinstance(value, dict) and not isinstance(value, DictRecord):
                 value = DictRecord(value)
                 value.normalize()
                 self[key] = value
+                converted = True
+        if converted and _fingerprint_caches:
+            # Same contents, but the new children are not yet known to the caches.
+            fingerprint_invalidate(self)
 
 
     def update_recursive(self, source_dict, normalize=True):
@@ -124,23 +162,32 @@ class DictRecord(dict):
     def dump(self, delimiter=':', keys=None, file=sys.stdout):
         """
         dump DictRecord elements to output.
+        Rows are written as they are generated (see `iter_pretty_rows`).
 
         @param delimiter:       Column delimiter
         @param keys:            Top-level keys to include in output
         @param file:            Output destination (default = stdout)
         """
-        print(self.pretty_string_recursive(delimiter, keys), file=file)
+        self.dump_recursive(delimiter, keys, file)
 
 
     def dump_recursive(self, delimiter=':', keys=None, file=sys.stdout):
         """
         dump indented text representation of the DictRecord elements to output.
+        Rows are written as they are generated (see `iter_pretty_rows`).
 
         @param delimiter:       Column delimiter
         @param keys:            Top-level keys to include in output
         @param file:            Output destination (default = stdout)
         """
-        print(self.pretty_string_recursive(delimiter, keys), file=file)
+        write = file.write
+        empty = True
+        for row in self.iter_pretty_rows(delimiter, keys):
+            write(row)
+            write('\n')
+            empty = False
+        if empty:
+            write('\n')
 
 
     def pretty_string(self, delimiter=':', keys=None):
@@ -156,7 +203,7 @@ class DictRecord(dict):
         keys = list(self.keys()) if not keys else list(keys)
         if not keys:
             return ""
-        w1 = max(*[len(str(key)) for key in keys])
+        w1 = max(len(str(key)) for key in keys)
         tmpl = "%%-%ds %s %%r" % (w1, delimiter)
         return '\n'.join([tmpl % (str(key), self[key]) for key in keys])
 
@@ -189,46 +236,164 @@ class DictRecord(dict):
 
         @return string
         """
-        keys = list(self.keys()) if not keys else list(keys)
-        if len(keys) == 0:
-            return ""
-        keys.sort()
-        w1 = max(*[len(str(key)) for key in keys])
-        tmpl = "%s%%-%ds %s %%r" % (indent, w1, delimiter)
-        next_indent_width = len(indent) + w1 + len(delimiter) + 2
-        next_indent = " " * next_indent_width
-
-        rows = []
-        for key in keys:
-            value = self[key]
-            if isinstance(value, dict) and not isinstance(value, DictRecord):
-                value = DictRecord.fromDict(value, recurse=True)
-            if isinstance(value, DictRecord):
-                # Do not pass keys to lower levels of tree
-                sub_rows = value._pretty_string_recursive(delimiter=delimiter, indent=next_indent, return_rows=True)
-                if sub_rows:
-                    rows.append(tmpl.replace('%r', '%s') % (key, sub_rows[0][next_indent_width:]))
-                else:
-                    rows.append(tmpl.replace('%r', '%s') % (key, ""))
-                rows.extend(sub_rows[1:])
-            else:
-                rows.append(tmpl % (key, value))
+        rows = self.iter_pretty_rows(delimiter, keys, indent)
         if return_rows:
-            return rows
+            return list(rows)
         return '\n'.join(rows)
 
 
+    @staticmethod
+    def _pretty_level(level, keys, delimiter, indent):
+        """
+        Return traversal state for one level of iter_pretty_rows:
+        (dict, key iterator, row head template, indent for nested levels, indent width),
+        or None if there are no keys.
+        """
+        keys = sorted(keys)
+        if not keys:
+            return None
+        w1 = max(len(str(key)) for key in keys)
+        head_tmpl = "%s%%-%ds %s " % (indent, w1, delimiter)
+        next_indent = " " * (len(indent) + w1 + len(delimiter) + 2)
+        return (level, iter(keys), head_tmpl, next_indent, len(indent))
+
+
+    def iter_pretty_rows(self, delimiter=':', keys=None, indent=""):
+        """
+        Generate the rows of `pretty_string_recursive` one at a time.
+        The tree is traversed iteratively, so depth is not limited by the recursion limit.
+        Nested plain dicts are formatted like nested DictRecords.
+
+        @param delimiter:       Column delimiter
+        @param keys:            Top-level keys to include in output
+        @param indent:          String by which to indent each row
+
+        @return generator of row strings
+        """
+        frame = self._pretty_level(self, self.keys() if not keys else keys, delimiter, indent)
+        stack = [frame] if frame else []
+        # Head of a row whose value is a nested dict; the nested dict's first row continues it.
+        pending = None
+        while stack:
+            level, key_iter, head_tmpl, next_indent, indent_width = stack[-1]
+            for key in key_iter:
+                value = level[key]
+                head = head_tmpl % (key,)
+                if pending is not None:
+                    head = pending + head[indent_width:]
+                    pending = None
+                if isinstance(value, dict):
+                    # Do not pass keys to lower levels of tree
+                    frame = self._pretty_level(value, value.keys(), delimiter, next_indent)
+                    if frame is None:
+                        yield head
+                    else:
+                        pending = head
+                        stack.append(frame)
+                        break
+                else:
+                    yield head + repr(value)
+            else:
+                stack.pop()
+
+
 class DictRecordRO(DictRecord):
     """
     Read-only DictRecord.
     """
-    def __init__(self, *args, **kwargs):
-        super(DictRecordRO, self).__init__(*args, **kwargs)
-
-
     def __setattr__(self, key, value):
         raise AttributeError("%s is read-only" % (self.__class__.__name__,))
 
 
     def __setitem__(self, key, value):
         raise KeyError("%s is read-only" % (self.__class__.__name__,))
+
+
+    def __reduce__(self):
+        # Items cannot be set after construction, so rebuild from a dict of the contents.
+        return (self.__class__, (dict(self),))
+
+
+class LazyDictRecord(DictRecord):
+    """
+    DictRecord that converts nested dicts to LazyDictRecords only when they are
+    first accessed by attribute or item access (or `get`). The converted
+    record replaces the plain dict in place, so conversion happens once.
+
+    Useful for large payloads of which only a few fields are used.
+    Iteration over `values()`/`items()` returns unconverted nested dicts.
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, dict) and not isinstance(value, DictRecord):
+            value = LazyDictRecord(value)
+            dict.__setitem__(self, key, value)
+            if _fingerprint_caches:
+                # Same contents, but the new child is not yet known to the caches.
+                fingerprint_invalidate(self)
+        return value
+
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise DictRecordAttributeError(key) from None
+
+
+    def get(self, key, default=None):   # pylint: disable=missing-function-docstring
+        return self[key] if key in self else default
+
+
+    def as_dict(self):
+        """
+        Return dict version (copy) of LazyDictRecord.
+        Nested dicts that have not been accessed yet are copied too, so the result
+        shares no dicts with the record (or with the source it was created from).
+
+        @return dict version of LazyDictRecord, with all nested dicts copied.
+        """
+        return self._copy_to_dict(self)
+
+
+    @classmethod
+    def _copy_to_dict(cls, source):
+        """
+        @return copy of dict source, with nested plain dicts and LazyDictRecords copied
+                and other nested DictRecords converted with as_dict.
+        """
+        result = {}
+        for key, val in dict.items(source):
+            if isinstance(val, DictRecord) and not isinstance(val, LazyDictRecord):
+                val = val.as_dict()
+            elif isinstance(val, dict):
+                val = cls._copy_to_dict(val)
+            result[key] = val
+        return result
+
+
+    def normalize(self):
+        """
+        Recursively convert all contained dicts to LazyDictRecords.
+        """
+        converted = False
+        for key, value in self.items():
+            if isinstance(value, dict) and not isinstance(value, DictRecord):
+                value = LazyDictRecord(value)
+                value.normalize()
+                dict.__setitem__(self, key, value)
+                converted = True
+        if converted and _fingerprint_caches:
+            fingerprint_invalidate(self)
+
+
+    def update_recursive(self, source_dict, normalize=True):
+        """
+        Recursively update LazyDictRecord, so that sub-dicts are updated instead of replaced.
+        Nested dicts are converted when accessed, so the tree is not normalized here.
+
+        @param source_dict: dict from which to copy values
+        @param normalize:   Ignored (accepted for DictRecord compatibility).
+        """
+        dict_update_recursive(self, source_dict)
@@ -0,0 +1,391 @@
+"""
+Column-oriented storage for large sets of DictRecords sharing the same keys.
+"""
+from array import array
+from .DictRecord import DictRecord
+from .dict_util import dict_get_nested, dict_set_nested
+
+try:
+    import numpy
+except ImportError:     # pragma: no cover
+    numpy = None
+
+
+def _make_column(values):
+    """
+    Build the most compact column for a list of values.
+
+    Homogeneous int/float (and, with NumPy, bool) columns are stored as typed
+    arrays (NumPy arrays if NumPy is installed, else `array.array`).
+    Anything else is stored as an object array (NumPy) or list.
+
+    @param values:  list of column values
+
+    @return column
+    """
+    types = set(map(type, values))
+    if len(types) == 1:
+        typ = types.pop()
+        try:
+            if typ is int:
+                return numpy.array(values, dtype=numpy.int64) if numpy else array('q', values)
+            if typ is float:
+                return numpy.array(values, dtype=numpy.float64) if numpy else array('d', values)
+            if typ is bool and numpy:
+                return numpy.array(values, dtype=numpy.bool_)
+        except OverflowError:
+            pass
+    return _object_column(values)
+
+
+def _object_column(values):
+    """
+    @return object array (NumPy) or list of values
+    """
+    if numpy:
+        column = numpy.empty(len(values), dtype=object)
+        for idx, value in enumerate(values):
+            column[idx] = value
+        return column
+    return list(values)
+
+
+def _column_to_list(column):
+    """
+    @return column contents as a list of Python values
+    """
+    return column if isinstance(column, list) else column.tolist()
+
+
+class DictRecordBatch(object):
+    """
+    Column-oriented set of records that all have the same (top-level) keys.
+
+    Scalar columns are stored in typed arrays; other columns in object arrays.
+    Rows are available as lightweight DictRecord-compatible views
+    (see DictRecordBatchRow), and whole columns can be operated on directly.
+
+        |   batch = DictRecordBatch.from_records(records)
+        |   batch.column('price') * batch.column('qty')    # vectorized, with NumPy
+        |   batch[0].price
+        |   records = batch.to_records()
+    """
+
+    def __init__(self, columns=None):
+        """
+        @param columns:     dict of key -> column values. All columns must be the same length.
+                            Values are converted to typed/object columns as needed.
+        """
+        self._columns = {}
+        self._length = None
+        for key, values in (columns or {}).items():
+            self.set_column(key, values)
+        if self._length is None:
+            self._length = 0
+
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Return a new DictRecordBatch created from a sequence of dicts/DictRecords.
+        All records must have the same keys (those of the first record).
+
+        @param records:     Sequence of dicts
+
+        @return DictRecordBatch
+        """
+        records = records if isinstance(records, (list, tuple)) else list(records)
+        if not records:
+            return cls()
+        keys = list(records[0].keys())
+        key_set = set(keys)
+        for idx, rec in enumerate(records):
+            if len(rec) != len(keys) or not key_set.issuperset(rec):
+                raise KeyError("Record %d keys %r do not match batch keys %r" % (idx, sorted(rec, key=str), keys))
+        batch = cls()
+        batch._length = len(records)
+        for key in keys:
+            batch._columns[key] = _make_column([rec[key] for rec in records])
+        return batch
+
+
+    def to_records(self, record_class=DictRecord):
+        """
+        Convert batch to a list of records.
+        Nested values (e.g. sub-dicts) are shared with the batch, not copied.
+
+        @param record_class:    Class of records to create (DictRecord, DictRecordRO or dict)
+
+        @return list of records
+        """
+        keys = list(self._columns)
+        columns = [_column_to_list(self._columns[key]) for key in keys]
+        return [record_class(zip(keys, values)) for values in zip(*columns)]
+
+
+    def __len__(self):
+        return self._length
+
+
+    def __iter__(self):
+        return (DictRecordBatchRow(self, idx) for idx in range(self._length))
+
+
+    def __getitem__(self, idx):
+        return self.row(idx)
+
+
+    def __repr__(self):
+        return "%s(%d rows, keys=%r)" % (self.__class__.__name__, self._length, list(self._columns))
+
+
+    def keys(self):
+        """
+        @return list of column keys
+        """
+        return list(self._columns)
+
+
+    def row(self, idx):
+        """
+        @param idx:     Row index (negative indexes count from the end)
+
+        @return DictRecordBatchRow view of the row
+        """
+        if idx < 0:
+            idx += self._length
+        if not 0 <= idx < self._length:
+            raise IndexError("Row index out of range")
+        return DictRecordBatchRow(self, idx)
+
+
+    def column(self, key):
+        """
+        Return the column storage for a key. With NumPy, this is an array that
+        supports vectorized operations; changes to it are reflected in the batch
+        (until a row assignment converts the column, see DictRecordBatchRow).
+
+        @param key:     Column key
+
+        @return column (NumPy array, array.array or list)
+        """
+        return self._columns[key]
+
+
+    def set_column(self, key, values):
+        """
+        Set (or add) a column.
+
+        @param key:     Column key
+        @param values:  Column values; length must match the batch.
+                        NumPy arrays are stored as-is; other sequences are converted.
+        """
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            column = values
+        else:
+            column = _make_column(list(values))
+        if self._length is None:
+            self._length = len(column)
+        elif len(column) != self._length:
+            raise ValueError("Column %r has %d values; batch has %d rows" % (key, len(column), self._length))
+        self._columns[key] = column
+
+
+    def _set_value(self, key, idx, value):
+        """
+        Set one value in a column. A typed column that cannot hold the value exactly
+        (e.g. a float or None in an int column) is converted to an object column first.
+        """
+        column = self._columns[key]
+        if isinstance(column, list) or (numpy is not None and isinstance(column, numpy.ndarray)
+                                        and column.dtype == object):
+            column[idx] = value
+            return
+        if numpy is not None and isinstance(value, numpy.generic):
+            value = value.item()
+        old = column[idx]
+        try:
+            column[idx] = value
+            stored = column[idx]
+            if numpy is not None and isinstance(stored, numpy.generic):
+                stored = stored.item()
+            # NaN is the only value not equal to itself
+            exact = type(stored) is type(value) and (stored == value or (stored != stored and value != value))
+        except (TypeError, ValueError, OverflowError):
+            exact = False
+        if not exact:
+            column[idx] = old
+            column = self._columns[key] = _object_column(_column_to_list(column))
+            column[idx] = value
+
+
+    def map_column(self, key, func, vectorized=True):
+        """
+        Replace a column with the result of applying a function to it.
+
+        @param key:         Column key
+        @param func:        Function to apply
+        @param vectorized:  If True, call func once with the whole column (e.g. a NumPy ufunc).
+                            If False, call func on each value.
+        """
+        column = self._columns[key]
+        if vectorized:
+            self.set_column(key, func(column))
+        else:
+            self.set_column(key, [func(value) for value in _column_to_list(column)])
+
+
+    def take(self, indexes):
+        """
+        @param indexes:     Sequence of row indexes
+
+        @return new DictRecordBatch containing the selected rows
+        """
+        if numpy is not None:
+            indexes = numpy.asarray(indexes, dtype=numpy.intp)
+        else:
+            indexes = list(indexes)
+        batch = self.__class__()
+        batch._length = len(indexes)
+        for key, column in self._columns.items():
+            if numpy is not None and isinstance(column, numpy.ndarray):
+                batch._columns[key] = column[indexes]
+            else:
+                batch._columns[key] = _make_column([column[idx] for idx in indexes])
+        return batch
+
+
+    def filter(self, mask):
+        """
+        @param mask:    Sequence of booleans, one per row (e.g. `batch.column('qty') > 0`)
+
+        @return new DictRecordBatch containing the rows for which mask is true
+        """
+        if len(mask) != self._length:
+            raise ValueError("Mask has %d values; batch has %d rows" % (len(mask), self._length))
+        if numpy is not None:
+            return self.take(numpy.flatnonzero(numpy.asarray(mask)))
+        return self.take([idx for idx, keep in enumerate(mask) if keep])
+
+
+class DictRecordBatchRow(object):
+    """
+    Lightweight view of one row of a DictRecordBatch,
+    with dict-style and attribute-style access like DictRecord.
+    Assignments are written through to the batch columns. A value that a typed
+    column cannot hold exactly (e.g. 2.75 or None in an int column) converts
+    the column to an object column, rather than being truncated.
+    """
+    __slots__ = ('_batch', '_index')
+
+
+    def __init__(self, batch, index):
+        object.__setattr__(self, '_batch', batch)
+        object.__setattr__(self, '_index', index)
+
+
+    def __getitem__(self, key):
+        value = self._batch._columns[key][self._index]
+        if numpy is not None and isinstance(value, numpy.generic):
+            value = value.item()
+        return value
+
+
+    def __setitem__(self, key, value):
+        self._batch._set_value(key, self._index, value)     # pylint: disable=protected-access
+
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+    def __contains__(self, key):
+        return key in self._batch._columns
+
+
+    def __iter__(self):
+        return iter(self._batch._columns)
+
+
+    def __len__(self):
+        return len(self._batch._columns)
+
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, DictRecordBatchRow)):
+            return self.as_dict() == dict(other.items())
+        return NotImplemented
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.as_dict())
+
+
+    def keys(self):     # pylint: disable=missing-function-docstring
+        return self._batch.keys()
+
+
+    def values(self):   # pylint: disable=missing-function-docstring
+        return [self[key] for key in self._batch._columns]
+
+
+    def items(self):    # pylint: disable=missing-function-docstring
+        return [(key, self[key]) for key in self._batch._columns]
+
+
+    def get(self, key, default=None):   # pylint: disable=missing-function-docstring
+        return self[key] if key in self._batch._columns else default
+
+
+    def get_nested(self, keys, default=None):
+        """
+        Return value from nested path within row.
+
+        @param keys:        Nested path keys
+        @param default:     Default value to return if item is not found
+
+        @return value at nested path
+        """
+        return dict_get_nested(self, keys, default)
+
+
+    def set_nested(self, keys, value, extend=True):
+        """
+        Set value at nested path within row. The first key must be an existing column.
+
+        @param keys:        Nested path keys
+        @param value:       Value to set
+        @param extend:      If True, create missing intermediate levels as needed.
+                            If False, raise KeyError if an intermediate level is missing.
+        """
+        return dict_set_nested(self, list(keys), value, extend=extend)
+
+
+    def as_dict(self):
+        """
+        @return dict copy of the row (nested DictRecords also converted to dicts)
+        """
+        return DictRecord(self.items()).as_dict()
+
+
+    def to_record(self, record_class=DictRecord):
+        """
+        @param record_class:    Class of record to create
+
+        @return row as a new record
+        """
+        return record_class(self.items())
+
+
+    def pretty_string(self, delimiter=':', keys=None):
+        """
+        Generate formatted text from the row. See DictRecord.pretty_string.
+        """
+        return self.to_record().pretty_string(delimiter, keys)
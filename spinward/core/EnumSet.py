@@ -0,0 +1,354 @@
+#   EnumSet.py
+"""
+Set of EnumType values, stored as a bitmask.
+"""
+import hashlib
+import weakref
+
+# Equal enumerations (e.g. separately unpickled copies) are interned, so that
+# EnumSets can check for the same enum by identity.
+_interned = weakref.WeakValueDictionary()   # (class, base, names) -> first enum seen with them
+_canonical = weakref.WeakKeyDictionary()    # enum -> weakref to its interned equal
+
+
+def _intern(enum):
+    """
+    @return the interned enum equal to enum
+    """
+    ref = _canonical.get(enum)
+    canonical = ref() if ref is not None else None
+    if canonical is None:
+        # pylint: disable=protected-access
+        canonical = _interned.setdefault((enum.__class__, enum._base, tuple(enum._names)), enum)
+        _canonical[enum] = weakref.ref(canonical)
+    return canonical
+
+
+# Registered enums; EnumSets of these pickle by digest instead of embedding the enum.
+_registry = {}      # digest -> registered (interned) enum
+_digests = {}       # registered enum -> digest
+
+
+def _digest(enum):
+    """
+    @return digest of the class, base and names of enum (the same in every process)
+    """
+    cls = enum.__class__
+    # pylint: disable=protected-access
+    text = repr((cls.__module__, cls.__qualname__, enum._base, tuple(enum._names)))
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def register_enum(enum):
+    """
+    Register an enumeration, so that its EnumSets pickle by reference (a digest of the
+    enumeration's class, base and names) instead of each pickle embedding the whole
+    enumeration. The process that unpickles them must have registered an equal
+    enumeration, e.g. by registering module-level enumerations at import time.
+
+        |   Perm = register_enum(EnumType('READ', 'WRITE', 'ADMIN'))
+
+    @param enum:    EnumType (or LargeEnumType)
+
+    @return the interned enum equal to enum (see EnumSet)
+    """
+    enum = _intern(enum)
+    if enum not in _digests:
+        digest = _digest(enum)
+        _registry[digest] = enum
+        _digests[enum] = digest
+    return enum
+
+
+def _restore(enum, mask):
+    """
+    Unpickle an EnumSet.
+    """
+    return EnumSet._new(_intern(enum), mask)    # pylint: disable=protected-access
+
+
+def _restore_registered(digest, mask):
+    """
+    Unpickle an EnumSet of a registered enum.
+    """
+    enum = _registry.get(digest)
+    if enum is None:
+        raise KeyError("EnumSet enumeration is not registered (see register_enum)")
+    return EnumSet._new(enum, mask)             # pylint: disable=protected-access
+
+
+class EnumSet(object):
+    """
+    Mutable set of the values of one EnumType (e.g. permissions or flags),
+    stored as a single int bitmask: bit N is set if value base + N is a member.
+    Membership, union, intersection and difference are single int operations.
+
+    Members can be given as values or names. Operators require EnumSets of the same
+    enum; equal enums (e.g. unpickled copies) are interned, so `enum` may return an
+    equal enum rather than the one given.
+
+        |   Perm = EnumType('READ', 'WRITE', 'ADMIN')
+        |   perms = EnumSet(Perm, ['READ', 'WRITE'])
+        |   Perm.WRITE in perms, 'ADMIN' in perms
+        |   perms & EnumSet(Perm, [Perm.WRITE, Perm.ADMIN])
+        |   perms.names()       # ['READ', 'WRITE']
+
+    Pickles as (enum, mask); pickling many EnumSets together stores the enum only once.
+    EnumSets of enums registered with `register_enum` pickle as (digest, mask) instead.
+    """
+    __slots__ = ('_enum', '_mask')
+
+
+    def __init__(self, enum, members=()):
+        """
+        @param enum:        EnumType (or LargeEnumType)
+        @param members:     Iterable of values or names
+        """
+        self._enum = _intern(enum)
+        self._mask = 0
+        self.update(members)
+
+
+    @classmethod
+    def from_mask(cls, enum, mask):
+        """
+        Return a new EnumSet of enum with bitmask mask.
+        """
+        if mask < 0 or mask >> len(enum):
+            raise ValueError("Mask 0x%x has bits outside of the enumeration" % (mask,))
+        return cls._new(_intern(enum), mask)
+
+
+    @classmethod
+    def _new(cls, enum, mask):
+        """
+        Return a new EnumSet of an interned enum, without checks.
+        """
+        result = cls.__new__(cls)
+        result._enum = enum
+        result._mask = mask
+        return result
+
+
+    @classmethod
+    def all(cls, enum):
+        """
+        Return a new EnumSet of all values of enum.
+        """
+        return cls.from_mask(enum, (1 << len(enum)) - 1)
+
+
+    @property
+    def enum(self):
+        """
+        EnumType of the members
+        """
+        return self._enum
+
+
+    @property
+    def mask(self):
+        """
+        Membership bitmask
+        """
+        return self._mask
+
+
+    def _bit(self, member):
+        """
+        @return bit of a value or name. Raises AttributeError for unknown names
+                and IndexError for values out of range (as EnumType does).
+        """
+        enum = self._enum
+        value = member if isinstance(member, int) else enum[member]
+        offset = value - enum._base    # pylint: disable=protected-access
+        if offset < 0 or offset >= len(enum):
+            raise IndexError("Enum value %d out of range" % (value,))
+        return 1 << offset
+
+
+    def _check(self, other):
+        """
+        @return True if other is an EnumSet of the same enum
+        """
+        return isinstance(other, EnumSet) and other._enum is self._enum
+
+
+    def __contains__(self, member):
+        try:
+            return bool(self._mask & self._bit(member))
+        except (AttributeError, IndexError, TypeError):
+            return False
+
+
+    def __iter__(self):
+        mask = self._mask
+        base = self._enum._base        # pylint: disable=protected-access
+        while mask:
+            low = mask & -mask
+            yield base + low.bit_length() - 1
+            mask ^= low
+
+
+    def __len__(self):
+        return bin(self._mask).count('1')
+
+
+    def __bool__(self):
+        return self._mask != 0
+
+
+    def __eq__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        return self._mask == other._mask
+
+
+    __hash__ = None
+
+
+    def __le__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        return self._mask & ~other._mask == 0
+
+
+    def __ge__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        return other._mask & ~self._mask == 0
+
+
+    def __or__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        return self._new(self._enum, self._mask | other._mask)
+
+
+    def __and__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        return self._new(self._enum, self._mask & other._mask)
+
+
+    def __sub__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        return self._new(self._enum, self._mask & ~other._mask)
+
+
+    def __xor__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        return self._new(self._enum, self._mask ^ other._mask)
+
+
+    def __ior__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        self._mask |= other._mask
+        return self
+
+
+    def __iand__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        self._mask &= other._mask
+        return self
+
+
+    def __isub__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        self._mask &= ~other._mask
+        return self
+
+
+    def __ixor__(self, other):
+        if not self._check(other):
+            return NotImplemented
+        self._mask ^= other._mask
+        return self
+
+
+    def __reduce__(self):
+        digest = _digests.get(self._enum)
+        if digest is not None:
+            return (_restore_registered, (digest, self._mask))
+        return (_restore, (self._enum, self._mask))
+
+
+    def __copy__(self):
+        return self._new(self._enum, self._mask)
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.names())
+
+
+    def isdisjoint(self, other):
+        """
+        @return True if self and other (EnumSet of the same enum) have no members in common
+        """
+        if not self._check(other):
+            raise TypeError("Expected an EnumSet of the same enum")
+        return not self._mask & other._mask
+
+
+    def add(self, member):
+        """
+        Add a value or name.
+        """
+        self._mask |= self._bit(member)
+
+
+    def discard(self, member):
+        """
+        Remove a value or name, if present.
+        """
+        self._mask &= ~self._bit(member)
+
+
+    def remove(self, member):
+        """
+        Remove a value or name. Raises KeyError if not present.
+        """
+        bit = self._bit(member)
+        if not self._mask & bit:
+            raise KeyError(member)
+        self._mask &= ~bit
+
+
+    def update(self, members):
+        """
+        Add values or names (or the members of an EnumSet of the same enum).
+        """
+        if self._check(members):
+            self._mask |= members._mask
+            return
+        mask = self._mask
+        for member in members:
+            mask |= self._bit(member)
+        self._mask = mask
+
+
+    def clear(self):
+        """
+        Remove all members.
+        """
+        self._mask = 0
+
+
+    def names(self):
+        """
+        @return list of member names, in value order
+        """
+        enum = self._enum
+        return [enum[value] for value in self]
+
+
+    def values(self):
+        """
+        @return list of member values, in order
+        """
+        return list(self)
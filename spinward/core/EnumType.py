@@ -2,6 +2,15 @@
 """
 Enumerated-values class.
 """
+import sys
+from array import array
+from collections.abc import Sequence
+from itertools import repeat
+
+try:
+    import numpy
+except ImportError:     # pragma: no cover
+    numpy = None
 
 
 class EnumType(object):
@@ -21,34 +30,51 @@ class EnumType(object):
         |
         |	mybString = MyEnums[myb]
 
+    Name and value lookups use a hash index. For enumerations with very many
+    names (e.g. code lists), see LargeEnumType.
     """
 
     def __init__(self, *names, **kwargs):
         # Remember names list for reference by index
         self._names = list(names)
         self._base = kwargs.get('base', 0)
+        # Name -> value index
+        self._index = dict((_s, _i + self._base) for _i, _s in enumerate(self._names))
         # Attributes for direct reference
-        for _i, _s in enumerate(self._names):
-            setattr(self, _s, _i + self._base)
+        for _s, _v in self._index.items():
+            setattr(self, _s, _v)
+
+
+    @classmethod
+    def from_names(cls, names, base=0):
+        """
+        Return a new enumeration of the names in an iterable.
+
+        @param names:   Iterable of value names, in value order
+        @param base:    Value of the first name
+        """
+        return cls(*names, base=base)
 
 
     def __contains__(self, key):
         if isinstance(key, int):
             return key >= self._base and key - self._base < len(self._names)
-        return key in self._names
+        try:
+            return key in self._index
+        except TypeError:
+            return False
 
 
     def __iter__(self):
-        it = iter(self._names)  # pylint: disable=invalid-name
-        idx = 0
-        while 1:
-            yield (idx + self._base, it.next())
-            idx += 1
+        return iter(self.items())
 
 
     def __getitem__(self, key):         # pylint: disable=missing-function-docstring
         if isinstance(key, int):
-            return self._names[key - self._base]
+            idx = key - self._base
+            if idx < 0 or idx >= len(self._names):
+                raise IndexError("Enum value %d out of range" % (key,))
+            return self._names[idx]
         return self._name_to_enum(key)
 
 
@@ -64,8 +90,7 @@ class EnumType(object):
         """
         @return ordered list of enumerated (value, name) tuples
         """
-        return [(idx + self._base, self._names[idx])
-                for idx in range(0, len(self._names))]
+        return list(zip(range(self._base, self._base + len(self._names)), self._names))
 
     def names(self):
         """
@@ -78,7 +103,87 @@ class EnumType(object):
         """
         @return ordered list of enumerated values
         """
-        return [self._name_to_enum(name) for name in self._names]
+        return list(range(self._base, self._base + len(self._names)))
+
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Decode table is rebuilt on demand
+        state.pop('_name_table', None)
+        return state
+
+
+    def encode(self, names, unknown=-1, return_mask=False):
+        """
+        Convert a sequence of names to their values in bulk.
+        Unknown names are not an error: they are encoded as `unknown`,
+        and optionally flagged in a mask.
+
+        @param names:       List (or other iterable) or NumPy array of names
+        @param unknown:     Value for unknown names
+        @param return_mask: If True, also return a mask that is True for unknown names.
+
+        @return int64 NumPy array of values (array('q') if NumPy is not installed),
+                or (values, mask) if return_mask is set. The mask is a bool NumPy
+                array (array('B') if NumPy is not installed).
+        """
+        if numpy is not None and isinstance(names, numpy.ndarray):
+            names = names.tolist()
+        # Encode unknown names as base - 1 (never a valid value), so they can be found afterwards.
+        missing = self._base - 1 if return_mask else unknown
+        encoded = map(self._index.get, names, repeat(missing))
+        if numpy is not None:
+            values = numpy.fromiter(encoded, dtype=numpy.int64)
+            if not return_mask:
+                return values
+            mask = values == missing
+            values[mask] = unknown
+            return values, mask
+        values = array('q', encoded)
+        if not return_mask:
+            return values
+        mask = array('B', [value == missing for value in values])
+        return array('q', [unknown if flag else value for value, flag in zip(values, mask)]), mask
+
+
+    def decode(self, values, unknown=None, return_mask=False):
+        """
+        Convert a sequence of values to their names in bulk.
+        Values out of range are not an error: they are decoded as `unknown`,
+        and optionally flagged in a mask.
+
+        @param values:      List (or other iterable), array or NumPy array of int values
+        @param unknown:     Name for values out of range
+        @param return_mask: If True, also return a mask that is True for values out of range.
+
+        @return list of names (object NumPy array if values is a NumPy array),
+                or (names, mask) if return_mask is set. The mask is a bool NumPy
+                array for NumPy input, else a list of bools.
+        """
+        base = self._base
+        count = len(self._names)
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            table = self.__dict__.get('_name_table')
+            if table is None:
+                table = self._name_table = numpy.array(self._names, dtype=object)
+            offsets = values.astype(numpy.int64) - base
+            mask = (offsets < 0) | (offsets >= count)
+            if not count:
+                # Nothing to take from
+                result = numpy.full(len(offsets), unknown, dtype=object)
+            elif mask.any():
+                result = table.take(numpy.where(mask, 0, offsets))
+                result[mask] = unknown
+            else:
+                result = table.take(offsets)
+            return (result, mask) if return_mask else result
+        if return_mask:
+            values = list(values)
+        names = self._names
+        result = [names[value - base] if 0 <= value - base < count else unknown for value in values]
+        if not return_mask:
+            return result
+        return result, [not 0 <= value - base < count for value in values]
 
 
     def _name_to_enum(self, name):
@@ -86,10 +191,110 @@ class EnumType(object):
         @return enumeration value corresponding to names
         """
         try:
-            return getattr(self, name)
-        except ValueError as exc:
-            args = list(exc.args)
-            args.append("Unknown enum value name '%s'" % name)
-            args = tuple(args)
-            exc.args = args
-            raise
+            return self._index[name]
+        except (KeyError, TypeError):
+            raise AttributeError("Unknown enum value name %r" % (name,)) from None
+
+
+class _EnumItems(Sequence):
+    """
+    Immutable (value, name) sequence view of a LargeEnumType.
+    """
+    __slots__ = ('_base', '_names')
+
+
+    def __init__(self, base, names):
+        self._base = base
+        self._names = names
+
+
+    def __len__(self):
+        return len(self._names)
+
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return tuple(zip(range(self._base, self._base + len(self._names))[idx], self._names[idx]))
+        return (range(self._base, self._base + len(self._names))[idx], self._names[idx])
+
+
+    def __iter__(self):
+        return zip(range(self._base, self._base + len(self._names)), self._names)
+
+
+    def __contains__(self, item):
+        try:
+            value, name = item
+            idx = value - self._base
+        except (TypeError, ValueError):
+            return False
+        return 0 <= idx < len(self._names) and self._names[idx] == name
+
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(mine == theirs for mine, theirs in zip(self, other))
+        return NotImplemented
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, list(self))
+
+
+class LargeEnumType(EnumType):
+    """
+    EnumType for enumerations with very many names, e.g. code lists with 10^5+ entries.
+
+    Names are interned and stored in one tuple, with a name -> value hash index.
+    Unlike EnumType, the names are not set as instance attributes; attribute
+    access (`Codes.X`) goes through the index, so names that clash with EnumType
+    methods must be looked up as `Codes['items']`.
+    `names()`, `values()` and `items()` return cached immutable sequences
+    (a tuple, a range and a view), rather than building new lists.
+    Duplicate names raise ValueError.
+
+        |   Codes = LargeEnumType.from_names(line.strip() for line in code_file)
+        |   Codes['X12'], Codes[17], 'X12' in Codes
+    """
+
+    def __init__(self, *names, **kwargs):     # pylint: disable=super-init-not-called
+        self._names = tuple(sys.intern(name) if type(name) is str else name  # pylint: disable=unidiomatic-typecheck
+                            for name in names)
+        self._base = kwargs.get('base', 0)
+        self._index = dict(zip(self._names, range(self._base, self._base + len(self._names))))
+        if len(self._index) != len(self._names):
+            raise ValueError("Duplicate enum value names")
+        self._items = _EnumItems(self._base, self._names)
+
+
+    def __getattr__(self, name):
+        # Only called for names that are not regular attributes.
+        try:
+            return self.__dict__['_index'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+    def items(self):
+        """
+        @return immutable ordered sequence of enumerated (value, name) tuples
+        """
+        return self._items
+
+
+    def names(self):
+        """
+        @return ordered tuple of enumerated value names
+        """
+        return self._names
+
+
+    def values(self):
+        """
+        @return ordered range of enumerated values
+        """
+        return range(self._base, self._base + len(self._names))
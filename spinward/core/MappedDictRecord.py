@@ -0,0 +1,372 @@
+"""
+Compact binary encoding of DictRecord trees, and a read-only record that
+reads directly from an encoded buffer (e.g. a memory-mapped file).
+
+Any number of processes can map the same file and share one page-cached copy;
+opening a file does no parsing, and values are decoded only when accessed.
+
+Encoding (all integers little-endian):
+
+    header:     b'SWDR', u16 version, u16 reserved, u64 root offset
+    nodes:      1-byte tag, then
+                'N' None, 'T' True, 'F' False,
+                'i' int64, 'I' u32 length + signed big integer bytes,
+                'f' float64, 's' u32 length + UTF-8 str, 'b' u32 length + bytes,
+                'l' u32 count + count * u64 item offsets (list or tuple),
+                'm' u32 count + count * (u64 key offset, u64 value offset)
+                    + count * u32 entry index in key-sorted order (dict).
+
+Dict keys must be strings. Identical strings are stored once.
+"""
+import mmap
+import struct
+from collections.abc import Mapping
+from .DictRecord import DictRecord, DictRecordAttributeError, DictRecordRO
+
+_MAGIC = b'SWDR'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHQ')
+_U32 = struct.Struct('<I')
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+_U64 = struct.Struct('<Q')
+_ENTRY = struct.Struct('<QQ')
+
+_NOTHING = object()
+
+
+class _Encoder(object):
+    """
+    Writes nodes to a bytearray, children before parents.
+    """
+
+    def __init__(self):
+        self.out = bytearray(_HEADER.size)
+        self.strings = {}
+
+
+    def encode(self, value):
+        """
+        Encode value, and return the offset of its node.
+        """
+        if isinstance(value, str):
+            offset = self.strings.get(value)
+            if offset is None:
+                data = value.encode('utf-8')
+                offset = self._node(b's', _U32.pack(len(data)), data)
+                self.strings[value] = offset
+            return offset
+        if isinstance(value, dict):
+            entries = []
+            for key, val in value.items():
+                if not isinstance(key, str):
+                    raise TypeError("Cannot encode non-str key %r" % (key,))
+                entries.append((self.encode(key), self.encode(val), key.encode('utf-8')))
+            order = sorted(range(len(entries)), key=lambda idx: entries[idx][2])
+            return self._node(b'm', _U32.pack(len(entries)),
+                              b''.join(_ENTRY.pack(key_off, val_off) for key_off, val_off, _ in entries),
+                              struct.pack('<%dI' % len(order), *order))
+        if isinstance(value, (list, tuple)):
+            offsets = [self.encode(item) for item in value]
+            return self._node(b'l', _U32.pack(len(offsets)), struct.pack('<%dQ' % len(offsets), *offsets))
+        if value is None:
+            return self._node(b'N')
+        if value is True:
+            return self._node(b'T')
+        if value is False:
+            return self._node(b'F')
+        if isinstance(value, int):
+            if -2**63 <= value < 2**63:
+                return self._node(b'i', _I64.pack(value))
+            data = value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+            return self._node(b'I', _U32.pack(len(data)), data)
+        if isinstance(value, float):
+            return self._node(b'f', _F64.pack(value))
+        if isinstance(value, (bytes, bytearray)):
+            return self._node(b'b', _U32.pack(len(value)), bytes(value))
+        raise TypeError("Cannot encode value of type %s" % (type(value).__name__,))
+
+
+    def _node(self, tag, *parts):
+        offset = len(self.out)
+        self.out += tag
+        for part in parts:
+            self.out += part
+        return offset
+
+
+def encode_dict_record(record):
+    """
+    Encode a DictRecord (or dict) tree in the binary format read by MappedDictRecordRO.
+
+    Supported values: None, bool, int, float, str, bytes, list/tuple and dict (with str keys).
+
+    @param record:  DictRecord or dict
+
+    @return bytes
+    """
+    if not isinstance(record, dict):
+        raise TypeError("Root value must be a dict")
+    encoder = _Encoder()
+    root = encoder.encode(record)
+    _HEADER.pack_into(encoder.out, 0, _MAGIC, _VERSION, 0, root)
+    return bytes(encoder.out)
+
+
+def write_dict_record(record, path):
+    """
+    Encode a DictRecord (or dict) tree and write it to a file,
+    for use with `MappedDictRecordRO.open`.
+
+    @param record:  DictRecord or dict
+    @param path:    Output file path
+    """
+    data = encode_dict_record(record)
+    with open(path, 'wb') as out:
+        out.write(data)
+
+
+def _decode(buf, offset):
+    """
+    Decode the node at offset. Dict nodes are returned as MappedDictRecordRO views.
+    """
+    tag = buf[offset:offset + 1]
+    pos = offset + 1
+    if tag == b's':
+        size = _U32.unpack_from(buf, pos)[0]
+        return str(buf[pos + 4:pos + 4 + size], 'utf-8')
+    if tag == b'm':
+        return MappedDictRecordRO(buf, offset)
+    if tag == b'i':
+        return _I64.unpack_from(buf, pos)[0]
+    if tag == b'f':
+        return _F64.unpack_from(buf, pos)[0]
+    if tag == b'N':
+        return None
+    if tag == b'T':
+        return True
+    if tag == b'F':
+        return False
+    if tag == b'l':
+        count = _U32.unpack_from(buf, pos)[0]
+        return tuple(_decode(buf, item) for item in struct.unpack_from('<%dQ' % count, buf, pos + 4))
+    if tag == b'b':
+        size = _U32.unpack_from(buf, pos)[0]
+        return bytes(buf[pos + 4:pos + 4 + size])
+    if tag == b'I':
+        size = _U32.unpack_from(buf, pos)[0]
+        return int.from_bytes(buf[pos + 4:pos + 4 + size], 'little', signed=True)
+    raise ValueError("Invalid node tag %r at offset %d" % (tag, offset))
+
+
+def _to_record_ro(value):
+    """
+    Convert plain dict tree to a DictRecordRO tree.
+    """
+    return DictRecordRO((key, _to_record_ro(val) if isinstance(val, dict) else val)
+                        for key, val in value.items())
+
+
+def _to_plain(value):
+    """
+    Convert decoded value to plain Python (dicts and lists).
+    """
+    if isinstance(value, MappedDictRecordRO):
+        return value.as_dict()
+    if isinstance(value, tuple):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+class MappedDictRecordRO(Mapping):
+    """
+    Read-only DictRecord view of a binary-encoded record (see `encode_dict_record`),
+    read directly from a buffer such as a memory-mapped file.
+
+    Supports the read side of the DictRecordRO API: dict-style and
+    attribute-style access, `get_nested`, `as_dict` and `pretty_string`.
+    Nested dicts are returned as MappedDictRecordRO views, and lists as tuples.
+    Values are decoded on each access; nothing is decoded up front.
+
+        |   write_dict_record(config, 'config.swdr')
+        |   config = MappedDictRecordRO.open('config.swdr')
+        |   config.db.host
+    """
+    __slots__ = ('_buf', '_offset', '_count', '_owner')
+
+
+    def __init__(self, buf, offset=None, owner=None):
+        """
+        @param buf:     Buffer containing the encoding (bytes, mmap, memoryview, ...)
+        @param offset:  Offset of the dict node. Defaults to the root node.
+        @param owner:   Object to keep alive as long as the view (e.g. the mmap)
+        """
+        if offset is None:
+            magic, version, _, offset = _HEADER.unpack_from(buf, 0)
+            if magic != _MAGIC:
+                raise ValueError("Not an encoded DictRecord")
+            if version != _VERSION:
+                raise ValueError("Unsupported encoding version %d" % (version,))
+        if buf[offset:offset + 1] != b'm':
+            raise ValueError("No dict node at offset %d" % (offset,))
+        object.__setattr__(self, '_buf', buf)
+        object.__setattr__(self, '_offset', offset)
+        object.__setattr__(self, '_count', _U32.unpack_from(buf, offset + 1)[0])
+        object.__setattr__(self, '_owner', owner)
+
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-map an encoded file (see `write_dict_record`) and return its root record.
+
+        @param path:    File path
+
+        @return MappedDictRecordRO
+        """
+        with open(path, 'rb') as src:
+            buf = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buf, owner=buf)
+
+
+    def _find(self, key):
+        """
+        @return offset of value node for key, or None
+        """
+        if not isinstance(key, str):
+            return None
+        buf = self._buf
+        target = key.encode('utf-8')
+        entries = self._offset + 5
+        order = entries + self._count * _ENTRY.size
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            idx = _U32.unpack_from(buf, order + 4 * mid)[0]
+            key_off, val_off = _ENTRY.unpack_from(buf, entries + idx * _ENTRY.size)
+            size = _U32.unpack_from(buf, key_off + 1)[0]
+            probe = bytes(buf[key_off + 5:key_off + 5 + size])
+            if probe < target:
+                low = mid + 1
+            elif probe > target:
+                high = mid
+            else:
+                return val_off
+        return None
+
+
+    def _entries(self):
+        """
+        @return iterator of (key offset, value offset) in stored order
+        """
+        return _ENTRY.iter_unpack(self._buf[self._offset + 5:self._offset + 5 + self._count * _ENTRY.size])
+
+
+    def __getitem__(self, key):
+        val_off = self._find(key)
+        if val_off is None:
+            raise KeyError(key)
+        return _decode(self._buf, val_off)
+
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise DictRecordAttributeError(key) from None
+
+
+    def __setattr__(self, key, value):
+        raise AttributeError("%s is read-only" % (self.__class__.__name__,))
+
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+
+    def __iter__(self):
+        buf = self._buf
+        for key_off, _ in self._entries():
+            yield _decode(buf, key_off)
+
+
+    def __len__(self):
+        return self._count
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.as_dict())
+
+
+    def __eq__(self, other):
+        if isinstance(other, MappedDictRecordRO):
+            other = other.as_dict()
+        elif not isinstance(other, Mapping):
+            return NotImplemented
+        return self.as_dict() == dict(other.items())
+
+
+    def __reduce__(self):
+        # The buffer cannot be pickled in general; pickle the decoded contents.
+        return (_to_record_ro, (self.as_dict(),))
+
+
+    def items(self):    # pylint: disable=missing-function-docstring
+        buf = self._buf
+        return [(_decode(buf, key_off), _decode(buf, val_off)) for key_off, val_off in self._entries()]
+
+
+    def values(self):   # pylint: disable=missing-function-docstring
+        buf = self._buf
+        return [_decode(buf, val_off) for _, val_off in self._entries()]
+
+
+    def get_nested(self, keys, default=None):
+        """
+        Return value from nested path within record.
+
+        @param keys:        Nested path keys
+        @param default:     Default value to return if item is not found
+
+        @return value at nested path
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        cur = self
+        for key in keys:
+            if not isinstance(cur, Mapping):
+                return default
+            cur = cur.get(key, _NOTHING)
+            if cur is _NOTHING:
+                return default
+        return cur
+
+
+    def as_dict(self):
+        """
+        @return fully decoded dict copy of the record (lists decoded as lists)
+        """
+        return dict((key, _to_plain(value)) for key, value in self.items())
+
+
+    def to_record(self):
+        """
+        @return fully decoded DictRecordRO copy of the record
+        """
+        return _to_record_ro(self.as_dict())
+
+
+    def pretty_string(self, delimiter=':', keys=None):
+        """
+        Generate formatted text from the record. See DictRecord.pretty_string.
+        """
+        return DictRecord(self.items()).pretty_string(delimiter, keys)
+
+
+    def close(self):
+        """
+        Close the underlying mmap, if this record owns one.
+        Views obtained from the record must not be used afterward.
+        """
+        if self._owner is not None:
+            self._owner.close()
@@ -0,0 +1,268 @@
+"""
+Immutable, persistent DictRecord with cheap copy-on-write updates.
+"""
+from collections.abc import Mapping
+from .DictRecord import DictRecord, DictRecordAttributeError
+
+_NOTHING = object()
+
+
+def _freeze(value):
+    """
+    Convert (nested) dicts to PersistentDictRecords. Other values are unchanged.
+    """
+    if isinstance(value, dict):
+        return PersistentDictRecord(value)
+    return value
+
+
+class PersistentDictRecord(Mapping):
+    """
+    Immutable DictRecord. Updates (`set`, `set_nested`, `update_recursive`, ...)
+    return a new record that shares every unchanged subtree with the original,
+    so only the nodes along modified paths are copied (path copying).
+
+    Nested dicts are converted to PersistentDictRecords on construction.
+    Records are hashable (if their values are), with the hash cached,
+    so they can be used as dict keys, e.g. for memoization.
+
+        |   base = PersistentDictRecord(config)
+        |   tenant = base.set_nested(['db', 'host'], 'tenant-db')
+        |   tenant.limits is base.limits        # unchanged subtree is shared
+    """
+    __slots__ = ('_data', '_hash')
+
+
+    def __init__(self, *args, **kwargs):
+        data = dict(*args, **kwargs)
+        for key, value in data.items():
+            if isinstance(value, dict):
+                data[key] = PersistentDictRecord(value)
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_hash', None)
+
+
+    @classmethod
+    def _from_data(cls, data):
+        """
+        Return a new record wrapping data, which must already be frozen.
+        """
+        rec = cls.__new__(cls)
+        object.__setattr__(rec, '_data', data)
+        object.__setattr__(rec, '_hash', None)
+        return rec
+
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+
+    def __getattr__(self, key):
+        try:
+            return self._data[key]
+        except KeyError:
+            raise DictRecordAttributeError(key) from None
+
+
+    def __setattr__(self, key, value):
+        raise AttributeError("%s is immutable" % (self.__class__.__name__,))
+
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+    def __iter__(self):
+        return iter(self._data)
+
+
+    def __len__(self):
+        return len(self._data)
+
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, '_hash', hash(frozenset(self._data.items())))
+        return self._hash
+
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, PersistentDictRecord):
+            if self._hash is not None and other._hash is not None and self._hash != other._hash:
+                return False
+            return self._data == other._data
+        if isinstance(other, Mapping):
+            return self._data == dict(other.items())
+        return NotImplemented
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self._data)
+
+
+    def __reduce__(self):
+        return (self.__class__._from_data, (self._data,))
+
+
+    def get(self, key, default=None):   # pylint: disable=missing-function-docstring
+        return self._data.get(key, default)
+
+
+    def set(self, key, value):
+        """
+        @param key:     Key to set
+        @param value:   New value (dicts are converted to PersistentDictRecords)
+
+        @return new record with key set to value (self if unchanged)
+        """
+        value = _freeze(value)
+        if self._data.get(key, _NOTHING) is value:
+            return self
+        data = dict(self._data)
+        data[key] = value
+        return self._from_data(data)
+
+
+    def delete(self, key):
+        """
+        @param key:     Key to remove
+
+        @return new record without key
+        """
+        data = dict(self._data)
+        del data[key]
+        return self._from_data(data)
+
+
+    def _walk(self, keys, extend):
+        """
+        Return the list of nodes along the parent path of keys.
+        """
+        nodes = [self]
+        cur = self
+        for idx, key in enumerate(keys[:-1]):
+            child = cur._data.get(key, _NOTHING)
+            if child is _NOTHING:
+                if not extend:
+                    raise KeyError("Item at %s not found" % ('.'.join(map(str, keys[:idx + 1])),))
+                child = _EMPTY
+            elif not isinstance(child, PersistentDictRecord):
+                raise KeyError("Item at %s not a dict" % ('.'.join(map(str, keys[:idx + 1])),))
+            nodes.append(child)
+            cur = child
+        return nodes
+
+
+    @staticmethod
+    def _rebuild(nodes, keys, leaf):
+        """
+        Copy the nodes along a path, bottom-up, replacing each child with its new copy.
+        """
+        for node, key in zip(reversed(nodes[:-1]), reversed(keys[:-1])):
+            leaf = node.set(key, leaf)
+        return leaf
+
+
+    def get_nested(self, keys, default=None):
+        """
+        Return value from nested path within record.
+
+        @param keys:        Nested path keys
+        @param default:     Default value to return if item is not found
+
+        @return value at nested path
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        cur = self
+        for key in keys:
+            if not isinstance(cur, PersistentDictRecord):
+                return default
+            cur = cur._data.get(key, _NOTHING)
+            if cur is _NOTHING:
+                return default
+        return cur
+
+
+    def set_nested(self, keys, value, extend=True):
+        """
+        Return new record with value set at nested path.
+
+        @param keys:        Nested path keys
+        @param value:       Value to set
+        @param extend:      If True, create missing intermediate levels as needed.
+                            If False, raise KeyError if an intermediate level is missing.
+
+        @return new record (self if unchanged)
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        keys = list(keys)
+        nodes = self._walk(keys, extend)
+        return self._rebuild(nodes, keys, nodes[-1].set(keys[-1], value))
+
+
+    def delete_nested(self, keys):
+        """
+        Return new record with the value at nested path removed.
+
+        @param keys:        Nested path keys
+
+        @return new record
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        keys = list(keys)
+        nodes = self._walk(keys, extend=False)
+        return self._rebuild(nodes, keys, nodes[-1].delete(keys[-1]))
+
+
+    def update_recursive(self, source_dict):
+        """
+        Return new record recursively updated from source_dict, so that sub-dicts
+        are updated instead of replaced (same semantics as `dict_update_recursive`).
+        Unchanged subtrees are shared with this record.
+
+        @param source_dict: dict from which to copy values
+
+        @return new record (self if unchanged)
+        """
+        data = None
+        for key, val in source_dict.items():
+            cur = self._data.get(key, _NOTHING)
+            if isinstance(val, Mapping) and isinstance(cur, PersistentDictRecord):
+                new = cur.update_recursive(val)
+            else:
+                new = _freeze(val)
+            if new is not cur:
+                if data is None:
+                    data = dict(self._data)
+                data[key] = new
+        return self if data is None else self._from_data(data)
+
+
+    def as_dict(self):
+        """
+        @return dict copy of the record, with all nested records also converted to dicts.
+        """
+        return dict((key, value.as_dict() if isinstance(value, PersistentDictRecord) else value)
+                    for key, value in self._data.items())
+
+
+    def to_record(self):
+        """
+        @return mutable DictRecord copy of the record
+        """
+        return DictRecord.from_dict(self.as_dict())
+
+
+    def pretty_string(self, delimiter=':', keys=None):
+        """
+        Generate formatted text from the record. See DictRecord.pretty_string.
+        """
+        return DictRecord(self._data).pretty_string(delimiter, keys)
+
+
+_EMPTY = PersistentDictRecord()
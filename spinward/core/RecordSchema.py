@@ -0,0 +1,155 @@
+"""
+Record schemas compiled to specialized validator functions.
+"""
+_NOTHING = object()
+
+_RULE_KEYS = frozenset(['type', 'required', 'nullable', 'min', 'max', 'choices'])
+
+
+def _path(keys):
+    """
+    @return path tuple from a key sequence or dotted string
+    """
+    return tuple(keys.split('.')) if isinstance(keys, str) else tuple(keys)
+
+
+class RecordSchema(object):
+    """
+    Schema of required paths, types and ranges for DictRecords (or nested dicts),
+    compiled once into Python validator functions that contain straight-line
+    checks for each field, with shared path prefixes fetched only once.
+
+    The schema maps nested paths (dotted strings or key tuples) to rules,
+    which are either a type (or tuple of types), or a dict with any of:
+
+        type        Type or tuple of types the value must be an instance of
+        required    If True (default), the path must be present
+        nullable    If True, None is accepted (default False)
+        min, max    Inclusive bounds
+        choices     Collection of allowed values
+
+        |   schema = RecordSchema({
+        |       'id':           int,
+        |       'addr.zip':     dict(type=str, required=False),
+        |       'age':          dict(type=int, min=0, max=150),
+        |   })
+        |   errors = schema.validate(rec)              # [] if valid
+        |   error_lists = schema.validate_many(recs)   # one list per record
+
+    `validate(record)` and `validate_many(records)` are the compiled functions;
+    each error is a string of the form '<dotted path>: <message>'.
+    """
+
+    def __init__(self, fields):
+        """
+        @param fields:  dict of path -> rule (see class description)
+        """
+        self.fields = {}
+        for keys, rule in fields.items():
+            if not isinstance(rule, dict):
+                rule = dict(type=rule)
+            unknown = set(rule) - _RULE_KEYS
+            if unknown:
+                raise ValueError("Unknown schema rule(s) %s for %r" % (sorted(unknown), keys))
+            path = _path(keys)
+            if not path:
+                raise ValueError("Empty schema path")
+            self.fields[path] = rule
+        self.source, namespace = self._generate()
+        exec(compile(self.source, '<RecordSchema>', 'exec'), namespace)     # pylint: disable=exec-used
+        self.validate = namespace['validate']
+        self.validate_many = namespace['validate_many']
+
+
+    def is_valid(self, record):
+        """
+        @return True if record has no validation errors
+        """
+        return not self.validate(record)
+
+
+    def _generate(self):
+        """
+        Generate validator source code.
+
+        @return (source, namespace of constants referenced by source)
+        """
+        namespace = {'_N': _NOTHING, '_dict': dict}
+        consts = {}
+
+        def const(value):
+            # Name of a global holding value (constants are not inlined as literals,
+            # so that any key or bound type works).
+            name = consts.get(id(value))
+            if name is None:
+                name = consts[id(value)] = '_c%d' % (len(consts),)
+                namespace[name] = value
+            return name
+
+        lines = []
+        prefixes = {(): 'record'}
+        for path, rule in self.fields.items():
+            # Fetch each path prefix once, into its own local variable.
+            for depth in range(1, len(path) + 1):
+                prefix = path[:depth]
+                if prefix in prefixes:
+                    continue
+                parent = prefixes[path[:depth - 1]]
+                var = prefixes[prefix] = '_p%d' % (len(prefixes),)
+                lines.append("%s = %s.get(%s, _N) if isinstance(%s, _dict) else _N"
+                             % (var, parent, const(path[depth - 1]), parent))
+            label = '.'.join(map(str, path))
+            var = prefixes[path]
+            lines.append("if %s is _N:" % (var,))
+            if rule.get('required', True):
+                lines.append("    errors.append(%s)" % (const("%s: required" % (label,)),))
+            else:
+                lines.append("    pass")
+            lines.append("elif %s is None:" % (var,))
+            if rule.get('nullable', False):
+                lines.append("    pass")
+            else:
+                lines.append("    errors.append(%s)" % (const("%s: is None" % (label,)),))
+            checks = []
+            if 'type' in rule:
+                checks.append(("not isinstance(%s, %s)" % (var, const(rule['type'])),
+                               "%s %% (type(%s).__name__,)" % (const("%s: wrong type %%s" % (label,)), var)))
+            if 'choices' in rule:
+                checks.append(("%s not in %s" % (var, const(rule['choices'])),
+                               "%s %% (%s,)" % (const("%s: %%r not an allowed value" % (label,)), var)))
+            if 'min' in rule:
+                checks.append(("%s < %s" % (var, const(rule['min'])),
+                               "%s %% (%s,)" % (const("%s: %%r below minimum %r" % (label, rule['min'])), var)))
+            if 'max' in rule:
+                checks.append(("%s > %s" % (var, const(rule['max'])),
+                               "%s %% (%s,)" % (const("%s: %%r above maximum %r" % (label, rule['max'])), var)))
+            if checks:
+                # Checks are chained, so range checks only run on values of the right type.
+                # Values that cannot be compared (or hashed, for choices) are reported,
+                # rather than aborting validation (e.g. of a whole batch).
+                lines.append("else:")
+                lines.append("    try:")
+                for idx, (test, message) in enumerate(checks):
+                    lines.append("        %s %s:" % ('elif' if idx else 'if', test))
+                    lines.append("            errors.append(%s)" % (message,))
+                lines.append("    except TypeError:")
+                lines.append("        errors.append(%s %% (type(%s).__name__,))"
+                             % (const("%s: %%s value not comparable" % (label,)), var))
+
+        body = ''.join("\n    %s" % (line,) for line in lines)
+        batch_body = ''.join("\n        %s" % (line,) for line in lines)
+        source = (
+            "def validate(record):\n"
+            "    errors = []"
+            "%s\n"
+            "    return errors\n"
+            "\n"
+            "def validate_many(records):\n"
+            "    results = []\n"
+            "    for record in records:\n"
+            "        errors = []"
+            "%s\n"
+            "        results.append(errors)\n"
+            "    return results\n"
+        ) % (body, batch_body)
+        return source, namespace
@@ -0,0 +1,353 @@
+"""
+In-memory collection of DictRecords with secondary indexes on nested key paths.
+"""
+import operator
+from bisect import bisect_left, bisect_right, insort
+from .dict_util import dict_get_nested, dict_set_nested
+
+_NOTHING = object()
+
+_HIGH = float('inf')        # sorts after every record id
+
+_COMPARISONS = {
+    '==': operator.eq,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def _path(keys):
+    """
+    @return path tuple from a key sequence or dotted string
+    """
+    return tuple(keys.split('.')) if isinstance(keys, str) else tuple(keys)
+
+
+def _matches(value, op, operand):
+    """
+    @return True if value satisfies (op, operand). Missing values never match.
+    """
+    if value is _NOTHING:
+        return False
+    try:
+        if op in _COMPARISONS:
+            return _COMPARISONS[op](value, operand)
+        if op == 'between':
+            return operand[0] <= value <= operand[1]
+        if op == 'in':
+            return value in operand
+        if op == 'prefix':
+            return isinstance(value, str) and value.startswith(operand)
+    except TypeError:
+        return False
+    raise ValueError("Unknown query operator %r" % (op,))
+
+
+class _HashIndex(object):
+    """
+    value -> set of record ids. Supports equality and 'in' lookups.
+    """
+    OPERATORS = frozenset(['==', 'in'])
+
+
+    def __init__(self):
+        self.entries = {}
+        self.unindexed = set()      # ids of records whose value cannot be hashed (always candidates)
+
+
+    def add(self, rid, value):      # pylint: disable=missing-function-docstring
+        try:
+            self.entries.setdefault(value, set()).add(rid)
+        except TypeError:
+            self.unindexed.add(rid)
+
+
+    def remove(self, rid, value):   # pylint: disable=missing-function-docstring
+        try:
+            ids = self.entries[value]
+        except TypeError:
+            self.unindexed.discard(rid)
+            return
+        ids.discard(rid)
+        if not ids:
+            del self.entries[value]
+
+
+    def lookup(self, op, operand):
+        """
+        @return set of candidate record ids
+        """
+        values = [operand] if op == '==' else operand
+        ids = set(self.unindexed)
+        for value in values:
+            try:
+                ids.update(self.entries.get(value, ()))
+            except TypeError:
+                pass
+        return ids
+
+
+class _SortedIndex(object):
+    """
+    Sorted list of (value, record id). Supports equality, comparison, range and prefix lookups.
+    """
+    OPERATORS = frozenset(['==', '<', '<=', '>', '>=', 'between', 'prefix'])
+
+
+    def __init__(self):
+        self.entries = []
+        self.unindexed = set()      # ids of records whose value cannot be ordered with the others
+
+
+    def add(self, rid, value):      # pylint: disable=missing-function-docstring
+        try:
+            insort(self.entries, (value, rid))
+        except TypeError:
+            self.unindexed.add(rid)
+
+
+    def remove(self, rid, value):   # pylint: disable=missing-function-docstring
+        entries = self.entries
+        try:
+            idx = bisect_left(entries, (value, rid))
+        except TypeError:
+            idx = len(entries)
+        if idx < len(entries) and entries[idx] == (value, rid):
+            del entries[idx]
+        else:
+            self.unindexed.discard(rid)
+
+
+    def lookup(self, op, operand):
+        """
+        @return set of candidate record ids, or None if operand cannot be ordered with the values
+        """
+        if operand is None:
+            # None values are not indexed
+            return None
+        try:
+            ids = self._lookup(op, operand)
+        except TypeError:
+            return None
+        ids.update(self.unindexed)
+        return ids
+
+
+    def _lookup(self, op, operand):
+        entries = self.entries
+        if op == 'prefix':
+            ids = set()
+            for idx in range(bisect_left(entries, (operand,)), len(entries)):
+                value, rid = entries[idx]
+                if not (isinstance(value, str) and value.startswith(operand)):
+                    break
+                ids.add(rid)
+            return ids
+        low, high = 0, len(entries)
+        if op == '==':
+            low, high = bisect_left(entries, (operand,)), bisect_right(entries, (operand, _HIGH))
+        elif op == 'between':
+            low, high = bisect_left(entries, (operand[0],)), bisect_right(entries, (operand[1], _HIGH))
+        elif op == '<':
+            high = bisect_left(entries, (operand,))
+        elif op == '<=':
+            high = bisect_right(entries, (operand, _HIGH))
+        elif op == '>':
+            low = bisect_right(entries, (operand, _HIGH))
+        elif op == '>=':
+            low = bisect_left(entries, (operand,))
+        return set(rid for _, rid in entries[low:high])
+
+
+class RecordStore(object):
+    """
+    Collection of DictRecords (or dicts) with secondary hash and sorted indexes
+    on nested key paths. Indexes are maintained incrementally by `insert`,
+    `update`, `set_nested` and `delete`; records must not be modified directly
+    while in the store, or the indexes will be stale.
+
+    Queries are (path, operator, operand) conditions, all of which must match.
+    Operators: '==', '<', '<=', '>', '>=', 'between' (operand is (low, high), inclusive),
+    'in' (operand is a collection) and 'prefix' (str values).
+    Conditions on indexed paths are answered from the indexes; the rest are
+    checked against the candidate records only.
+
+        |   store = RecordStore(records)
+        |   store.add_index('addr.zip')
+        |   store.add_index('age', sorted=True)
+        |   store.find(('addr.zip', '==', '80301'), ('age', 'between', (20, 29)))
+    """
+
+    def __init__(self, records=None):
+        """
+        @param records:     Initial records
+        """
+        self._records = {}
+        self._indexes = {}      # path tuple -> list of indexes
+        self._next_id = 0
+        for rec in records or ():
+            self.insert(rec)
+
+
+    def __len__(self):
+        return len(self._records)
+
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+
+    def __contains__(self, rid):
+        return rid in self._records
+
+
+    def add_index(self, keys, sorted=False):     # pylint: disable=redefined-builtin
+        """
+        Add an index on a nested path, and index all current records.
+
+        @param keys:        Nested path keys, or dotted string
+        @param sorted:      If True, add a sorted index (equality, comparison, range and prefix queries).
+                            Otherwise add a hash index (equality and 'in' queries).
+                            Values that cannot be hashed (or ordered with the others), and
+                            operands that cannot be ordered with the values, are handled by
+                            checking the records, so an index never changes query results.
+        """
+        path = _path(keys)
+        index = _SortedIndex() if sorted else _HashIndex()
+        for rid, rec in self._records.items():
+            value = dict_get_nested(rec, path, _NOTHING)
+            if value is not _NOTHING and not (sorted and value is None):
+                index.add(rid, value)
+        self._indexes.setdefault(path, []).append(index)
+
+
+    def _index_record(self, rid, rec, add):
+        # Adding is all or nothing: if any index fails, the record is removed from the others.
+        done = []
+        try:
+            for path, indexes in self._indexes.items():
+                value = dict_get_nested(rec, path, _NOTHING)
+                if value is _NOTHING:
+                    continue
+                for index in indexes:
+                    if isinstance(index, _SortedIndex) and value is None:
+                        continue
+                    if add:
+                        index.add(rid, value)
+                        done.append((index, value))
+                    else:
+                        index.remove(rid, value)
+        except Exception:
+            for index, value in done:
+                index.remove(rid, value)
+            raise
+
+
+    def insert(self, rec):
+        """
+        Add a record.
+
+        @param rec:     DictRecord or dict
+
+        @return record id
+        """
+        rid = self._next_id
+        self._next_id += 1
+        self._index_record(rid, rec, add=True)
+        self._records[rid] = rec
+        return rid
+
+
+    def get(self, rid):
+        """
+        @return record with id rid
+        """
+        return self._records[rid]
+
+
+    def update(self, rid, rec):
+        """
+        Replace the record with id rid.
+
+        @param rid:     Record id
+        @param rec:     New record
+        """
+        old = self._records[rid]
+        self._index_record(rid, old, add=False)
+        try:
+            self._index_record(rid, rec, add=True)
+        except Exception:
+            self._index_record(rid, old, add=True)
+            raise
+        self._records[rid] = rec
+
+
+    def set_nested(self, rid, keys, value, extend=True):
+        """
+        Set value at nested path within the record with id rid, updating indexes.
+
+        @param rid:     Record id
+        @param keys:    Nested path keys, or dotted string
+        @param value:   Value to set
+        @param extend:  If True, create missing intermediate levels as needed.
+        """
+        rec = self._records[rid]
+        self._index_record(rid, rec, add=False)
+        try:
+            dict_set_nested(rec, list(_path(keys)), value, extend=extend)
+        finally:
+            self._index_record(rid, rec, add=True)
+
+
+    def delete(self, rid):
+        """
+        Remove the record with id rid.
+
+        @return removed record
+        """
+        rec = self._records.pop(rid)
+        self._index_record(rid, rec, add=False)
+        return rec
+
+
+    def find_ids(self, *conditions):
+        """
+        @param conditions:  (keys, operator, operand) tuples; keys may be a dotted string.
+
+        @return list of ids of records matching all conditions, in id order
+        """
+        candidates = None
+        unindexed = []
+        for keys, op, operand in conditions:
+            path = _path(keys)
+            index = next((index for index in self._indexes.get(path, ()) if op in index.OPERATORS), None)
+            if index is None:
+                unindexed.append((path, op, operand))
+                continue
+            ids = index.lookup(op, operand)
+            if ids is None:
+                # Not answerable from the index (e.g. an operand of another type): scan.
+                unindexed.append((path, op, operand))
+                continue
+            if index.unindexed:
+                unindexed.append((path, op, operand))
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        if candidates is None:
+            candidates = self._records
+        records = self._records
+        return [rid for rid in sorted(candidates)
+                if all(_matches(dict_get_nested(records[rid], path, _NOTHING), op, operand)
+                       for path, op, operand in unindexed)]
+
+
+    def find(self, *conditions):
+        """
+        @param conditions:  (keys, operator, operand) tuples; keys may be a dotted string.
+
+        @return list of records matching all conditions, in insertion order
+        """
+        return [self._records[rid] for rid in self.find_ids(*conditions)]
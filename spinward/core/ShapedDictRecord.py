@@ -0,0 +1,393 @@
+"""
+DictRecord variant for large collections of records with the same keys.
+
+Records with the same keys (in the same order) share one interned
+RecordShape (the key -> slot index table); each record stores only a
+list of values. This avoids one hash table per record.
+"""
+import sys
+import weakref
+from collections import deque
+from collections.abc import Mapping, MutableMapping
+from functools import partial
+from .DictRecord import DictRecord, DictRecordAttributeError
+from .dict_util import dict_update_recursive
+
+_NOTHING = object()
+
+# Number of recently created shapes kept alive even when no record uses them,
+# so that short-lived records do not rebuild their shapes every time.
+SHAPE_CACHE_SIZE = 1024
+
+_recent_shapes = deque(maxlen=SHAPE_CACHE_SIZE)
+
+
+def _drop_transition(transitions, key, ref):
+    """
+    Weak reference callback: forget the transition to a shape that is gone.
+    """
+    if transitions.get(key) is ref:
+        del transitions[key]
+
+
+class RecordShape(object):
+    """
+    Interned, immutable key layout shared by ShapedDictRecords.
+
+    Shapes form a transition tree from the empty shape: adding key K to shape S
+    always yields the same shape object, so records built with the same keys
+    in the same order share one shape.
+
+    Transitions are weak references, and each shape refers to its parent, so a
+    shape (and its prefixes) lives only as long as some record uses it (or it is
+    among the last SHAPE_CACHE_SIZE shapes created); shapes of records with
+    data-dependent keys do not accumulate.
+    """
+    __slots__ = ('keys', 'index', '_parent', '_transitions', '__weakref__')
+
+
+    def __init__(self, keys, parent=None):
+        self.keys = keys
+        self.index = dict((key, idx) for idx, key in enumerate(keys))
+        self._parent = parent       # keeps the path from EMPTY_SHAPE alive
+        self._transitions = {}      # key -> weak reference to the shape with key appended
+
+
+    @classmethod
+    def for_keys(cls, keys):
+        """
+        @param keys:    Sequence of keys
+
+        @return interned shape for keys, in order
+        """
+        shape = EMPTY_SHAPE
+        for key in keys:
+            shape = shape.add(key)
+        return shape
+
+
+    def add(self, key):
+        """
+        @return shape with key appended
+        """
+        ref = self._transitions.get(key)
+        shape = ref() if ref is not None else None
+        if shape is None:
+            shape = RecordShape(self.keys + (key,), self)
+            self._transitions[key] = weakref.ref(shape, partial(_drop_transition, self._transitions, key))
+            _recent_shapes.append(shape)
+        return shape
+
+
+    def remove(self, key):
+        """
+        @return shape with key removed
+        """
+        return self.for_keys([other for other in self.keys if other != key])
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.keys)
+
+
+EMPTY_SHAPE = RecordShape(())
+
+
+class ShapedDictRecord(MutableMapping):
+    """
+    Mapping with dict-style and attribute-style access and the DictRecord API,
+    storing only a list of values per record; the keys live in a RecordShape
+    shared by all records with the same keys.
+
+    Adding or deleting a key moves the record to another (interned) shape.
+    Lookups cost one shared-dict probe plus a list index.
+
+    ShapedDictRecord is a MutableMapping, not a dict subclass: code that tests
+    isinstance(value, dict) or calls dict methods directly does not see it as a
+    dict. The dict_util path helpers (dict_get_nested, dict_set_nested,
+    compile_path, dict_project, ...) and record_pickle accept any Mapping.
+
+        |   rows = [ShapedDictRecord.from_dict(row) for row in reader]
+        |   rows[0].name
+    """
+    __slots__ = ('_shape', '_values')
+
+
+    def __init__(self, *args, **kwargs):
+        data = dict(*args, **kwargs)
+        object.__setattr__(self, '_shape', RecordShape.for_keys(data))
+        object.__setattr__(self, '_values', list(data.values()))
+
+
+    @classmethod
+    def _from_shape(cls, shape, values):
+        """
+        Return a new record with shape and values (no copy).
+        """
+        rec = cls.__new__(cls)
+        object.__setattr__(rec, '_shape', shape)
+        object.__setattr__(rec, '_values', values)
+        return rec
+
+
+    @classmethod
+    def fromkeys(cls, iterable, value=None):    # pylint: disable=missing-function-docstring
+        return cls(dict.fromkeys(iterable, value))
+
+
+    @classmethod
+    def from_dict(cls, source, normalize=True):
+        """
+        Return a new ShapedDictRecord created from a dict.
+
+        @param source:      Source dict.
+        @param normalize:   If True, make sure all contained dicts are converted, as well.
+        """
+        rec = cls(source)
+        if normalize:
+            rec.normalize()
+        return rec
+
+
+    def __getitem__(self, key):
+        idx = self._shape.index.get(key)
+        if idx is None:
+            raise KeyError(key)
+        return self._values[idx]
+
+
+    def __setitem__(self, key, value):
+        idx = self._shape.index.get(key)
+        if idx is None:
+            object.__setattr__(self, '_shape', self._shape.add(key))
+            self._values.append(value)
+        else:
+            self._values[idx] = value
+
+
+    def __delitem__(self, key):
+        idx = self._shape.index.get(key)
+        if idx is None:
+            raise KeyError(key)
+        object.__setattr__(self, '_shape', self._shape.remove(key))
+        del self._values[idx]
+
+
+    def __getattr__(self, key):
+        idx = self._shape.index.get(key)
+        if idx is None:
+            raise DictRecordAttributeError(key)
+        return self._values[idx]
+
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+    def __contains__(self, key):
+        return key in self._shape.index
+
+
+    def __iter__(self):
+        return iter(self._shape.keys)
+
+
+    def __len__(self):
+        return len(self._values)
+
+
+    def __eq__(self, other):
+        if isinstance(other, ShapedDictRecord) and other._shape is self._shape:
+            return self._values == other._values
+        if isinstance(other, Mapping):
+            return dict(zip(self._shape.keys, self._values)) == dict(other.items())
+        return NotImplemented
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, dict(zip(self._shape.keys, self._values)))
+
+
+    def __reduce__(self):
+        return (self.__class__._from_shape_keys, (self._shape.keys, self._values))
+
+
+    @classmethod
+    def _from_shape_keys(cls, keys, values):
+        return cls._from_shape(RecordShape.for_keys(keys), values)
+
+
+    def __copy__(self):
+        return self._from_shape(self._shape, list(self._values))
+
+
+    def copy(self):
+        """
+        @return shallow copy of record (nested records are shared)
+        """
+        return self.__copy__()
+
+
+    def __or__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        rec = self.__copy__()
+        rec.update(other)
+        return rec
+
+
+    def __ror__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        rec = self.__class__(other)
+        rec.update(self)
+        return rec
+
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+
+    def __sizeof__(self):
+        # Shapes are shared, so only the value list is counted.
+        return object.__sizeof__(self) + sys.getsizeof(self._values)
+
+
+    def keys(self):     # pylint: disable=missing-function-docstring
+        return self._shape.keys
+
+
+    def values(self):   # pylint: disable=missing-function-docstring
+        return list(self._values)
+
+
+    def items(self):    # pylint: disable=missing-function-docstring
+        return list(zip(self._shape.keys, self._values))
+
+
+    def get(self, key, default=None):   # pylint: disable=missing-function-docstring
+        idx = self._shape.index.get(key)
+        return default if idx is None else self._values[idx]
+
+
+    def as_dict(self):
+        """
+        Return dict version (copy) of record.
+
+        @return dict version of record, with all nested records also converted to dicts.
+        """
+        return dict((key, value.as_dict() if isinstance(value, (ShapedDictRecord, DictRecord)) else value)
+                    for key, value in zip(self._shape.keys, self._values))
+
+
+    def get_nested(self, keys, default=None):
+        """
+        Return value from nested path within record.
+
+        @param keys:        Nested path keys
+        @param default:     Default value to return if item is not found
+
+        @return value at nested path
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        cur = self
+        for key in keys:
+            if not isinstance(cur, (ShapedDictRecord, dict)):
+                return default
+            cur = cur.get(key, _NOTHING)
+            if cur is _NOTHING:
+                return default
+        return cur
+
+
+    def set_nested(self, keys, value, extend=True):
+        """
+        Set value at nested path within record. Optionally build out parent path.
+
+        @param keys:        Nested path keys
+        @param value:       Value to set
+        @param extend:      If True, create missing intermediate levels as needed.
+                            If False, raise KeyError if an intermediate level is missing.
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        cur = self
+        for idx, key in enumerate(keys[:-1]):
+            child = cur.get(key, _NOTHING)
+            if child is _NOTHING:
+                if not extend:
+                    raise KeyError("Item at %s not found" % ('.'.join(map(str, keys[:idx + 1])),))
+                cur[key] = child = ShapedDictRecord()
+            elif not isinstance(child, (ShapedDictRecord, dict)):
+                raise KeyError("Item at %s not a dict" % ('.'.join(map(str, keys[:idx + 1])),))
+            cur = child
+        cur[keys[-1]] = value
+
+
+    def normalize(self):
+        """
+        Recursively convert all contained dicts to ShapedDictRecords.
+        """
+        values = self._values
+        for idx, value in enumerate(values):
+            if isinstance(value, dict):
+                value = ShapedDictRecord(value)
+                value.normalize()
+                values[idx] = value
+
+
+    def update_recursive(self, source_dict, normalize=True):
+        """
+        Recursively update record, so that sub-dicts are updated instead of replaced.
+
+        @param source_dict: dict from which to copy values
+        @param normalize:   If True, normalize the record (see `normalize` method).
+        """
+        for key, val in source_dict.items():
+            cur = self.get(key, _NOTHING)
+            if isinstance(val, (dict, ShapedDictRecord)) and isinstance(cur, (dict, ShapedDictRecord)):
+                if isinstance(cur, ShapedDictRecord):
+                    cur.update_recursive(val, normalize=normalize)
+                else:
+                    dict_update_recursive(cur, val)
+            else:
+                self[key] = val
+        if normalize:
+            self.normalize()
+
+
+    def pretty_string(self, delimiter=':', keys=None):
+        """
+        Generate formatted text from the record. See DictRecord.pretty_string.
+        """
+        return DictRecord(self.items()).pretty_string(delimiter, keys)
+
+
+    def pretty_string_recursive(self, delimiter=':', keys=None, return_rows=False):
+        """
+        Generate indented text from the record. See DictRecord.pretty_string_recursive.
+        """
+        return DictRecord.from_dict(self.as_dict()).pretty_string_recursive(delimiter, keys, return_rows)
+
+
+    def iter_pretty_rows(self, delimiter=':', keys=None, indent=""):
+        """
+        Generate the rows of `pretty_string_recursive` one at a time. See DictRecord.iter_pretty_rows.
+        """
+        return DictRecord(self.as_dict()).iter_pretty_rows(delimiter, keys, indent)
+
+
+    def dump(self, delimiter=':', keys=None, file=sys.stdout):
+        """
+        dump record elements to output. See DictRecord.dump.
+        """
+        self.dump_recursive(delimiter, keys, file)
+
+
+    def dump_recursive(self, delimiter=':', keys=None, file=sys.stdout):
+        """
+        dump indented text representation of the record elements to output. See DictRecord.dump_recursive.
+        """
+        DictRecord(self.as_dict()).dump_recursive(delimiter, keys, file)
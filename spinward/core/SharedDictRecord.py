@@ -0,0 +1,114 @@
+"""
+Read-only DictRecords published in shared memory for multiprocessing workers.
+
+The record tree is binary-encoded (see MappedDictRecord) into a
+`multiprocessing.shared_memory` block once. Other processes attach to the
+block by name and read values in place, decoding only what they access.
+"""
+from multiprocessing import resource_tracker, shared_memory
+from .MappedDictRecord import MappedDictRecordRO, encode_dict_record
+
+# Blocks attached by this process, by name, so repeated attaches
+# (e.g. one per task unpickled in a pool worker) share one mapping.
+_attached = {}
+
+# Names of blocks published by this process (or by the parent of a forked process).
+_published = set()
+
+
+def _open_shared_memory(name):
+    """
+    Attach to an existing shared memory block without leaving it registered with
+    the resource tracker, so that the attaching process does not unlink the
+    block when it exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:       # Python < 3.13 has no track parameter
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    if name not in _published:
+        # The publisher's own registration (shared with forked children) must stay.
+        resource_tracker.unregister(shm._name, 'shared_memory')    # pylint: disable=protected-access
+    return shm
+
+
+class SharedDictRecordRO(MappedDictRecordRO):
+    """
+    Read-only DictRecord stored in a shared memory block.
+
+    The publishing process creates the block with `publish`, and is
+    responsible for calling `unlink` when the record is no longer needed.
+    Other processes call `attach` with the block's `name`.
+    Pickling a SharedDictRecordRO pickles only the block name, so sending
+    one to pool workers is cheap; workers attach on unpickling.
+
+        |   shared = SharedDictRecordRO.publish(lookup_tables)
+        |   with ProcessPoolExecutor() as pool:
+        |       pool.map(work, [shared] * n)      # work() reads shared.zip_codes['80301']
+        |   shared.unlink()
+    """
+    __slots__ = ()
+
+
+    @classmethod
+    def publish(cls, record, name=None):
+        """
+        Encode a DictRecord (or dict) tree into a new shared memory block.
+
+        @param record:  DictRecord or dict
+        @param name:    Block name. Defaults to a generated unique name.
+
+        @return SharedDictRecordRO for the new block
+        """
+        data = encode_dict_record(record)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+        shm.buf[:len(data)] = data
+        _published.add(shm.name)
+        return cls(shm.buf, owner=shm)
+
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attach to a record published (by any process) with `publish`.
+
+        @param name:    Block name (the publisher's `name`)
+
+        @return SharedDictRecordRO
+        """
+        shm = _attached.get(name)
+        if shm is None:
+            shm = _attached[name] = _open_shared_memory(name)
+        return cls(shm.buf, owner=shm)
+
+
+    @property
+    def name(self):
+        """
+        @return name of the shared memory block
+        """
+        return self._owner.name
+
+
+    def __reduce__(self):
+        return (self.__class__.attach, (self.name,))
+
+
+    def close(self):
+        """
+        Detach this process from the shared memory block.
+        Records obtained from the block must not be used afterward.
+        """
+        if _attached.get(self.name) is self._owner:
+            del _attached[self.name]
+        self._owner.close()
+
+
+    def unlink(self):
+        """
+        Close and destroy the shared memory block (publisher only).
+        """
+        self.close()
+        self._owner.unlink()
+        _published.discard(self.name)
@@ -0,0 +1,291 @@
+"""
+Schema-generated record classes with `__slots__` storage.
+
+A lighter-weight alternative to DictRecord for fixed-shape records.
+"""
+import copyreg
+import keyword
+import sys
+from .dict_util import dict_set_nested
+
+_NOTHING = object()
+
+
+def _new_nested_record(root, path):
+    """
+    Unpickle helper: create an empty record of the nested class at path (field names) of root.
+    """
+    cls = root
+    for field in path:
+        cls = cls._nested[field]      # pylint: disable=protected-access
+    return cls.__new__(cls)
+
+
+class SlotRecord(object):
+    """
+    Base class for record classes generated by `make_slot_record`.
+
+    Provides the DictRecord-style API (`get_nested`, `set_nested`, `as_dict`,
+    `pretty_string`) on top of the generated `__slots__` fields.
+    Subclasses define `_fields` (tuple of field names) and `_nested`
+    (dict of field name -> nested SlotRecord class). Nested classes are not
+    bound in any module, so they refer to the top-level class (`_root`) and
+    their field path below it (`_root_path`) for pickling.
+    """
+    __slots__ = ()
+
+    _fields = ()
+    _nested = {}
+    _root = None
+    _root_path = ()
+
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__,
+                           ", ".join("%s=%r" % (name, getattr(self, name)) for name in self._fields))
+
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+    def __setitem__(self, key, value):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+
+    def __contains__(self, key):
+        return key in self._fields
+
+
+    def __iter__(self):
+        return iter(self._fields)
+
+
+    def __len__(self):
+        return len(self._fields)
+
+
+    def __reduce__(self):
+        cls = self.__class__
+        if cls._root is None:
+            return (copyreg.__newobj__, (cls,), self.__getstate__())
+        return (_new_nested_record, (cls._root, cls._root_path), self.__getstate__())
+
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self._fields)
+
+
+    def __setstate__(self, state):
+        for name, value in zip(self._fields, state):
+            setattr(self, name, value)
+
+
+    def keys(self):
+        """
+        @return tuple of field names
+        """
+        return self._fields
+
+
+    def get_nested(self, keys, default=None):
+        """
+        Return value from nested path within record.
+        Nested SlotRecords and plain dicts are both traversed.
+
+        @param keys:        Nested path keys
+        @param default:     Default value to return if item is not found
+
+        @return value at nested path
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        cur = self
+        for key in keys:
+            if isinstance(cur, SlotRecord):
+                cur = getattr(cur, key, _NOTHING) if key in cur._fields else _NOTHING
+            elif isinstance(cur, dict):
+                cur = cur.get(key, _NOTHING)
+            else:
+                return default
+            if cur is _NOTHING:
+                return default
+        return cur
+
+
+    def set_nested(self, keys, value, extend=True):
+        """
+        Set value at nested path within record.
+
+        @param keys:        Nested path keys
+        @param value:       Value to set
+        @param extend:      If True, create missing intermediate levels as needed.
+                            If False, raise KeyError if an intermediate level is missing.
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        keys = list(keys)
+        cur = self
+        for idx, key in enumerate(keys[:-1]):
+            if not isinstance(cur, SlotRecord):
+                break
+            if key not in cur._fields:
+                raise KeyError("Item at %s not found" % ('.'.join(map(str, keys[:idx + 1])),))
+            child = getattr(cur, key)
+            if child is None:
+                if not extend:
+                    raise KeyError("Item at %s not found" % ('.'.join(map(str, keys[:idx + 1])),))
+                nested_cls = cur._nested.get(key)
+                child = nested_cls() if nested_cls is not None else {}
+                setattr(cur, key, child)
+            elif not isinstance(child, (SlotRecord, dict)):
+                raise KeyError("Item at %s not a dict" % ('.'.join(map(str, keys[:idx + 1])),))
+            cur = child
+        else:
+            idx = len(keys) - 1
+        if isinstance(cur, SlotRecord):
+            cur[keys[-1]] = value
+        else:
+            dict_set_nested(cur, keys[idx:], value, extend=extend)
+
+
+    def pretty_string(self, delimiter=':', keys=None):
+        """
+        Generate formatted text from the record.
+        Format is `<key> <delimiter> <value>` for each field in record.
+
+        @param delimiter:   Column delimiter
+        @param keys:        Keys to include in output. Defaults to all fields.
+
+        @return a string
+        """
+        keys = list(self._fields) if not keys else list(keys)
+        if not keys:
+            return ""
+        w1 = max(len(str(key)) for key in keys)
+        tmpl = "%%-%ds %s %%r" % (w1, delimiter)
+        return '\n'.join([tmpl % (str(key), self[key]) for key in keys])
+
+
+# Names that fields cannot have: SlotRecord API and generated class attributes,
+# and the argument name of the generated __init__.
+_RESERVED_NAMES = frozenset(dir(SlotRecord)) | frozenset(['from_dict', 'as_dict', '_fields', '_nested', 'self'])
+
+
+def make_slot_record(name, schema, module=None):
+    """
+    Generate a SlotRecord subclass from a field schema.
+
+    The schema is either a sequence of field names, or a dict mapping
+    field names to None (plain field) or to a nested schema, in which case
+    a nested SlotRecord class is generated for that field.
+
+    The generated class has `__init__`, `from_dict` and `as_dict` methods
+    compiled specifically for its fields.
+
+        |   Point = make_slot_record('Point', {'x': None, 'y': None, 'meta': ['tag']})
+        |   pt = Point.from_dict({'x': 1, 'y': 2, 'meta': {'tag': 'a'}})
+        |   pt.meta.tag
+
+    @param name:        Class name
+    @param schema:      Sequence of field names, or dict of field name -> nested schema
+    @param module:      `__module__` for the generated class (defaults to the caller's
+                        module, so instances can be pickled if the class is module-level).
+
+    Raises ValueError for invalid class or field names; field names cannot be
+    keywords or the names of SlotRecord methods and attributes (e.g. keys, as_dict).
+
+    @return new SlotRecord subclass
+    """
+    if module is None:
+        try:
+            module = sys._getframe(1).f_globals.get('__name__', '__main__')  # pylint: disable=protected-access
+        except (AttributeError, ValueError):
+            module = None
+    if not isinstance(name, str) or not name.isidentifier() or keyword.iskeyword(name):
+        raise ValueError("Invalid record class name %r" % (name,))
+    if isinstance(schema, dict):
+        fields = tuple(schema)
+        nested = dict((field, make_slot_record("%s_%s" % (name, field), sub_schema, module=module))
+                      for field, sub_schema in schema.items() if sub_schema is not None)
+    else:
+        fields = tuple(schema)
+        nested = {}
+    if len(set(fields)) != len(fields):
+        raise ValueError("Duplicate field name in schema for %s" % (name,))
+    for field in fields:
+        if (not isinstance(field, str) or not field.isidentifier() or keyword.iskeyword(field)
+                or field in _RESERVED_NAMES):
+            raise ValueError("Invalid field name %r for %s" % (field, name))
+
+    namespace = dict((("_N_%s" % field), cls) for field, cls in nested.items())
+    namespace['_dict'] = dict
+    namespace['_SlotRecord'] = SlotRecord
+    args = ''.join(", %s=None" % (field,) for field in fields)
+    init_body = ''.join("\n    self.%s = %s" % (field, field) for field in fields) or "\n    pass"
+    from_args = ', '.join(
+        ("_N_%s.from_dict(source['%s']) if isinstance(source.get('%s'), _dict) else source.get('%s')"
+         % (field, field, field, field)) if field in nested else "source.get('%s')" % (field,)
+        for field in fields)
+    as_items = ', '.join(
+        ("'%s': (self.%s.as_dict() if isinstance(self.%s, _SlotRecord) else self.%s)"
+         % (field, field, field, field))
+        if field in nested else "'%s': self.%s" % (field, field)
+        for field in fields)
+    source = (
+        "def __init__(self%s):%s\n"
+        "\n"
+        "def from_dict(cls, source):\n"
+        "    if len(source) > %d or not _fieldset.issuperset(source):\n"
+        "        raise KeyError('Unknown keys for %s: %%s' %% (sorted(set(source) - _fieldset, key=str),))\n"
+        "    return cls(%s)\n"
+        "\n"
+        "def as_dict(self):\n"
+        "    return {%s}\n"
+    ) % (args, init_body, len(fields), name, from_args, as_items)
+    namespace['_fieldset'] = frozenset(fields)
+    exec(source, namespace)     # pylint: disable=exec-used
+
+    from_dict = namespace['from_dict']
+    from_dict.__doc__ = """
+        Return a new %s created from a dict. Nested dicts for nested fields are converted, as well.
+
+        @param source:  Source dict
+
+        @return new record
+        """ % (name,)
+    as_dict = namespace['as_dict']
+    as_dict.__doc__ = """
+        Return dict version of record, with nested records also converted to dicts.
+        """
+    attrs = dict(
+        __slots__=fields,
+        __init__=namespace['__init__'],
+        from_dict=classmethod(from_dict),
+        as_dict=as_dict,
+        _fields=fields,
+        _nested=nested,
+    )
+    cls = type(name, (SlotRecord,), attrs)
+    if module is not None:
+        cls.__module__ = module
+    # Bind the nested classes (at all depths) to this class, for pickling;
+    # when this class is itself nested, the caller rebinds them to its own class.
+    stack = [(cls, ())]
+    while stack:
+        parent, path = stack.pop()
+        for field, nested_cls in parent._nested.items():     # pylint: disable=protected-access
+            nested_cls._root = cls
+            nested_cls._root_path = path + (field,)
+            stack.append((nested_cls, nested_cls._root_path))
+    return cls
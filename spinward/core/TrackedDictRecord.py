@@ -0,0 +1,308 @@
+"""
+DictRecord with change tracking and delta export.
+"""
+from copy import deepcopy
+from .DictRecord import DictRecord, DictRecordAttributeError
+from .dict_util import DELTA_DELETE, DELTA_SET, fingerprint_invalidate
+from .dict_util import _fingerprint_caches
+
+_NOTHING = object()
+
+
+class _ChangeTracker(object):
+    """
+    Changed paths for one TrackedDictRecord tree, shared by all of its nested records.
+    """
+    __slots__ = ('root', 'changes', 'children')
+
+
+    def __init__(self, root):
+        self.root = root
+        # path tuple -> DELTA_SET or DELTA_DELETE, in order of (latest) change
+        self.changes = {}
+        # path tuple -> set of keys below it that lead to recorded changes
+        self.children = {}
+
+
+    def record(self, path, operation):
+        """
+        Record a change at path. A set of an ancestor path already covers the change;
+        a change at path supersedes any recorded changes below it.
+        """
+        changes = self.changes
+        children = self.children
+        for idx in range(1, len(path)):
+            if changes.get(path[:idx]) == DELTA_SET:
+                return
+        # Drop the changes below path (only the affected subtree is visited).
+        stack = [path]
+        while stack:
+            parent = stack.pop()
+            keys = children.pop(parent, None)
+            if keys:
+                for key in keys:
+                    child = parent + (key,)
+                    changes.pop(child, None)
+                    stack.append(child)
+        changes.pop(path, None)
+        changes[path] = operation
+        for idx in range(len(path) - 1, -1, -1):
+            keys = children.get(path[:idx])
+            if keys is None:
+                children[path[:idx]] = {path[idx]}
+            elif path[idx] in keys:
+                break
+            else:
+                keys.add(path[idx])
+
+
+    def clear(self):
+        """
+        Forget all recorded changes.
+        """
+        self.changes.clear()
+        self.children.clear()
+
+
+class TrackedDictRecord(DictRecord):
+    """
+    DictRecord that records which nested paths are set or deleted through
+    `__setattr__`/`__setitem__`, `set_nested`, `delete_nested`, `update_recursive`
+    (and `del`, `update`, `|=`, `pop`, `popitem`, `setdefault`, `clear`).
+
+    `export_delta` returns the minimal list of changes, which can be applied to
+    another copy of the record with `dict_patch` (or `apply_delta`).
+    `clear_changes` resets tracking, e.g. after the changes have been persisted.
+
+    Nested dicts are converted to TrackedDictRecords bound to the root's tracker,
+    including dicts assigned later (which are copied). Changes made inside other
+    containers (e.g. dicts within lists) are not tracked.
+
+        |   rec = TrackedDictRecord.from_dict(stored)
+        |   rec.addr.zip = '80301'
+        |   store.save_delta(rec.export_delta())
+        |   rec.clear_changes()
+    """
+
+    def __init__(self, *args, **kwargs):
+        object.__setattr__(self, '_tracker', kwargs.pop('_tracker', None) or _ChangeTracker(self))
+        object.__setattr__(self, '_path', kwargs.pop('_path', ()))
+        super(TrackedDictRecord, self).__init__(*args, **kwargs)
+        for key, value in dict.items(self):
+            dict.__setitem__(self, key, self._adopt(key, value))
+
+
+    @staticmethod
+    def from_dict(source, normalize=True, lazy=False):
+        """
+        Return a new TrackedDictRecord created from a dict, with no changes recorded.
+        Nested dicts are always converted (normalize and lazy are ignored).
+
+        @param source:      Source dict.
+        """
+        return TrackedDictRecord(source)
+
+
+    def _adopt(self, key, value):
+        """
+        Return value, with dicts converted to TrackedDictRecords bound to this tree at key.
+        """
+        if isinstance(value, dict):
+            return TrackedDictRecord(value, _tracker=self._tracker, _path=self._path + (key,))
+        return value
+
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, self._adopt(key, value))
+        self._tracker.record(self._path + (key,), DELTA_SET)
+        if _fingerprint_caches:
+            fingerprint_invalidate(self)
+
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._tracker.record(self._path + (key,), DELTA_DELETE)
+        if _fingerprint_caches:
+            fingerprint_invalidate(self)
+
+
+    def __delattr__(self, key):
+        try:
+            del self[key]
+        except KeyError:
+            raise DictRecordAttributeError(key) from None
+
+
+    def __reduce__(self):
+        # Tracking state is not pickled.
+        return (self.__class__, (self.as_dict(),))
+
+
+    def __copy__(self):
+        return self.__class__(self.as_dict())
+
+
+    def __deepcopy__(self, memo):
+        return self.__class__(deepcopy(self.as_dict(), memo))
+
+
+    def update(self, *args, **kwargs):      # pylint: disable=missing-function-docstring
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+
+    def setdefault(self, key, default=None):    # pylint: disable=missing-function-docstring
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+
+    def pop(self, key, *default):   # pylint: disable=missing-function-docstring
+        if key in self:
+            value = dict.pop(self, key)
+            self._tracker.record(self._path + (key,), DELTA_DELETE)
+            if _fingerprint_caches:
+                fingerprint_invalidate(self)
+            return value
+        return dict.pop(self, key, *default)
+
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+
+    def popitem(self):  # pylint: disable=missing-function-docstring
+        key, value = dict.popitem(self)
+        self._tracker.record(self._path + (key,), DELTA_DELETE)
+        if _fingerprint_caches:
+            fingerprint_invalidate(self)
+        return key, value
+
+
+    def clear(self):    # pylint: disable=missing-function-docstring
+        for key in list(self):
+            del self[key]
+
+
+    def normalize(self):
+        """
+        Nested dicts are always converted on assignment, so this is a no-op.
+        """
+
+
+    def set_nested(self, keys, value, extend=True):
+        """
+        Set value at nested path within record.
+
+        @param keys:        Nested path keys
+        @param value:       Value to set
+        @param extend:      If True, create missing intermediate levels as needed.
+                            If False, raise KeyError if an intermediate level is missing.
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        cur = self
+        for idx, key in enumerate(keys[:-1]):
+            child = dict.get(cur, key, _NOTHING)
+            if child is _NOTHING:
+                if not extend:
+                    raise KeyError("Item at %s not found" % ('.'.join(map(str, keys[:idx + 1])),))
+                cur[key] = {}
+                child = dict.__getitem__(cur, key)
+            elif not isinstance(child, dict):
+                raise KeyError("Item at %s not a dict" % ('.'.join(map(str, keys[:idx + 1])),))
+            cur = child
+        cur[keys[-1]] = value
+
+
+    def delete_nested(self, keys):
+        """
+        Delete value at nested path within record.
+
+        @param keys:        Nested path keys
+
+        Raises KeyError if the path is not found.
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        cur = self
+        for idx, key in enumerate(keys[:-1]):
+            cur = dict.get(cur, key, _NOTHING)
+            if not isinstance(cur, dict):
+                raise KeyError("Item at %s not found" % ('.'.join(map(str, keys[:idx + 1])),))
+        del cur[keys[-1]]
+
+
+    def update_recursive(self, source_dict, normalize=True):
+        """
+        Recursively update record, so that sub-dicts are updated instead of replaced.
+        Only the leaf values (and replaced sub-dicts) are recorded as changed.
+
+        @param source_dict: dict from which to copy values
+        @param normalize:   Ignored; nested dicts are always converted.
+        """
+        for key, val in source_dict.items():
+            cur = dict.get(self, key, _NOTHING)
+            if isinstance(val, dict) and isinstance(cur, TrackedDictRecord):
+                cur.update_recursive(val)
+            else:
+                self[key] = val
+
+
+    def changed_paths(self):
+        """
+        @return dict of changed path tuple (relative to the root record) -> DELTA_SET or DELTA_DELETE
+        """
+        return dict(self._tracker.changes)
+
+
+    def export_delta(self):
+        """
+        Return the minimal delta that reproduces the tracked changes, in the
+        format accepted by `dict_patch`: a list of (operation, keys, value),
+        with values copied and nested records converted to dicts.
+        Paths are relative to the root record.
+
+        @return list of (DELTA_SET, keys, value) and (DELTA_DELETE, keys, None) tuples
+        """
+        root = self._tracker.root
+        delta = []
+        for path, operation in self._tracker.changes.items():
+            if operation == DELTA_DELETE:
+                delta.append((DELTA_DELETE, path, None))
+            else:
+                value = deepcopy(root.get_nested(path))
+                if isinstance(value, DictRecord):
+                    value = value.as_dict()
+                delta.append((DELTA_SET, path, value))
+        return delta
+
+
+    def apply_delta(self, delta):
+        """
+        Apply a delta (see `export_delta`) to this record. The changes are tracked.
+
+        @param delta:   List of (operation, keys, value) tuples
+        """
+        for operation, keys, value in delta:
+            if operation == DELTA_SET:
+                self.set_nested(keys, deepcopy(value))
+            elif operation == DELTA_DELETE:
+                try:
+                    self.delete_nested(keys)
+                except KeyError:
+                    pass
+            else:
+                raise ValueError("Unknown delta operation %r" % (operation,))
+
+
+    def clear_changes(self):
+        """
+        Forget all tracked changes (e.g. after they have been committed to storage).
+        """
+        self._tracker.clear()
@@ -1,24 +1,63 @@
 """
 Utility scripts for manipulating dicts
 """
+import fnmatch
+import hashlib
+import re
+import weakref
+from copy import copy
+from collections.abc import Mapping, MutableMapping, Set
+from functools import lru_cache
 
+try:
+    import numpy
+except ImportError:     # pragma: no cover
+    numpy = None
 
-def dict_update_recursive(target_dict, source_dict):
+# Nested levels that the path helpers descend into: dicts, and other (mutable)
+# mappings such as ShapedDictRecord. dict is listed first, for speed.
+_MAPPING_TYPES = (dict, Mapping)
+_MUTABLE_MAPPING_TYPES = (dict, MutableMapping)
+
+
+def dict_update_recursive(target_dict, source_dict, in_place=True):
     """
     Recursively update dict, so that sub-dicts are updated instead of replaced.
-    Target dict is updated in place.
+    Target dict is updated in place, unless in_place is False.
+    Nesting depth is not limited by the recursion limit.
 
     @param target_dict: dict to update
     @param source_dict: dict from which to copy values
+    @param in_place:    If False, leave target_dict unchanged and return an updated copy.
+                        Only the dicts along updated paths are copied; all other
+                        subtrees are shared with target_dict (and values with source_dict).
+
+    @return updated dict (target_dict if in_place)
     """
-    for key, val in source_dict.items():
-        if isinstance(val, dict) and key in target_dict and isinstance(target_dict[key], dict):
-            dict_update_recursive(target_dict[key], val)
-        else:
-            target_dict[key] = val
+    result = target_dict if in_place else copy(target_dict)
+    stack = [(result, source_dict)]
+    while stack:
+        target, source = stack.pop()
+        if in_place and _fingerprint_caches:
+            fingerprint_invalidate(target)
+        for key, val in source.items():
+            if isinstance(val, dict):
+                cur = target.get(key, _NOTHING)
+                if isinstance(cur, dict):
+                    if not in_place:
+                        # Re-read the copy: the target may convert assigned dicts (e.g. TrackedDictRecord).
+                        target[key] = copy(cur)
+                        cur = target[key]
+                    stack.append((cur, val))
+                    continue
+            target[key] = val
+    return result
 
 
-_NOTHING = object
+_NOTHING = object()
+
+# Weak references to live FingerprintCaches; mutators skip invalidation while it is empty.
+_fingerprint_caches = set()
 
 # def dict_get_nested(target_dict, keys, default=None, extend=False):
 #     """
@@ -66,39 +105,26 @@ def dict_get_nested(target_dict, keys, default=None):
     @param target_dict: Dict from which to retrieve value
     @param keys:        Nested path keys
     @param default:     Default value to return if item is not found
+                        (or if an intermediate level is not a dict or other Mapping)
 
     @return value at nested path
     """
     if not keys:
         raise KeyError("No key specified")
     cur = target_dict
-    keys = list(reversed(keys))
-    while keys:
-        key = keys.pop()
-        val = cur.get(key, _NOTHING)
-        if keys:
-            # if val is _NOTHING and extend:
-            #     cur[key] = val = dict()
-            #     # cur = val
-            #     # continue
-            if keys and isinstance(val, dict):
-                cur = val
-                continue
-            # elif val is _NOTHING and extend:
-            #     cur[key] = dict()
-            #     cur = cur[key]
-            #     continue
-            else:
-                break
-        # if val is _NOTHING:
-        #     return default
-        # break
-    return default if val is _NOTHING else val
+    last = len(keys) - 1
+    for idx in range(last):
+        cur = cur.get(keys[idx], _NOTHING)
+        if not isinstance(cur, _MAPPING_TYPES):
+            return default
+    cur = cur.get(keys[last], _NOTHING)
+    return default if cur is _NOTHING else cur
 
 
 def dict_set_nested(target_dict, keys, value, extend=True):
     """
     Set value at nested path within dict. Optionally build out parent path.
+    keys is not modified.
 
     @param target_dict: Dict to update
     @param keys:        Nested path keys
@@ -109,21 +135,1034 @@ def dict_set_nested(target_dict, keys, value, extend=True):
     if not keys:
         raise KeyError("No key specified")
     cur = target_dict
-    term_key = keys.pop()
-    consumed = []
-    while keys:
-        key = keys.pop(0)
+    changed = None      # the existing dict that new levels are added to, if any
+    last = len(keys) - 1
+    for idx in range(last):
+        key = keys[idx]
         child = cur.get(key, _NOTHING)
-        consumed.append(key)
         if child is _NOTHING:
-            if extend:
-                cur[key] = child = {}
-                cur = child
-            else:
-                raise KeyError("Item at %s not found" % ('.'.join(consumed),))
-        elif not isinstance(child, dict):
-            raise KeyError("Item at %s not a dict" % ('.'.join(consumed),))
+            if not extend:
+                raise KeyError("Item at %s not found" % ('.'.join(map(str, keys[:idx + 1])),))
+            if changed is None:
+                changed = cur
+            # Re-read the new level: cur may convert assigned dicts (e.g. TrackedDictRecord).
+            cur[key] = {}
+            child = cur[key]
+        elif not isinstance(child, _MUTABLE_MAPPING_TYPES):
+            raise KeyError("Item at %s not a dict" % ('.'.join(map(str, keys[:idx + 1])),))
+        cur = child
+    cur[keys[last]] = value
+    if _fingerprint_caches:
+        fingerprint_invalidate(cur if changed is None else changed)
+
+
+def dict_delete_nested(target_dict, keys):
+    """
+    Delete value at nested path within dict.
+
+    @param target_dict: Dict to update
+    @param keys:        Nested path keys
+
+    Raises KeyError if the path is not found.
+    """
+    if not keys:
+        raise KeyError("No key specified")
+    cur = target_dict
+    for idx in range(len(keys) - 1):
+        cur = cur.get(keys[idx], _NOTHING)
+        if not isinstance(cur, _MUTABLE_MAPPING_TYPES):
+            raise KeyError("Item at %s not found" % ('.'.join(map(str, keys[:idx + 1])),))
+    del cur[keys[-1]]
+    if _fingerprint_caches:
+        fingerprint_invalidate(cur)
+
+
+# Delta operations. A delta is a list of (operation, keys, value) tuples,
+# where keys is a tuple of nested path keys; value is None for DELTA_DELETE.
+DELTA_SET = 'set'
+DELTA_DELETE = 'delete'
+
+
+def _inverse_operation(target_dict, operation, keys):
+    """
+    @return delta operation that undoes (operation, keys) on target_dict in its current state, or None
+    """
+    cur = target_dict
+    for idx in range(len(keys) - 1):
+        cur = cur.get(keys[idx], _NOTHING)
+        if cur is _NOTHING:
+            # DELTA_SET creates the missing level (a non-dict level makes it fail).
+            return (DELTA_DELETE, tuple(keys[:idx + 1]), None) if operation == DELTA_SET else None
+        if not isinstance(cur, _MAPPING_TYPES):
+            return None
+    value = cur.get(keys[-1], _NOTHING)
+    if value is not _NOTHING:
+        return (DELTA_SET, tuple(keys), value)
+    return (DELTA_DELETE, tuple(keys), None) if operation == DELTA_SET else None
+
+
+def dict_patch(target_dict, delta, inverse=False):
+    """
+    Apply a delta (e.g. from `dict_diff` or TrackedDictRecord.export_delta) to a dict, in place.
+    Intermediate levels are created as needed for DELTA_SET;
+    DELTA_DELETE of a path that is not present is ignored.
+
+    @param target_dict: Dict to update
+    @param delta:       List of (operation, keys, value) tuples
+    @param inverse:     If True, return the delta that reverts the changes.
+                        It refers to the replaced and deleted values (not copies).
+
+    @return inverse delta if inverse is True, else None
+    """
+    undo = [] if inverse else None
+    for operation, keys, value in delta:
+        if operation not in (DELTA_SET, DELTA_DELETE):
+            raise ValueError("Unknown delta operation %r" % (operation,))
+        undo_operation = _inverse_operation(target_dict, operation, keys) if inverse and keys else None
+        if operation == DELTA_SET:
+            dict_set_nested(target_dict, keys, value)
         else:
-            cur = child
-    cur[term_key] = value
+            try:
+                dict_delete_nested(target_dict, keys)
+            except KeyError:
+                pass
+        if inverse and undo_operation is not None:
+            undo.append(undo_operation)
+    if inverse:
+        undo.reverse()
+    return undo
+
+
+def dict_diff(source_dict, target_dict):
+    """
+    Return the delta that turns source_dict into target_dict (see `dict_patch`).
+    Sub-dicts that are the same object in both are skipped without being compared,
+    so diffing a dict against a copy-on-write update of it (see `dict_update_recursive`)
+    only visits the changed paths. Other values are compared by type and equality.
+
+        |   delta = dict_diff(old_config, new_config)
+        |   dict_patch(replica, delta)
+
+    @param source_dict: Original dict
+    @param target_dict: Changed dict
+
+    @return list of (DELTA_SET, keys, value) and (DELTA_DELETE, keys, None) tuples,
+            with values shared with target_dict (not copies)
+    """
+    delta = []
+    stack = [((), source_dict, target_dict)]
+    while stack:
+        path, source, target = stack.pop()
+        for key in source:
+            if key not in target:
+                delta.append((DELTA_DELETE, path + (key,), None))
+        for key, new in target.items():
+            old = source.get(key, _NOTHING)
+            if old is new:
+                continue
+            if isinstance(old, dict) and isinstance(new, dict):
+                stack.append((path + (key,), old, new))
+            elif old is _NOTHING or type(old) is not type(new) or old != new:
+                delta.append((DELTA_SET, path + (key,), new))
+    return delta
+
+
+# Maximum number of compiled paths kept by compile_path, for each of key sequences and dotted strings.
+PATH_CACHE_SIZE = 1024
+
+
+class CompiledPath(object):
+    """
+    Accessors for one nested path, generated for the path's depth
+    (see `compile_path`). Semantics match `dict_get_nested`, `dict_set_nested`
+    and `dict_delete_nested`:
+
+        get(target_dict, default=None)
+        set(target_dict, value, extend=True)
+        delete(target_dict)
+    """
+    __slots__ = ('keys', 'get', 'set', 'delete')
+
+
+    def __init__(self, keys):
+        """
+        @param keys:    Tuple of nested path keys
+        """
+        if not keys:
+            raise KeyError("No key specified")
+        self.keys = keys
+        last = len(keys) - 1
+        # Keys and error labels are passed to a factory function, so the accessors see them as closure cells.
+        params = ['_N', '_dict', '_mdict', '_caches', '_invalidate'] + ['_k%d' % (idx,) for idx in range(last + 1)] + ['_l%d' % (idx,) for idx in range(last)]
+        args = [_NOTHING, _MAPPING_TYPES, _MUTABLE_MAPPING_TYPES, _fingerprint_caches, fingerprint_invalidate] + list(keys) + ['.'.join(map(str, keys[:idx + 1])) for idx in range(last)]
+
+        lines = ["def make(%s):" % (', '.join(params),),
+                 "    def get(target_dict, default=None):",
+                 "        cur = target_dict"]
+        for idx in range(last):
+            lines.append("        cur = cur.get(_k%d, _N)" % (idx,))
+            lines.append("        if not isinstance(cur, _dict):")
+            lines.append("            return default")
+        lines.append("        cur = cur.get(_k%d, _N)" % (last,))
+        lines.append("        return default if cur is _N else cur")
+
+        lines.append("    def set(target_dict, value, extend=True):")
+        lines.append("        cur = target_dict")
+        lines.append("        changed = None")
+        for idx in range(last):
+            lines.append("        child = cur.get(_k%d, _N)" % (idx,))
+            lines.append("        if child is _N:")
+            lines.append("            if not extend:")
+            lines.append("                raise KeyError('Item at %%s not found' %% (_l%d,))" % (idx,))
+            lines.append("            if changed is None:")
+            lines.append("                changed = cur")
+            lines.append("            cur[_k%d] = {}" % (idx,))
+            lines.append("            child = cur[_k%d]" % (idx,))
+            lines.append("        elif not isinstance(child, _mdict):")
+            lines.append("            raise KeyError('Item at %%s not a dict' %% (_l%d,))" % (idx,))
+            lines.append("        cur = child")
+        lines.append("        cur[_k%d] = value" % (last,))
+        lines.append("        if _caches:")
+        lines.append("            _invalidate(cur if changed is None else changed)")
+
+        lines.append("    def delete(target_dict):")
+        lines.append("        cur = target_dict")
+        for idx in range(last):
+            lines.append("        cur = cur.get(_k%d, _N)" % (idx,))
+            lines.append("        if not isinstance(cur, _mdict):")
+            lines.append("            raise KeyError('Item at %%s not found' %% (_l%d,))" % (idx,))
+        lines.append("        del cur[_k%d]" % (last,))
+        lines.append("        if _caches:")
+        lines.append("            _invalidate(cur)")
+        lines.append("    return get, set, delete")
+
+        namespace = {}
+        exec(compile('\n'.join(lines) + '\n', '<compile_path>', 'exec'), namespace)     # pylint: disable=exec-used
+        self.get, self.set, self.delete = namespace['make'](*args)
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.keys)
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def _compile_keys(keys):
+    return CompiledPath(keys)
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def _compile_dotted(dotted):
+    return _compile_keys(tuple(dotted.split('.')))
+
+
+def compile_path(keys):
+    """
+    Return accessors specialized to a nested path, for paths used repeatedly.
+    Compiled paths are cached; in tight loops, keep the result rather than calling compile_path each time.
+
+        |   zip_path = compile_path('addr.zip')
+        |   for rec in records:
+        |       zip_path.set(rec, zip_path.get(rec, '').strip())
+
+    @param keys:    Nested path keys, or dotted string
+
+    @return CompiledPath with get, set and delete functions
+    """
+    if isinstance(keys, str):
+        return _compile_dotted(keys)
+    return _compile_keys(tuple(keys))
+
+
+def _path_tuple(keys):
+    """
+    @return path tuple from a key sequence or dotted string
+    """
+    return tuple(keys.split('.')) if isinstance(keys, str) else tuple(keys)
+
+
+@lru_cache(maxsize=64)
+def _compile_projection(paths):
+    """
+    Generate a function that appends the values at paths (tuple of path tuples)
+    of each record to per-path columns. The paths form a trie; each trie node is
+    fetched once per record, into its own local variable.
+
+    @return project(records, appends, defaults) function
+    """
+    keys = []
+    nodes = {(): 'record'}
+    body = []
+    for path in paths:
+        if not path:
+            raise KeyError("No key specified")
+        for depth in range(1, len(path) + 1):
+            prefix = path[:depth]
+            if prefix in nodes:
+                continue
+            parent = nodes[path[:depth - 1]]
+            var = nodes[prefix] = '_p%d' % (len(nodes),)
+            keys.append(path[depth - 1])
+            if depth == 1:
+                body.append("%s = record.get(_k%d, _N)" % (var, len(keys) - 1))
+            else:
+                body.append("%s = %s.get(_k%d, _N) if isinstance(%s, _dict) else _N"
+                            % (var, parent, len(keys) - 1, parent))
+    for idx, path in enumerate(paths):
+        var = nodes[path]
+        body.append("_a%d(_d%d if %s is _N else %s)" % (idx, idx, var, var))
+
+    count = len(paths)
+    lines = ["def make(_N, _dict, %s):" % (', '.join('_k%d' % (idx,) for idx in range(len(keys))),),
+             "    def project(records, appends, defaults):",
+             "        %s, = appends" % (', '.join('_a%d' % (idx,) for idx in range(count)),),
+             "        %s, = defaults" % (', '.join('_d%d' % (idx,) for idx in range(count)),),
+             "        for record in records:"]
+    lines.extend("            %s" % (line,) for line in body)
+    lines.append("    return project")
+    namespace = {}
+    exec(compile('\n'.join(lines) + '\n', '<dict_project>', 'exec'), namespace)    # pylint: disable=exec-used
+    return namespace['make'](_NOTHING, _MAPPING_TYPES, *keys)
+
+
+def dict_project(records, paths, defaults=None, dtypes=None):
+    """
+    Extract the values at several nested paths from each of many dicts (or DictRecords),
+    as columns. Each record is traversed once for all paths; paths with a common prefix
+    share the lookups of that prefix.
+
+        |   ids, zips = dict_project(records, ['id', 'addr.zip'], defaults=[0, ''], dtypes=['int64', None])
+
+    @param records:     Iterable of dicts (or other Mappings)
+    @param paths:       Sequence of paths (nested path keys, or dotted strings)
+    @param defaults:    Value for records where a path is not found: a sequence with one
+                        default per path, or None for None defaults.
+    @param dtypes:      Optional sequence with one NumPy dtype (or None) per path. Columns with a
+                        dtype are returned as NumPy arrays of that dtype (requires numpy).
+
+    @return list of columns (lists or NumPy arrays), one per path, in path order
+    """
+    paths = tuple(_path_tuple(keys) for keys in paths)
+    defaults = (None,) * len(paths) if defaults is None else tuple(defaults)
+    if len(defaults) != len(paths):
+        raise ValueError("Expected %d defaults, got %d" % (len(paths), len(defaults)))
+    if dtypes is not None:
+        dtypes = tuple(dtypes)
+        if len(dtypes) != len(paths):
+            raise ValueError("Expected %d dtypes, got %d" % (len(paths), len(dtypes)))
+        if numpy is None and any(dtype is not None for dtype in dtypes):
+            raise ImportError("numpy is required for dtypes")
+    if not paths:
+        return []
+    columns = [[] for _ in paths]
+    _compile_projection(paths)(records, [column.append for column in columns], defaults)
+    if dtypes is not None:
+        columns = [column if dtype is None else numpy.array(column, dtype=dtype)
+                   for column, dtype in zip(columns, dtypes)]
+    return columns
+
+
+class LayeredDict(Mapping):
+    """
+    Read-only view that merges a stack of dicts (e.g. defaults, site, tenant, user
+    and request configuration) lazily, with the same result as applying
+    `dict_update_recursive` for each layer in turn, but without copying.
+
+    Layers are given lowest priority first. A key's value comes from the highest layer
+    that has the key; if that value is a dict, it is merged with the dicts at the same
+    key in lower layers, down to the first lower layer where the value is not a dict.
+    Merged dicts are returned as nested LayeredDict views.
+
+    Resolved keys (and nested views) are memoized. After changing a layer, call
+    `set_layer` or `invalidate`, which drop only the memoized keys that the layer
+    contributes to. Nested views obtained before the change are not updated.
+
+        |   config = LayeredDict([defaults, site, tenant])
+        |   config.add_layer(request_overrides)
+        |   config['db']['timeout']
+        |   config.as_dict()
+    """
+
+    def __init__(self, layers=()):
+        """
+        @param layers:  Sequence of dicts, lowest priority first
+        """
+        self._layers = list(enumerate(layers))  # (layer index, dict), lowest priority first
+        self._cache = {}        # key -> (value or _NOTHING, indexes of the layers the value depends on)
+        self._keys = None
+
+
+    @classmethod
+    def _view(cls, layers):
+        """
+        Return a nested view of (layer index, dict) layers.
+        """
+        view = cls.__new__(cls)
+        view._layers = layers
+        view._cache = {}
+        view._keys = None
+        return view
+
+
+    def _resolve(self, key):
+        """
+        @return (value or _NOTHING, tuple of indexes of the layers the value depends on)
+        """
+        entry = self._cache.get(key)
+        if entry is not None:
+            return entry
+        merged = []
+        depends = ()
+        for idx, layer in reversed(self._layers):
+            val = layer.get(key, _NOTHING)
+            if val is _NOTHING:
+                continue
+            if isinstance(val, dict):
+                merged.append((idx, val))
+                continue
+            if not merged:
+                entry = (val, (idx,))
+            else:
+                # A non-dict value ends the merge, so it is a dependency, too.
+                depends = (idx,)
+            break
+        if entry is None:
+            if merged:
+                merged.reverse()
+                entry = (self._view(merged), tuple(idx for idx, _ in merged) + depends)
+            else:
+                entry = (_NOTHING, ())
+        self._cache[key] = entry
+        return entry
+
+
+    def __getitem__(self, key):
+        value = self._resolve(key)[0]
+        if value is _NOTHING:
+            raise KeyError(key)
+        return value
+
+
+    def __contains__(self, key):
+        return self._resolve(key)[0] is not _NOTHING
+
+
+    def _key_list(self):
+        if self._keys is None:
+            keys = {}
+            for _, layer in self._layers:
+                keys.update(dict.fromkeys(layer))
+            self._keys = list(keys)
+        return self._keys
+
+
+    def __iter__(self):
+        return iter(self._key_list())
+
+
+    def __len__(self):
+        return len(self._key_list())
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, [layer for _, layer in self._layers])
+
+
+    @property
+    def layers(self):
+        """
+        Tuple of layer dicts, lowest priority first
+        """
+        return tuple(layer for _, layer in self._layers)
+
+
+    def _layer_index(self, index):
+        """
+        @return non-negative layer index for a (possibly negative) index
+        """
+        count = len(self._layers)
+        if not -count <= index < count:
+            raise IndexError("Layer index %d out of range" % (index,))
+        return index % count
+
+
+    def invalidate(self, index):
+        """
+        Drop memoized values that depend on a layer, after the layer has been modified in place.
+
+        @param index:   Layer index (negative indexes count from the highest priority layer)
+        """
+        index = self._layer_index(index)
+        layer = self._layers[index][1]
+        cache = self._cache
+        for key in [key for key, (_, depends) in cache.items() if index in depends or key in layer]:
+            del cache[key]
+        self._keys = None
+
+
+    def set_layer(self, index, layer):
+        """
+        Replace a layer.
 
+        @param index:   Layer index (negative indexes count from the highest priority layer)
+        @param layer:   New layer dict
+        """
+        index = self._layer_index(index)
+        self._layers[index] = (index, layer)
+        self.invalidate(index)
+
+
+    def add_layer(self, layer):
+        """
+        Add a layer with higher priority than all current layers.
+
+        @param layer:   Layer dict
+
+        @return index of the new layer
+        """
+        index = len(self._layers)
+        self._layers.append((index, layer))
+        self.invalidate(index)
+        return index
+
+
+    def as_dict(self):
+        """
+        Return the merged layers as a new dict, with nested views also converted to dicts.
+        Non-dict values are shared with the layers.
+        """
+        return dict((key, value.as_dict() if isinstance(value, LayeredDict) else value)
+                    for key, value in ((key, self[key]) for key in self._key_list()))
+
+
+_DIGEST_SIZE = 16
+
+# Types whose repr is their canonical encoding
+_SCALAR_TYPES = frozenset([str, int, float, bool, bytes, type(None)])
+
+
+def _canonical(value, cache, parent):
+    """
+    Return the canonical text encoding of a value. Scalars are encoded by repr
+    (which never contains raw control characters); containers are bracketed,
+    with items separated by NUL; nested mappings are replaced by their digests.
+
+    @param cache:   FingerprintCache or None
+    @param parent:  Nearest dict containing value (for cache invalidation), or None
+    """
+    typ = type(value)
+    if typ in _SCALAR_TYPES:
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return ('L[' if isinstance(value, list) else 'T[') + '\x00'.join(
+            [repr(item) if type(item) in _SCALAR_TYPES else _canonical(item, cache, parent) for item in value]) + ']'
+    if isinstance(value, (dict, Mapping)):
+        return 'D' + _mapping_digest(value, cache, parent)
+    if isinstance(value, Set):
+        return 'S[' + '\x00'.join(sorted(_canonical(item, cache, parent) for item in value)) + ']'
+    # Subclasses (e.g. IntEnum) are encoded like their base type.
+    for base in (bool, int, float, str, bytes):
+        if isinstance(value, base):
+            return repr(base(value))
+    raise TypeError("Cannot fingerprint %s value" % (typ.__name__,))
+
+
+def _mapping_digest(node, cache, parent):
+    """
+    @return hex digest of a dict (or other Mapping), independent of key order
+    """
+    memo = cache is not None and isinstance(node, dict)
+    if memo:
+        if parent is not None:
+            cache._parents.setdefault(id(node), {})[id(parent)] = parent
+        entry = cache._digests.get(id(node))
+        if entry is not None and entry[0] is node:
+            return entry[1]
+    owner = node if memo else parent
+    scalar_types = _SCALAR_TYPES
+    entries = [(repr(key) if type(key) in scalar_types else _canonical(key, None, None)) + '\x01'
+               + (repr(value) if type(value) in scalar_types else
+                  'D' + _mapping_digest(value, cache, owner) if isinstance(value, dict) else
+                  _canonical(value, cache, owner))
+               for key, value in node.items()]
+    entries.sort()
+    text = '{' + '\x00'.join(entries) + '}'
+    digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=_DIGEST_SIZE).hexdigest()
+    if memo:
+        cache._digests[id(node)] = (node, digest)
+    return digest
+
+
+class FingerprintCache(object):
+    """
+    Memo of dict fingerprints (see `dict_fingerprint`), so that after a change
+    only the digests of the changed dict and its ancestors are recomputed.
+
+    Dicts changed through the dict_util functions (`dict_set_nested`, `dict_set_many`,
+    `dict_delete_nested`, `dict_update_recursive`, `dict_patch`, compiled paths),
+    DictRecord attribute assignment, `set_nested`, `update_recursive` and `normalize`,
+    and any TrackedDictRecord change are invalidated automatically.
+
+    DictRecord item-level dict methods (`rec[key] = value`, `del`, `update`, `pop`,
+    `setdefault`, ...) are inherited from dict unchanged, so that they cost nothing
+    extra when fingerprints are not used; they do NOT invalidate. After such changes,
+    and any other in-place change (to plain dicts, appending to a list within a
+    dict, ...), call `invalidate` (or `fingerprint_invalidate`) with the changed dict
+    (the dict containing the list), or the memoized digest is stale.
+
+    The cache holds references to the fingerprinted dicts; `clear` it (or drop it)
+    when they are no longer needed.
+
+        |   fingerprints = FingerprintCache()
+        |   key = dict_fingerprint(config, fingerprints)
+        |   config.set_nested(['db', 'timeout'], 30)
+        |   key = dict_fingerprint(config, fingerprints)     # rehashes config and config.db only
+    """
+    __slots__ = ('_digests', '_parents', '__weakref__')
+
+
+    def __init__(self):
+        self._digests = {}      # id(dict) -> (dict, digest)
+        self._parents = {}      # id(dict) -> {id(parent): parent} for dicts that contain it
+        _fingerprint_caches.add(weakref.ref(self, _fingerprint_caches.discard))
+
+
+    def __len__(self):
+        return len(self._digests)
+
+
+    def invalidate(self, node):
+        """
+        Drop the memoized digests of a dict and of all dicts that contain it.
+
+        @param node:    Changed dict
+        """
+        digests = self._digests
+        parents = self._parents
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if digests.pop(id(node), None) is None:
+                # Digests of containing dicts are always dropped with (or before) those of their children.
+                continue
+            stack.extend(parents.pop(id(node), {}).values())
+
+
+    def clear(self):
+        """
+        Drop all memoized digests.
+        """
+        self._digests.clear()
+        self._parents.clear()
+
+
+def fingerprint_invalidate(node):
+    """
+    Drop the memoized digests of a changed dict (and the dicts containing it)
+    from all FingerprintCaches. See `FingerprintCache`.
+
+    @param node:    Changed dict
+    """
+    for ref in list(_fingerprint_caches):
+        cache = ref()
+        if cache is not None:
+            cache.invalidate(node)
+
+
+def dict_fingerprint(value, cache=None):
+    """
+    Return a stable structural fingerprint of a nested dict (or DictRecord), for use
+    as a cache key or for change detection. Equal structures have equal fingerprints,
+    regardless of key order, dict class or process (it does not depend on hash()).
+    Supported values are dicts and other Mappings, lists, tuples, sets, str, bytes,
+    int, float, bool and None; other values raise TypeError.
+
+    @param value:   Value to fingerprint, usually a dict
+    @param cache:   Optional FingerprintCache memoizing the digests of nested dicts
+
+    @return 16-byte digest
+    """
+    if isinstance(value, (dict, Mapping)):
+        return bytes.fromhex(_mapping_digest(value, cache, None))
+    text = _canonical(value, cache, None)
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=_DIGEST_SIZE).digest()
+
+
+def dict_flatten(records, delimiter='.'):
+    """
+    Flatten a stream of nested dicts into rows keyed by delimited key paths,
+    e.g. {'a': {'b': 1}} -> {'a.b': 1}. Non-string keys are converted with str().
+    Empty nested dicts are kept as values, so that `dict_unflatten` restores them.
+
+        |   writer.writerows(dict_flatten(records))
+
+    @param records:     Iterable of dicts
+    @param delimiter:   Key path delimiter
+
+    Raises KeyError if two values of a record flatten to the same path,
+    e.g. {'a.b': 1, 'a': {'b': 2}}.
+
+    @return generator of flat dicts, one per record
+    """
+    # (parent path or None, key type, key) -> path string, shared by all records.
+    # The key type keeps equal keys of different types (1, 1.0, True) apart.
+    paths = {}
+    for record in records:
+        row = {}
+        stack = [(None, iter(record.items()))]
+        while stack:
+            prefix, items = stack[-1]
+            for key, value in items:
+                cache_key = (prefix, type(key), key)
+                path = paths.get(cache_key)
+                if path is None:
+                    if len(paths) >= PATH_CACHE_SIZE:
+                        paths.clear()
+                    path = paths[cache_key] = str(key) if prefix is None else prefix + delimiter + str(key)
+                if isinstance(value, dict) and value:
+                    stack.append((path, iter(value.items())))
+                    break
+                if path in row:
+                    raise KeyError("Conflicting values at %s" % (path,))
+                row[path] = value
+            else:
+                stack.pop()
+        yield row
+
+
+def dict_unflatten(rows, delimiter='.', record_class=dict):
+    """
+    Rebuild nested dicts from a stream of rows keyed by delimited key paths,
+    e.g. {'a.b': 1, 'a.c': 2} -> {'a': {'b': 1, 'c': 2}}. Each intermediate level
+    is created once per row and shared by all keys below it.
+
+        |   records = dict_unflatten(csv.DictReader(stream))
+
+    @param rows:            Iterable of flat dicts
+    @param delimiter:       Key path delimiter
+    @param record_class:    Class of the created dicts (at all levels), e.g. DictRecord
+
+    Raises KeyError if a row has both a value at a path and keys below it.
+
+    @return generator of nested dicts, one per row
+    """
+    splits = {}     # path string -> (parent path string, key), shared by all rows
+    for row in rows:
+        result = record_class()
+        levels = {'': result}
+        for path, value in row.items():
+            split = splits.get(path)
+            if split is None:
+                if len(splits) >= PATH_CACHE_SIZE:
+                    splits.clear()
+                parent_path, _, key = path.rpartition(delimiter)
+                split = splits[path] = (parent_path, key)
+            parent_path, key = split
+            parent = levels.get(parent_path)
+            if parent is None:
+                parent = _unflatten_level(levels, splits, parent_path, delimiter, record_class)
+            if path in levels or key in parent:
+                raise KeyError("Item at %s set twice" % (path,))
+            parent[key] = value
+        yield result
+
+
+def _unflatten_level(levels, splits, path, delimiter, record_class):
+    """
+    Create the level at path (and any missing levels above it) for dict_unflatten.
+
+    @return dict at path
+    """
+    missing = []
+    while path not in levels:
+        missing.append(path)
+        split = splits.get(path)
+        if split is None:
+            parent_path, _, key = path.rpartition(delimiter)
+            split = splits[path] = (parent_path, key)
+        path = split[0]
+    level = levels[path]
+    for path in reversed(missing):
+        key = splits[path][1]
+        if key in level:
+            raise KeyError("Item at %s not a dict" % (path,))
+        level[key] = record_class()
+        level = levels[path] = level[key]
+    return level
+
+
+class _PatternState(object):
+    """
+    Set of PathPattern segment positions reached at a node (one DFA state).
+    """
+    __slots__ = ('positions', 'accepting', 'literals', 'wildcard', 'next')
+
+
+    def __init__(self, positions, accepting, literals, wildcard):
+        self.positions = positions      # frozenset of segment positions (closed over '**')
+        self.accepting = accepting      # True if a node in this state matches the pattern
+        self.literals = literals        # tuple of keys that can lead to a next state, if not wildcard
+        self.wildcard = wildcard        # True if any key can lead to a next state
+        self.next = {}                  # key -> next state (or None), memoized
+
+
+class PathPattern(object):
+    """
+    Compiled wildcard path pattern (see `compile_pattern`).
+    """
+
+    def __init__(self, segments):
+        """
+        @param segments:    Sequence of pattern segments: keys, '*', '**' or glob strings
+        """
+        self.segments = tuple(segments)
+        kinds = []
+        for segment in self.segments:
+            if segment == '**':
+                kinds.append(('deep', None))
+            elif segment == '*':
+                kinds.append(('any', None))
+            elif isinstance(segment, str) and ('*' in segment or '?' in segment or '[' in segment):
+                kinds.append(('glob', re.compile(fnmatch.translate(segment)).match))
+            else:
+                keys = (segment,)
+                if isinstance(segment, str) and segment.isdigit():
+                    keys += (int(segment),)     # also matches list indexes
+                kinds.append(('literal', keys))
+        self._kinds = kinds
+        self._states = {}
+        self._start = self._state([0])
+
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.segments)
+
+
+    def _state(self, positions):
+        """
+        @return interned state for positions, after adding the positions reachable through '**'
+        """
+        kinds = self._kinds
+        closed = set(positions)
+        for pos in sorted(closed):
+            while pos < len(kinds) and kinds[pos][0] == 'deep':
+                pos += 1
+                closed.add(pos)
+        closed = frozenset(closed)
+        state = self._states.get(closed)
+        if state is None:
+            literals = {}
+            wildcard = False
+            for pos in sorted(closed):
+                if pos < len(kinds):
+                    kind, arg = kinds[pos]
+                    if kind == 'literal':
+                        literals.update(dict.fromkeys(arg))
+                    else:
+                        wildcard = True
+            state = self._states[closed] = _PatternState(closed, len(kinds) in closed, tuple(literals), wildcard)
+        return state
+
+
+    def _advance(self, state, key):
+        """
+        @return state after descending to key, or None if nothing below key can match
+        """
+        nxt = state.next.get(key, _NOTHING)
+        if nxt is not _NOTHING:
+            return nxt
+        positions = []
+        kinds = self._kinds
+        for pos in state.positions:
+            if pos >= len(kinds):
+                continue
+            kind, arg = kinds[pos]
+            if kind == 'deep':
+                positions.append(pos)
+            elif kind == 'any' or (kind == 'literal' and key in arg) or (
+                    kind == 'glob' and isinstance(key, str) and arg(key)):
+                positions.append(pos + 1)
+        nxt = self._state(positions) if positions else None
+        if len(state.next) >= PATH_CACHE_SIZE:
+            state.next.clear()
+        state.next[key] = nxt
+        return nxt
+
+
+    def _children(self, node, state):
+        """
+        @return iterator of (key, child) of node that may lead to matches in state
+        """
+        if isinstance(node, dict):
+            if state.wildcard:
+                return iter(node.items())
+            return ((key, node[key]) for key in state.literals if key in node)
+        if isinstance(node, (list, tuple)):
+            if state.wildcard:
+                return enumerate(node)
+            count = len(node)
+            return ((key, node[key]) for key in state.literals
+                    if type(key) is int and key < count)    # pylint: disable=unidiomatic-typecheck
+        return iter(())
+
+
+    def match(self, target):
+        """
+        Walk target lazily, visiting only subtrees that can contain matches.
+        Lists and tuples are walked, too, with their indexes as keys.
+
+        @param target:  Nested dict
+
+        @return generator of (path tuple, value) for each match, in depth-first order
+        """
+        start = self._start
+        if start.accepting:
+            yield (), target
+        stack = [((), start, self._children(target, start))]
+        while stack:
+            path, state, children = stack[-1]
+            for key, child in children:
+                nxt = self._advance(state, key)
+                if nxt is None:
+                    continue
+                child_path = path + (key,)
+                if nxt.accepting:
+                    yield child_path, child
+                if nxt.wildcard or nxt.literals:
+                    stack.append((child_path, nxt, self._children(child, nxt)))
+                    break
+            else:
+                stack.pop()
+
+
+    def values(self, target):
+        """
+        @return list of the values matching the pattern in target
+        """
+        return [value for _, value in self.match(target)]
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def _compile_dotted_pattern(pattern):
+    return PathPattern(pattern.split('.'))
+
+
+def compile_pattern(pattern):
+    """
+    Compile a wildcard path pattern. Pattern segments are:
+
+        key     The key (or list index)
+        *       Any one key or index
+        **      Any number of levels, including none
+        a*b?    Keys matching a glob (see fnmatch)
+
+        |   skus = compile_pattern('orders.*.items.*.sku')
+        |   for path, sku in skus.match(payload):
+        |       ...
+        |   compile_pattern('**.id').values(payload)
+
+    @param pattern: Dotted pattern string, or sequence of segments (for keys that
+                    contain '.' or are not strings)
+
+    @return PathPattern (compiled patterns are cached)
+    """
+    if isinstance(pattern, str):
+        return _compile_dotted_pattern(pattern)
+    return PathPattern(pattern)
+
+
+def dict_set_many(target_dict, values, extend=True):
+    """
+    Set values at many nested paths within dict. The paths are grouped by common
+    prefix, so each intermediate level is looked up (or created) only once.
+    All paths are checked before anything is written, so on error target_dict is unchanged.
+
+        |   dict_set_many(doc, {'a.b.c': 1, 'a.b.d': 2, ('a', 'e'): 3})
+
+    @param target_dict: Dict to update
+    @param values:      dict of path -> value, or iterable of (path, value) pairs.
+                        Paths are nested path keys, or dotted strings.
+    @param extend:      If True, create missing intermediate levels as needed.
+                        If False, raise KeyError if an intermediate level is missing.
+
+    Raises KeyError if two paths conflict (one is the same as, or a prefix of, another),
+    or if an intermediate level is missing (and extend is False) or not a dict.
+    """
+    # Group the writes by parent path: parent path tuple -> dict of key -> value
+    groups = {}
+    for keys, value in (values.items() if isinstance(values, Mapping) else values):
+        path = tuple(keys.split('.')) if isinstance(keys, str) else tuple(keys)
+        if not path:
+            raise KeyError("No key specified")
+        leaves = groups.get(path[:-1])
+        if leaves is None:
+            leaves = groups[path[:-1]] = {}
+        elif path[-1] in leaves:
+            raise KeyError("Conflicting paths at %s: set twice" % ('.'.join(map(str, path)),))
+        leaves[path[-1]] = value
+
+    # The trie of intermediate levels: level path -> keys of the intermediate levels below it.
+    # A key cannot have both a value and an intermediate level.
+    below = {}
+    for parent in groups:
+        for idx in range(len(parent) - 1, -1, -1):
+            keys = below.get(parent[:idx])
+            if keys is None:
+                below[parent[:idx]] = {parent[idx]}
+            elif parent[idx] in keys:
+                break
+            else:
+                keys.add(parent[idx])
+    for parent, leaves in groups.items():
+        keys = below.get(parent)
+        if keys and not keys.isdisjoint(leaves):
+            raise KeyError("Conflicting paths at %s: a value and keys below it are both set"
+                           % ('.'.join(map(str, parent + (min(keys.intersection(leaves), key=str),))),))
+
+    # Look up (or create) each intermediate level once, without changing target_dict yet.
+    levels = {(): target_dict}
+    created = set()         # paths of new levels
+    attach = []             # (existing dict, key, new level)
+    for parent in groups:
+        if parent in levels:
+            continue
+        missing = []
+        path = parent
+        while path not in levels:
+            missing.append(path)
+            path = path[:-1]
+        level = levels[path]
+        for path in reversed(missing):
+            key = path[-1]
+            child = _NOTHING if path[:-1] in created else level.get(key, _NOTHING)
+            if child is _NOTHING:
+                if not extend:
+                    raise KeyError("Item at %s not found" % ('.'.join(map(str, path)),))
+                child = {}
+                if path[:-1] in created:
+                    level[key] = child
+                else:
+                    attach.append((level, key, child))
+                created.add(path)
+            elif not isinstance(child, _MUTABLE_MAPPING_TYPES):
+                raise KeyError("Item at %s not a dict" % ('.'.join(map(str, path)),))
+            levels[path] = level = child
+
+    # New levels are filled in before they are attached, since the existing dicts
+    # may convert (copy) assigned dicts, e.g. TrackedDictRecord.
+    for parent in created.intersection(groups):
+        levels[parent].update(groups[parent])
+    for level, key, child in attach:
+        level[key] = child
+    for parent, leaves in groups.items():
+        if parent in created:
+            continue
+        level = levels[parent]
+        if type(level) is dict:     # pylint: disable=unidiomatic-typecheck
+            level.update(leaves)
+        else:
+            # dict.update bypasses subclass __setitem__ (e.g. DictRecordRO)
+            for key, value in leaves.items():
+                level[key] = value
+    if _fingerprint_caches:
+        for level in [level for level, _, _ in attach] + [levels[parent] for parent in groups]:
+            fingerprint_invalidate(level)
@@ -0,0 +1,216 @@
+"""
+Streaming loaders that build DictRecords from JSON Lines and CSV files.
+
+Input is read in chunks of lines/rows; each chunk is parsed (and optionally
+type-coerced and normalized) either in-process or in a process pool.
+Records are produced in input order, and at most `max_pending` chunks
+are in flight at once, so memory use is bounded regardless of file size.
+"""
+import csv
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from .DictRecord import DictRecord
+from .dict_util import dict_get_nested, dict_set_nested
+
+_NOTHING = object()
+
+
+def _to_record(data, record_class, normalize):
+    """
+    Convert a parsed dict to record_class, converting nested dicts as well if normalize is True.
+    Nested records are built bottom-up, so read-only record classes work, too.
+    """
+    if normalize:
+        return record_class((key, _to_record(value, record_class, True) if isinstance(value, dict) else value)
+                            for key, value in data.items())
+    return record_class(data)
+
+
+def _coerce(data, schema):
+    """
+    Apply schema type coercion to a parsed dict, in place.
+
+    @param data:    Parsed dict
+    @param schema:  dict of key (or tuple of nested path keys) -> conversion callable
+    """
+    for key, convert in schema.items():
+        if isinstance(key, tuple):
+            value = dict_get_nested(data, key, _NOTHING)
+            if value is not _NOTHING and value is not None:
+                dict_set_nested(data, list(key), convert(value), extend=False)
+        else:
+            value = data.get(key)
+            if value is not None:
+                data[key] = convert(value)
+
+
+def _build_records(dicts, options):
+    """
+    Coerce and convert parsed dicts to records.
+    """
+    record_class, normalize, schema = options
+    records = []
+    for data in dicts:
+        if schema:
+            _coerce(data, schema)
+        records.append(_to_record(data, record_class, normalize) if record_class is not dict else data)
+    return records
+
+
+def _parse_jsonl_chunk(lines, options):
+    """
+    Parse a chunk of JSON Lines into records. Blank lines are skipped.
+    """
+    dicts = []
+    for line in lines:
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("JSON Lines record is not an object: %r" % (line[:80],))
+        dicts.append(data)
+    return _build_records(dicts, options)
+
+
+def _parse_csv_chunk(rows, fieldnames, options):
+    """
+    Convert a chunk of CSV rows into records. Missing trailing fields are None;
+    extra fields are ignored.
+    """
+    count = len(fieldnames)
+    dicts = [dict(zip(fieldnames, row if len(row) >= count else row + [None] * (count - len(row))))
+             for row in rows]
+    return _build_records(dicts, options)
+
+
+def _chunks(items, chunk_size):
+    """
+    Split an iterable into lists of up to chunk_size items.
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _map_ordered(func, chunks, args, workers, max_pending):
+    """
+    Yield func(chunk, *args) for each chunk, in order,
+    running in a process pool of `workers` processes if workers > 0.
+    """
+    if not workers:
+        for chunk in chunks:
+            yield func(chunk, *args)
+        return
+    max_pending = max_pending or 2 * workers
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(func, chunk, *args))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _emit(record_lists, batch_size, batch_factory):
+    """
+    Yield individual records, or batches of batch_size records.
+    """
+    if not batch_size:
+        for records in record_lists:
+            yield from records
+        return
+    batch = []
+    for records in record_lists:
+        batch.extend(records)
+        while len(batch) >= batch_size:
+            yield batch_factory(batch[:batch_size])
+            batch = batch[batch_size:]
+    if batch:
+        yield batch_factory(batch)
+
+
+def _open(source, **kwargs):
+    """
+    @return (file object, True if opened here and must be closed)
+    """
+    if hasattr(source, 'read'):
+        return source, False
+    return open(source, 'r', encoding=kwargs.pop('encoding', 'utf-8'), **kwargs), True
+
+
+def load_jsonl(source, record_class=DictRecord, normalize=True, schema=None,
+               batch_size=None, batch_factory=list,
+               workers=0, chunk_size=1000, max_pending=None, encoding='utf-8'):
+    """
+    Stream records from a JSON Lines file (one JSON object per line).
+
+        |   for rec in load_jsonl('export.jsonl', schema={'qty': int}, workers=4):
+        |       ...
+
+    @param source:          File path or text file object
+    @param record_class:    DictRecord, DictRecordRO or another dict class (dict for no conversion)
+    @param normalize:       If True, convert nested dicts to record_class, as well.
+    @param schema:          Optional dict of key (or tuple of nested path keys) -> conversion callable,
+                            applied to each record before conversion. None values are not converted.
+    @param batch_size:      If given, yield batches of this many records instead of single records.
+    @param batch_factory:   Callable that converts a list of records to a batch,
+                            e.g. DictRecordBatch.from_records. Defaults to list.
+    @param workers:         Number of worker processes for parsing; 0 to parse in-process.
+    @param chunk_size:      Lines per parsing chunk
+    @param max_pending:     Maximum chunks in flight (default 2 * workers)
+    @param encoding:        File encoding (when source is a path)
+
+    @return generator of records (or batches)
+    """
+    stream, owned = _open(source, encoding=encoding)
+    try:
+        options = (record_class, normalize, schema)
+        results = _map_ordered(_parse_jsonl_chunk, _chunks(stream, chunk_size), (options,), workers, max_pending)
+        yield from _emit(results, batch_size, batch_factory)
+    finally:
+        if owned:
+            stream.close()
+
+
+def load_csv(source, record_class=DictRecord, normalize=True, schema=None,
+             batch_size=None, batch_factory=list,
+             workers=0, chunk_size=1000, max_pending=None, encoding='utf-8',
+             fieldnames=None, **csv_options):
+    """
+    Stream records from a CSV file. All values are strings unless converted by schema.
+
+    @param source:          File path or text file object (opened with newline='')
+    @param fieldnames:      Field names. Defaults to the first row of the file.
+    @param csv_options:     Additional csv.reader options (delimiter, dialect, ...)
+
+    See `load_jsonl` for the other parameters.
+
+    @return generator of records (or batches)
+    """
+    stream, owned = _open(source, encoding=encoding, newline='')
+    try:
+        reader = csv.reader(stream, **csv_options)
+        if fieldnames is None:
+            fieldnames = next(reader, None)
+            if fieldnames is None:
+                return
+        fieldnames = list(fieldnames)
+        rows = (row for row in reader if row)
+        options = (record_class, normalize, schema)
+        results = _map_ordered(_parse_csv_chunk, _chunks(rows, chunk_size), (fieldnames, options),
+                               workers, max_pending)
+        yield from _emit(results, batch_size, batch_factory)
+    finally:
+        if owned:
+            stream.close()
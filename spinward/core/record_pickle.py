@@ -0,0 +1,83 @@
+"""
+Compact bulk serialization of lists of DictRecords (or dicts),
+e.g. for transport to and from process pool workers.
+
+Records are grouped by shape (record class plus top-level key sequence).
+Each shape's keys are stored once, in a shared key table,
+and each run of records with the same shape is stored as the shape index,
+the record count and a flat list of their values.
+"""
+import pickle
+from itertools import islice, repeat
+
+_FORMAT_VERSION = 1
+
+
+def pack_records(records):
+    """
+    Convert a sequence of records to a compact, picklable structure.
+    See `dumps_records`.
+
+    @param records:     Sequence of DictRecords, DictRecordROs, ShapedDictRecords or dicts
+
+    @return picklable tuple
+    """
+    shapes = {}
+    runs = []           # [shape index, record count] for each run of records with the same shape
+    values = []
+    last_shape = None
+    for rec in records:
+        shape = (rec.__class__, tuple(rec.keys()))
+        if shape == last_shape:
+            runs[-1][1] += 1
+        else:
+            shape_id = shapes.get(shape)
+            if shape_id is None:
+                shapes[shape] = shape_id = len(shapes)
+            runs.append([shape_id, 1])
+            last_shape = shape
+        values.extend(dict.values(rec) if isinstance(rec, dict) else rec.values())
+    return (_FORMAT_VERSION, list(shapes), runs, values)
+
+
+def unpack_records(packed):
+    """
+    Convert a structure created by `pack_records` back to a list of records.
+
+    @param packed:      Value returned by `pack_records`
+
+    @return list of records
+    """
+    version, shapes, runs, values = packed
+    if version != _FORMAT_VERSION:
+        raise ValueError("Unsupported packed records version %r" % (version,))
+    records = []
+    values = iter(values)
+    for shape_id, count in runs:
+        cls, keys = shapes[shape_id]
+        rows = islice(zip(*([values] * len(keys))), count) if keys else repeat((), count)
+        records.extend(map(cls, map(zip, repeat(keys), rows)))
+    return records
+
+
+def dumps_records(records, protocol=pickle.HIGHEST_PROTOCOL):
+    """
+    Pickle a sequence of records with a shared key table.
+
+    @param records:     Sequence of DictRecords, DictRecordROs or dicts
+    @param protocol:    Pickle protocol
+
+    @return bytes
+    """
+    return pickle.dumps(pack_records(records), protocol)
+
+
+def loads_records(data):
+    """
+    Unpickle records pickled by `dumps_records`.
+
+    @param data:    bytes returned by `dumps_records`
+
+    @return list of records
+    """
+    return unpack_records(pickle.loads(data))
@@ -0,0 +1,114 @@
+import unittest
+
+from spinward.core.DictRecord import DictRecord, DictRecordRO
+from spinward.core.DictRecordBatch import DictRecordBatch, numpy
+
+
+class DictRecordBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            DictRecord(id=idx, price=1.5 * idx, name='n%d' % idx, addr=DictRecord(zip='%05d' % idx))
+            for idx in range(5)
+        ]
+        self.batch = DictRecordBatch.from_records(self.records)
+
+
+    def test_roundtrip(self):
+        self.assertEqual(len(self.batch), 5)
+        actual = self.batch.to_records()
+        self.assertEqual(actual, self.records)
+        self.assertTrue(all(isinstance(rec, DictRecord) for rec in actual))
+        self.assertEqual(type(actual[0]['id']), int)
+
+
+    def test_to_records_class(self):
+        actual = self.batch.to_records(DictRecordRO)
+        self.assertTrue(isinstance(actual[0], DictRecordRO))
+
+
+    def test_mismatched_keys_raise(self):
+        with self.assertRaises(KeyError):
+            DictRecordBatch.from_records([dict(a=1), dict(b=2)])
+
+
+    def test_row_view(self):
+        row = self.batch[2]
+        self.assertEqual(row.id, 2)
+        self.assertEqual(row['name'], 'n2')
+        self.assertEqual(type(row.id), int)
+        self.assertEqual(row.get_nested(['addr', 'zip']), '00002')
+        self.assertEqual(row, self.records[2])
+        self.assertEqual(row.as_dict(), self.records[2].as_dict())
+        with self.assertRaises(AttributeError):
+            row.bogus
+
+
+    def test_row_write_through(self):
+        row = self.batch[1]
+        row.name = 'changed'
+        row.set_nested(['addr', 'zip'], '99999')
+        self.assertEqual(self.batch.to_records()[1].name, 'changed')
+        self.assertEqual(self.batch.column('addr')[1].zip, '99999')
+
+
+    def test_row_write_typed_columns(self):
+        batch = DictRecordBatch.from_records([dict(qty=1, price=1.5, flag=True), dict(qty=2, price=2.5, flag=False)])
+        row = batch[0]
+        row.qty = 3
+        row.price = 0.25
+        row['flag'] = False
+        self.assertEqual(batch.to_records()[0], dict(qty=3, price=0.25, flag=False))
+        if numpy is not None:
+            self.assertEqual(batch.column('qty').dtype, numpy.int64)
+            row.flag = numpy.bool_(True)
+            self.assertEqual(batch.column('flag').dtype, numpy.bool_)
+        # Values a typed column cannot hold exactly convert the column, rather than being truncated
+        row.qty = 2.75
+        row.price = None
+        row.flag = 5
+        self.assertEqual(batch.to_records(), [dict(qty=2.75, price=None, flag=5),
+                                              dict(qty=2, price=2.5, flag=False)])
+        self.assertEqual(type(batch[1].qty), int)
+        row = batch[1]
+        row.price = 2 ** 70
+        self.assertEqual(batch[1].price, 2 ** 70)
+        batch = DictRecordBatch.from_records([dict(qty=1), dict(qty=2)])
+        batch[1].qty = 2 ** 70
+        self.assertEqual([row.qty for row in batch], [1, 2 ** 70])
+
+
+    def test_typed_columns(self):
+        if numpy is not None:
+            self.assertEqual(self.batch.column('id').dtype, numpy.int64)
+            self.assertEqual(self.batch.column('price').dtype, numpy.float64)
+            self.assertEqual(self.batch.column('name').dtype, object)
+        else:
+            self.assertEqual(self.batch.column('id').typecode, 'q')
+            self.assertEqual(self.batch.column('price').typecode, 'd')
+
+
+    def test_map_column(self):
+        self.batch.map_column('id', lambda col: col, vectorized=True)
+        self.batch.map_column('price', lambda val: val * 2, vectorized=False)
+        self.assertEqual([row.price for row in self.batch], [3.0 * idx for idx in range(5)])
+
+
+    def test_filter_take(self):
+        mask = [rec.id % 2 == 0 for rec in self.records]
+        actual = self.batch.filter(mask).to_records()
+        self.assertEqual(actual, [rec for rec in self.records if rec.id % 2 == 0])
+        if numpy is not None:
+            actual = self.batch.filter(self.batch.column('id') % 2 == 0).to_records()
+            self.assertEqual(actual, [rec for rec in self.records if rec.id % 2 == 0])
+        actual = self.batch.take([4, 0]).to_records()
+        self.assertEqual(actual, [self.records[4], self.records[0]])
+
+
+    def test_set_column_length_raise(self):
+        with self.assertRaises(ValueError):
+            self.batch.set_column('extra', [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
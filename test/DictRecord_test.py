@@ -1,8 +1,11 @@
+import io
+import pickle
+import sys
 import unittest
-from copy import deepcopy
+from copy import copy, deepcopy
 from parameterized import parameterized
 
-from spinward.core.DictRecord import DictRecord
+from spinward.core.DictRecord import DictRecord, DictRecordRO, LazyDictRecord
 
 
 class dict_util_Test(unittest.TestCase):
@@ -124,5 +127,129 @@ class dict_util_Test(unittest.TestCase):
             actual.set_nested(keys, 1234, extend=extend)
 
 
+    def test_lazy_from_dict(self):
+        source = dict(a=1, b=dict(f=1, g=dict(h=2)), c=dict(x=3))
+        drec = DictRecord.from_dict(source, lazy=True)
+        self.assertTrue(isinstance(drec, LazyDictRecord))
+        self.assertIs(dict.__getitem__(drec, 'b'), source['b'])
+        sub = drec.b
+        self.assertTrue(isinstance(sub, LazyDictRecord))
+        self.assertIs(drec.b, sub)
+        self.assertIs(dict.__getitem__(drec, 'c'), source['c'])
+        self.assertIs(dict.__getitem__(sub, 'g'), source['b']['g'])
+        self.assertEqual(drec.get_nested(['b', 'g', 'h']), 2)
+        self.assertTrue(isinstance(dict.__getitem__(sub, 'g'), LazyDictRecord))
+
+
+    def test_lazy_whole_tree(self):
+        source = dict(a=1, b=dict(f=1, g=dict(h=2)), c=dict(x=3))
+        eager = DictRecord.from_dict(deepcopy(source))
+        lazy = DictRecord.from_dict(deepcopy(source), lazy=True)
+        self.assertEqual(lazy.as_dict(), source)
+        self.assertEqual(lazy.pretty_string_recursive(), eager.pretty_string_recursive())
+
+
+    def test_lazy_as_dict_copies(self):
+        source = dict(a=1, b=dict(f=1, g=dict(h=2)), c=dict(x=3))
+        lazy = DictRecord.from_dict(source, lazy=True)
+        lazy.b
+        actual = lazy.as_dict()
+        self.assertEqual(actual, dict(a=1, b=dict(f=1, g=dict(h=2)), c=dict(x=3)))
+        self.assertTrue(type(actual['b']) is dict and type(actual['b']['g']) is dict)
+        actual['b']['g']['h'] = 5
+        actual['c']['x'] = 5
+        self.assertEqual(source, dict(a=1, b=dict(f=1, g=dict(h=2)), c=dict(x=3)))
+        self.assertEqual(lazy.c.x, 3)
+        self.assertEqual(lazy.b.g.h, 2)
+
+
+    def test_lazy_update_recursive(self):
+        lazy = DictRecord.from_dict(dict(a=1, b=dict(f=1, g=2)), lazy=True)
+        lazy.update_recursive(dict(b=dict(g=5, h=dict(z=1)), d=4))
+        self.assertEqual(lazy, dict(a=1, b=dict(f=1, g=5, h=dict(z=1)), d=4))
+        self.assertTrue(isinstance(lazy.b.h, LazyDictRecord))
+
+
+    def test_getattr_missing_raise(self):
+        drec = DictRecord(a=1)
+        self.assertFalse(hasattr(drec, 'bogus'))
+        with self.assertRaises(AttributeError):
+            drec.bogus
+        with self.assertRaises(KeyError):
+            drec.bogus
+
+
+    @parameterized.expand([
+        (DictRecord,),
+        (DictRecordRO,),
+    ])
+    def test_pickle(self, cls):
+        drec = cls(a=1, b=cls(c=[1, 2]))
+        actual = pickle.loads(pickle.dumps(drec))
+        self.assertEqual(actual, drec)
+        self.assertIs(type(actual), cls)
+        self.assertIs(type(actual.b), cls)
+
+
+    @parameterized.expand([
+        (DictRecord,),
+        (DictRecordRO,),
+    ])
+    def test_copy(self, cls):
+        drec = cls(a=1, b=cls(c=[1, 2]))
+        shallow = copy(drec)
+        deep = deepcopy(drec)
+        self.assertIs(type(shallow), cls)
+        self.assertIs(type(deep), cls)
+        self.assertIs(shallow.b, drec.b)
+        self.assertIsNot(deep.b, drec.b)
+        self.assertIsNot(deep.b.c, drec.b.c)
+        self.assertEqual(deep, drec)
+
+
+    _pretty_expected = '\n'.join([
+        "a      : 1",
+        "bb     : f : 1",
+        "         g : x : 'y'",
+        "             z : ",
+        "longer : [1, 2]",
+    ])
+
+
+    def test_pretty_string_recursive(self):
+        drec = DictRecord.from_dict(dict(bb=dict(g=dict(z=dict(), x='y'), f=1), longer=[1, 2], a=1))
+        self.assertEqual(drec.pretty_string_recursive(), self._pretty_expected)
+
+
+    def test_pretty_string_recursive_plain_nested_dict(self):
+        drec = DictRecord(a=1, b=dict(c=2, d=dict(e=3)))
+        expected = DictRecord.from_dict(dict(a=1, b=dict(c=2, d=dict(e=3)))).pretty_string_recursive()
+        self.assertEqual(drec.pretty_string_recursive(), expected)
+        self.assertEqual(drec.pretty_string_recursive(return_rows=True), expected.split('\n'))
+
+
+    def test_iter_pretty_rows_deep(self):
+        depth = sys.getrecursionlimit() + 100
+        drec = DictRecord()
+        cur = drec
+        for _ in range(depth):
+            cur.k = DictRecord()
+            cur = cur.k
+        cur.k = 1
+        rows = list(drec.iter_pretty_rows())
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0].endswith('k : 1'))
+
+
+    def test_dump(self):
+        drec = DictRecord.from_dict(dict(a=1, b=dict(c=2)))
+        out = io.StringIO()
+        drec.dump(file=out)
+        self.assertEqual(out.getvalue(), drec.pretty_string_recursive() + '\n')
+        out = io.StringIO()
+        DictRecord().dump_recursive(file=out)
+        self.assertEqual(out.getvalue(), '\n')
+
+
 if __name__ == '__main__':
     unittest.main()
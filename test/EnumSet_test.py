@@ -0,0 +1,124 @@
+import copy
+import pickle
+import unittest
+
+from spinward.core.EnumType import EnumType, LargeEnumType
+from spinward.core.EnumSet import EnumSet, register_enum
+
+
+class EnumSetTest(unittest.TestCase):
+
+    OFFSET = 3
+    Perm = EnumType('READ', 'WRITE', 'ADMIN', 'EXEC', base=OFFSET)
+    Other = EnumType('READ', 'WRITE', 'ADMIN', 'EXEC')
+
+
+    def test_members(self):
+        perms = EnumSet(self.Perm, ['READ', self.Perm.ADMIN])
+        self.assertEqual(perms.mask, 0b101)
+        self.assertEqual(len(perms), 2)
+        self.assertEqual(list(perms), [self.Perm.READ, self.Perm.ADMIN])
+        self.assertEqual(perms.values(), [self.OFFSET, self.OFFSET + 2])
+        self.assertEqual(perms.names(), ['READ', 'ADMIN'])
+        self.assertIn('READ', perms)
+        self.assertIn(self.Perm.ADMIN, perms)
+        self.assertNotIn('WRITE', perms)
+        self.assertNotIn('bogus', perms)
+        self.assertNotIn(0, perms)
+        self.assertNotIn(None, perms)
+        self.assertTrue(perms)
+        self.assertFalse(EnumSet(self.Perm))
+        self.assertEqual(repr(perms), "EnumSet(['READ', 'ADMIN'])")
+
+
+    def test_unknown_raise(self):
+        with self.assertRaises(AttributeError):
+            EnumSet(self.Perm, ['bogus'])
+        with self.assertRaises(IndexError):
+            EnumSet(self.Perm, [0])
+        with self.assertRaises(IndexError):
+            EnumSet(self.Perm, [self.OFFSET + 4])
+        with self.assertRaises(ValueError):
+            EnumSet.from_mask(self.Perm, 1 << 4)
+
+
+    def test_operators(self):
+        rw = EnumSet(self.Perm, ['READ', 'WRITE'])
+        wa = EnumSet(self.Perm, ['WRITE', 'ADMIN'])
+        self.assertEqual((rw | wa).names(), ['READ', 'WRITE', 'ADMIN'])
+        self.assertEqual((rw & wa).names(), ['WRITE'])
+        self.assertEqual((rw - wa).names(), ['READ'])
+        self.assertEqual((rw ^ wa).names(), ['READ', 'ADMIN'])
+        self.assertEqual(rw.names(), ['READ', 'WRITE'])
+        self.assertTrue(EnumSet(self.Perm, ['WRITE']) <= rw)
+        self.assertTrue(rw >= EnumSet(self.Perm, ['WRITE']))
+        self.assertFalse(rw <= wa)
+        self.assertTrue(rw.isdisjoint(EnumSet(self.Perm, ['EXEC'])))
+        self.assertEqual(EnumSet.all(self.Perm).names(), self.Perm.names())
+        with self.assertRaises(TypeError):
+            rw | EnumSet(self.Other, ['READ'])     # pylint: disable=expression-not-assigned
+        with self.assertRaises(TypeError):
+            rw | {'ADMIN'}                          # pylint: disable=expression-not-assigned
+        self.assertNotEqual(rw, EnumSet(self.Other, ['READ', 'WRITE']))
+
+
+    def test_mutation(self):
+        perms = EnumSet(self.Perm)
+        perms.add('EXEC')
+        perms.update([self.Perm.READ, 'WRITE'])
+        perms.discard('WRITE')
+        perms.discard('ADMIN')
+        self.assertEqual(perms.names(), ['READ', 'EXEC'])
+        perms.remove('READ')
+        with self.assertRaises(KeyError):
+            perms.remove('READ')
+        perms |= EnumSet(self.Perm, ['ADMIN'])
+        perms -= EnumSet(self.Perm, ['EXEC'])
+        self.assertEqual(perms.names(), ['ADMIN'])
+        duplicate = copy.copy(perms)
+        perms.clear()
+        self.assertEqual(duplicate.names(), ['ADMIN'])
+        self.assertEqual(len(perms), 0)
+
+
+    def test_large_enum(self):
+        Codes = LargeEnumType.from_names('C%05d' % (idx,) for idx in range(1000))
+        codes = EnumSet(Codes, ['C00999', 'C00000'])
+        self.assertEqual(codes.names(), ['C00000', 'C00999'])
+        self.assertEqual(codes.mask, 1 | 1 << 999)
+
+
+    def test_pickle(self):
+        sets = [EnumSet(self.Perm, ['READ']), EnumSet(self.Perm, ['WRITE', 'EXEC'])]
+        copies = pickle.loads(pickle.dumps(sets))
+        self.assertEqual(copies, sets)
+        self.assertIs(copies[0].enum, copies[1].enum)
+        self.assertEqual(copies[1].names(), ['WRITE', 'EXEC'])
+        self.assertEqual((copies[0] | sets[1]).names(), ['READ', 'WRITE', 'EXEC'])
+        # Separately unpickled enums are interned
+        other = pickle.loads(pickle.dumps(sets[1]))
+        self.assertIs(other.enum, copies[0].enum)
+        self.assertIs(EnumSet(pickle.loads(pickle.dumps(self.Perm)), ['READ']).enum, other.enum)
+
+
+    def test_pickle_registered(self):
+        Codes = register_enum(LargeEnumType(*['C%d' % (idx,) for idx in range(10000)]))
+        codes = EnumSet(Codes, ['C1', 'C2'])
+        data = pickle.dumps(codes)
+        self.assertLess(len(data), 100)
+        actual = pickle.loads(data)
+        self.assertIs(actual.enum, Codes)
+        self.assertEqual(actual, codes)
+        # Equal enums share the registration
+        self.assertIs(register_enum(LargeEnumType(*Codes.names())), Codes)
+        self.assertEqual(pickle.dumps(EnumSet(LargeEnumType(*Codes.names()), ['C1', 'C2'])), data)
+
+
+    def test_name_base(self):
+        Parts = EnumType('top', 'base', 'cap')
+        self.assertEqual(Parts.base, 1)
+        self.assertEqual(EnumSet(Parts, ['base', Parts.cap]).values(), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
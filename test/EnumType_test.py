@@ -1,6 +1,7 @@
+import pickle
 import unittest
 
-from spinward.core.EnumType import EnumType
+from spinward.core.EnumType import EnumType, LargeEnumType, numpy
 
 
 class EnumTypeTest(unittest.TestCase):
@@ -116,5 +117,126 @@ class EnumTypeTest(unittest.TestCase):
         self.assertFalse(2 * self.STRINGS_COUNT in self.WgtTypes2)
 
 
+    def test_iter(self):
+        self.assertEqual(list(self.WgtTypes2), self.WgtTypes2.items())
+
+
+    def test_getitem_numeric_raise_negative(self):
+        with self.assertRaises(IndexError):
+            self.WgtTypes[-1]
+        with self.assertRaises(IndexError):
+            self.WgtTypes2[self.OFFSET - 1]
+
+
+    def test_values_names(self):
+        self.assertEqual(self.WgtTypes2.values(), list(range(self.OFFSET, self.OFFSET + self.STRINGS_COUNT)))
+        self.assertEqual(self.WgtTypes2.names(), self.STRINGS)
+        self.assertEqual(self.WgtTypes2.alpha, self.OFFSET + 1)
+
+
+    def test_encode(self):
+        names = ["int", "bogus", "string"]
+        self.assertEqual(list(self.WgtTypes2.encode(names)), [self.OFFSET + 3, -1, self.OFFSET])
+        values, mask = self.WgtTypes2.encode(names, unknown=0, return_mask=True)
+        self.assertEqual(list(values), [self.OFFSET + 3, 0, self.OFFSET])
+        self.assertEqual([bool(flag) for flag in mask], [False, True, False])
+        # Mask flags unknowns even where the sentinel is a valid value
+        values, mask = self.WgtTypes.encode(names, unknown=0, return_mask=True)
+        self.assertEqual([bool(flag) for flag in mask], [False, True, False])
+        if numpy is not None:
+            self.assertEqual(values.dtype, numpy.int64)
+
+
+    def test_decode(self):
+        values = [self.OFFSET + 1, 0, self.OFFSET + self.STRINGS_COUNT, self.OFFSET]
+        self.assertEqual(self.WgtTypes2.decode(values), ["alpha", None, None, "string"])
+        names, mask = self.WgtTypes2.decode(iter(values), unknown='?', return_mask=True)
+        self.assertEqual(names, ["alpha", '?', '?', "string"])
+        self.assertEqual(mask, [False, True, True, False])
+        self.assertEqual(list(self.WgtTypes2.decode(self.WgtTypes2.encode(self.STRINGS))), self.STRINGS)
+
+
+    def test_encode_decode_numpy(self):
+        if numpy is None:
+            self.skipTest('numpy not installed')
+        values, mask = self.WgtTypes2.encode(numpy.array(["money", "bogus"]), return_mask=True)
+        self.assertEqual(values.tolist(), [self.OFFSET + 5, -1])
+        self.assertEqual(mask.tolist(), [False, True])
+        names, mask = self.WgtTypes2.decode(values, return_mask=True)
+        self.assertEqual(names.tolist(), ["money", None])
+        self.assertEqual(mask.tolist(), [False, True])
+        self.assertEqual(self.WgtTypes2.decode(numpy.array([self.OFFSET])).tolist(), ["string"])
+        names, mask = EnumType().decode(numpy.array([0, 1]), unknown='?', return_mask=True)
+        self.assertEqual(names.tolist(), ['?', '?'])
+        self.assertEqual(mask.tolist(), [True, True])
+
+
+class LargeEnumTypeTest(unittest.TestCase):
+
+    NAMES = ['C%05d' % (idx,) for idx in range(1000)] + ['items']
+    OFFSET = 10
+
+    Codes = LargeEnumType.from_names(iter(NAMES), base=OFFSET)
+
+
+    def test_lookup(self):
+        self.assertEqual(self.Codes['C00003'], 3 + self.OFFSET)
+        self.assertEqual(self.Codes.C00003, 3 + self.OFFSET)
+        self.assertEqual(self.Codes['items'], 1000 + self.OFFSET)
+        self.assertEqual(self.Codes[self.OFFSET + 5], 'C00005')
+        self.assertIn('C00999', self.Codes)
+        self.assertIn(self.OFFSET, self.Codes)
+        self.assertNotIn('bogus', self.Codes)
+        self.assertNotIn(self.OFFSET - 1, self.Codes)
+        self.assertEqual(len(self.Codes), len(self.NAMES))
+
+
+    def test_lookup_raise(self):
+        with self.assertRaises(AttributeError):
+            self.Codes['bogus']
+        with self.assertRaises(AttributeError):
+            self.Codes.bogus        # pylint: disable=pointless-statement
+        with self.assertRaises(IndexError):
+            self.Codes[self.OFFSET - 1]
+        with self.assertRaises(IndexError):
+            self.Codes[self.OFFSET + len(self.NAMES)]
+
+
+    def test_views(self):
+        expected = [(idx + self.OFFSET, name) for idx, name in enumerate(self.NAMES)]
+        self.assertIs(self.Codes.items(), self.Codes.items())
+        self.assertEqual(self.Codes.items(), expected)
+        self.assertEqual(list(self.Codes), expected)
+        self.assertEqual(self.Codes.items()[-1], expected[-1])
+        self.assertEqual(self.Codes.items()[2:4], tuple(expected[2:4]))
+        self.assertIn(expected[7], self.Codes.items())
+        self.assertNotIn((expected[7][0], 'bogus'), self.Codes.items())
+        self.assertEqual(self.Codes.names(), tuple(self.NAMES))
+        self.assertEqual(list(self.Codes.values()), [value for value, _ in expected])
+
+
+    def test_interned(self):
+        name = ''.join(['C0', '0001'])
+        self.assertIs(LargeEnumType(name)[0], 'C00001')
+
+
+    def test_duplicate_raise(self):
+        with self.assertRaises(ValueError):
+            LargeEnumType('A', 'B', 'A')
+
+
+    def test_encode_decode(self):
+        names = ['C00010', 'bogus', 'items']
+        values = self.Codes.encode(names)
+        self.assertEqual(list(values), [self.OFFSET + 10, -1, self.OFFSET + 1000])
+        self.assertEqual(list(self.Codes.decode(values)), ['C00010', None, 'items'])
+
+
+    def test_pickle(self):
+        copy = pickle.loads(pickle.dumps(self.Codes))
+        self.assertEqual(copy.items(), self.Codes.items())
+        self.assertEqual(copy.C00001, self.Codes.C00001)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from parameterized import parameterized
+
+from spinward.core.DictRecord import DictRecord, DictRecordRO
+from spinward.core.MappedDictRecord import MappedDictRecordRO, encode_dict_record, write_dict_record
+
+
+class MappedDictRecordTest(unittest.TestCase):
+
+    _dict0 = dict(
+        name='config',
+        count=3,
+        big=2**80,
+        neg=-17,
+        ratio=0.25,
+        flags=dict(on=True, off=False, none=None),
+        raw=b'\x00\x01',
+        items=[1, 'two', dict(three=3)],
+        nested=dict(a=dict(b=dict(c='deep'))),
+        empty=dict(),
+    )
+
+
+    def setUp(self):
+        self.record = MappedDictRecordRO(encode_dict_record(DictRecord.from_dict(self._dict0)))
+
+
+    def test_as_dict_roundtrip(self):
+        self.assertEqual(self.record.as_dict(), self._dict0)
+
+
+    def test_iteration_order(self):
+        self.assertEqual(list(self.record), list(self._dict0))
+        self.assertEqual(len(self.record), len(self._dict0))
+
+
+    @parameterized.expand([  # keys, expected
+        ('name', 'config'),
+        ('big', 2**80),
+        ('flags.off', False),
+        ('nested.a.b.c', 'deep'),
+        ('nested.a.x', None),
+        ('name.x', None),
+    ])
+    def test_get_nested(self, keys, expected):
+        self.assertEqual(self.record.get_nested(keys.split('.')), expected)
+
+
+    def test_attribute_access(self):
+        self.assertEqual(self.record.nested.a.b.c, 'deep')
+        self.assertTrue(isinstance(self.record.nested, MappedDictRecordRO))
+        self.assertEqual(self.record['items'][2].three, 3)
+        self.assertFalse(hasattr(self.record, 'bogus'))
+        self.assertFalse('bogus' in self.record)
+        with self.assertRaises(KeyError):
+            self.record['bogus']
+
+
+    def test_read_only(self):
+        with self.assertRaises(AttributeError):
+            self.record.name = 'x'
+        with self.assertRaises(TypeError):
+            self.record['name'] = 'x'
+
+
+    def test_to_record(self):
+        actual = self.record.to_record()
+        self.assertTrue(isinstance(actual, DictRecordRO))
+        self.assertTrue(isinstance(actual.nested.a, DictRecordRO))
+        self.assertEqual(actual, self._dict0)
+
+
+    def test_pickle(self):
+        actual = pickle.loads(pickle.dumps(self.record))
+        self.assertTrue(isinstance(actual, DictRecordRO))
+        self.assertEqual(actual, self._dict0)
+
+
+    def test_encode_raise(self):
+        with self.assertRaises(TypeError):
+            encode_dict_record({1: 'x'})
+        with self.assertRaises(TypeError):
+            encode_dict_record(dict(x=object()))
+
+
+    def test_open_mmap(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            write_dict_record(self._dict0, path)
+            record = MappedDictRecordRO.open(path)
+            self.assertEqual(record.nested.a.b.c, 'deep')
+            self.assertEqual(record, self._dict0)
+            record.close()
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
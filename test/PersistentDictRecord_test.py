@@ -0,0 +1,97 @@
+import pickle
+import unittest
+
+from parameterized import parameterized
+
+from spinward.core.DictRecord import DictRecord
+from spinward.core.PersistentDictRecord import PersistentDictRecord
+
+
+class PersistentDictRecordTest(unittest.TestCase):
+
+    _dict0 = dict(
+        a=1,
+        b=dict(f=1, g=dict(h=2)),
+        c=dict(x=3),
+    )
+
+
+    def setUp(self):
+        self.base = PersistentDictRecord(self._dict0)
+
+
+    def test_construct(self):
+        self.assertTrue(isinstance(self.base.b, PersistentDictRecord))
+        self.assertEqual(self.base, self._dict0)
+        self.assertEqual(self.base.as_dict(), self._dict0)
+        self.assertEqual(self.base.b.g.h, 2)
+
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.base.a = 2
+        with self.assertRaises(TypeError):
+            self.base['a'] = 2
+
+
+    def test_set_nested_shares_subtrees(self):
+        derived = self.base.set_nested(['b', 'g', 'h'], 5)
+        self.assertEqual(derived.get_nested(['b', 'g', 'h']), 5)
+        self.assertEqual(self.base.get_nested(['b', 'g', 'h']), 2)
+        self.assertIs(derived.c, self.base.c)
+        self.assertIsNot(derived.b, self.base.b)
+
+
+    def test_set_nested_extend(self):
+        derived = self.base.set_nested(['d', 'e'], dict(z=1))
+        self.assertEqual(derived.d.e.z, 1)
+        self.assertTrue(isinstance(derived.d.e, PersistentDictRecord))
+        with self.assertRaises(KeyError):
+            self.base.set_nested(['d', 'e'], 1, extend=False)
+        with self.assertRaises(KeyError):
+            self.base.set_nested(['a', 'e'], 1)
+
+
+    def test_set_unchanged_returns_self(self):
+        self.assertIs(self.base.set_nested(['c'], self.base.c), self.base)
+        self.assertIs(self.base.update_recursive(dict(b=dict(g=self.base.b.g))), self.base)
+
+
+    def test_delete_nested(self):
+        derived = self.base.delete_nested(['b', 'g'])
+        self.assertEqual(derived.as_dict(), dict(a=1, b=dict(f=1), c=dict(x=3)))
+        self.assertIs(derived.c, self.base.c)
+        with self.assertRaises(KeyError):
+            self.base.delete_nested(['b', 'bogus'])
+
+
+    def test_update_recursive(self):
+        derived = self.base.update_recursive(dict(b=dict(g=dict(i=3)), d=4))
+        expected = DictRecord.from_dict(self._dict0)
+        expected.update_recursive(dict(b=dict(g=dict(i=3)), d=4))
+        self.assertEqual(derived.as_dict(), expected.as_dict())
+        self.assertIs(derived.c, self.base.c)
+
+
+    @parameterized.expand([
+        (dict(a=1, b=dict(c=2)), dict(b=dict(c=2), a=1), True),
+        (dict(a=1, b=dict(c=2)), dict(a=1, b=dict(c=3)), False),
+    ])
+    def test_hash_eq(self, dict0, dict1, equal):
+        rec0 = PersistentDictRecord(dict0)
+        rec1 = PersistentDictRecord(dict1)
+        self.assertEqual(rec0 == rec1, equal)
+        if equal:
+            self.assertEqual(hash(rec0), hash(rec1))
+        memo = {rec0: 'x'}
+        self.assertEqual(rec1 in memo, equal)
+
+
+    def test_pickle(self):
+        actual = pickle.loads(pickle.dumps(self.base))
+        self.assertEqual(actual, self.base)
+        self.assertTrue(isinstance(actual.b.g, PersistentDictRecord))
+
+
+if __name__ == '__main__':
+    unittest.main()
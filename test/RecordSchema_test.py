@@ -0,0 +1,95 @@
+import unittest
+
+from parameterized import parameterized
+
+from spinward.core.DictRecord import DictRecord
+from spinward.core.RecordSchema import RecordSchema
+
+
+_schema_fields = {
+    'id':           int,
+    'name':         dict(type=str, nullable=True),
+    'addr.zip':     dict(type=str, required=False),
+    'addr.city':    str,
+    'age':          dict(type=int, min=0, max=150),
+    'kind':         dict(choices=('a', 'b')),
+    ('tags',):      dict(type=list, required=False),
+}
+
+
+def _valid():
+    return DictRecord.from_dict(dict(id=1, name='x', addr=dict(zip='80301', city='Boulder'), age=30, kind='a'))
+
+
+class RecordSchemaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = RecordSchema(_schema_fields)
+
+
+    def test_valid(self):
+        self.assertEqual(self.schema.validate(_valid()), [])
+        self.assertTrue(self.schema.is_valid(_valid().as_dict()))
+
+
+    @parameterized.expand([
+        (('id',), None, ['id: required']),
+        (('name',), None, ['name: required']),
+        (('addr', 'zip'), None, []),
+        (('addr',), None, ['addr.city: required']),
+        (('kind',), None, ['kind: required']),
+    ])
+    def test_missing(self, keys, _, expected):
+        rec = _valid()
+        parent = rec.get_nested(keys[:-1]) if len(keys) > 1 else rec
+        del parent[keys[-1]]
+        self.assertEqual(self.schema.validate(rec), expected)
+
+
+    @parameterized.expand([
+        ('id', None, ['id: is None']),
+        ('name', None, []),
+        ('id', '1', ['id: wrong type str']),
+        ('age', -1, ['age: -1 below minimum 0']),
+        ('age', 151, ['age: 151 above maximum 150']),
+        ('age', 'old', ['age: wrong type str']),
+        ('kind', 'c', ["kind: 'c' not an allowed value"]),
+        ('addr', 'Boulder', ['addr.city: required']),
+    ])
+    def test_invalid_value(self, key, value, expected):
+        rec = _valid()
+        rec[key] = value
+        self.assertEqual(self.schema.validate(rec), expected)
+
+
+    def test_validate_many(self):
+        recs = [_valid(), dict(id='x'), _valid()]
+        recs[2].age = 200
+        results = self.schema.validate_many(recs)
+        self.assertEqual(results, [self.schema.validate(rec) for rec in recs])
+        self.assertEqual(results[0], [])
+        self.assertEqual(results[1], ['id: wrong type str', 'name: required', 'addr.city: required',
+                                      'age: required', 'kind: required'])
+        self.assertEqual(results[2], ['age: 200 above maximum 150'])
+
+
+    def test_untyped_not_comparable(self):
+        schema = RecordSchema({'age': dict(min=0, max=10), 'tag': dict(choices={'a', 'b'})})
+        self.assertEqual(schema.validate(dict(age='old', tag=['a'])),
+                         ['age: str value not comparable', 'tag: list value not comparable'])
+        self.assertEqual(schema.validate_many([dict(age='old', tag='a'), dict(age=11, tag='a')]),
+                         [['age: str value not comparable'], ['age: 11 above maximum 10']])
+
+
+    def test_shared_prefix_fetched_once(self):
+        # 6 top-level keys and 2 keys below 'addr', in each of validate and validate_many
+        self.assertEqual(self.schema.source.count('.get('), (6 + 2) * 2)
+
+
+    def test_unknown_rule_raise(self):
+        with self.assertRaises(ValueError):
+            RecordSchema({'id': dict(type=int, minimum=0)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+
+from parameterized import parameterized
+
+from spinward.core.DictRecord import DictRecord
+from spinward.core.RecordStore import RecordStore
+
+
+def _make_records():
+    return [DictRecord.from_dict(dict(id=idx, age=20 + idx % 10, name='name%02d' % idx,
+                                      addr=dict(zip='8030%d' % (idx % 3))))
+            for idx in range(30)]
+
+
+class RecordStoreTest(unittest.TestCase):
+
+    _conditions = [
+        ([('addr.zip', '==', '80301')],),
+        ([('age', 'between', (22, 24))],),
+        ([('age', '<', 22), ('addr.zip', '==', '80300')],),
+        ([('age', '>=', 28)],),
+        ([('age', '>', 28), ('age', '<=', 29)],),
+        ([('name', 'prefix', 'name1')],),
+        ([('addr.zip', 'in', ['80300', '80302']), ('id', '<', 10)],),
+        ([('addr.zip', '==', 'bogus')],),
+        ([('missing.path', '==', 1)],),
+    ]
+
+
+    def setUp(self):
+        self.records = _make_records()
+        self.indexed = RecordStore(self.records)
+        self.indexed.add_index('addr.zip')
+        self.indexed.add_index(['age'], sorted=True)
+        self.indexed.add_index('name', sorted=True)
+        self.scan = RecordStore(self.records)
+
+
+    @parameterized.expand(_conditions)
+    def test_find_matches_scan(self, conditions):
+        expected = [rec for rec in self.records
+                    if all(self._check(rec, *cond) for cond in conditions)]
+        self.assertEqual(self.indexed.find(*conditions), expected)
+        self.assertEqual(self.scan.find(*conditions), expected)
+
+
+    @staticmethod
+    def _check(rec, keys, op, operand):
+        value = rec.get_nested(keys.split('.'))
+        if value is None:
+            return False
+        return {
+            '==': lambda: value == operand,
+            '<': lambda: value < operand,
+            '<=': lambda: value <= operand,
+            '>': lambda: value > operand,
+            '>=': lambda: value >= operand,
+            'between': lambda: operand[0] <= value <= operand[1],
+            'in': lambda: value in operand,
+            'prefix': lambda: value.startswith(operand),
+        }[op]()
+
+
+    def test_incremental_update(self):
+        rid = self.indexed.find_ids(('id', '==', 4))[0]
+        self.indexed.set_nested(rid, 'addr.zip', '99999')
+        self.assertEqual([rec.id for rec in self.indexed.find(('addr.zip', '==', '99999'))], [4])
+        self.assertNotIn(4, [rec.id for rec in self.indexed.find(('addr.zip', '==', '80301'))])
+
+        self.indexed.update(rid, DictRecord.from_dict(dict(id=4, age=99, name='x', addr=dict(zip='1'))))
+        self.assertEqual(self.indexed.find(('addr.zip', '==', '99999')), [])
+        self.assertEqual([rec.id for rec in self.indexed.find(('age', '>', 90))], [4])
+
+
+    def test_insert_delete(self):
+        rid = self.indexed.insert(DictRecord.from_dict(dict(id=100, age=50, name='new', addr=dict(zip='80301'))))
+        self.assertIn(100, [rec.id for rec in self.indexed.find(('addr.zip', '==', '80301'))])
+        self.assertEqual(self.indexed.delete(rid).id, 100)
+        self.assertNotIn(100, [rec.id for rec in self.indexed.find(('addr.zip', '==', '80301'))])
+        self.assertEqual(self.indexed.find(('age', '==', 50)), [])
+        self.assertEqual(len(self.indexed), 30)
+
+
+    def test_unhashable_values(self):
+        store = RecordStore([DictRecord(tags=['a']), DictRecord(tags='a')])
+        store.add_index('tags')
+        self.assertEqual(store.find(('tags', '==', ['a'])), [DictRecord(tags=['a'])])
+        self.assertEqual(store.find(('tags', '==', 'a')), [DictRecord(tags='a')])
+
+
+    def test_sorted_index_incomparable(self):
+        records = [dict(age=1), dict(age='x'), dict(age=None), dict(age=3), dict(name='n')]
+        scan = RecordStore(records)
+        store = RecordStore(records)
+        store.add_index('age', sorted=True)
+        for condition in [('age', '==', 'x'), ('age', '==', None), ('age', '<', 2), ('age', '>=', 'a'),
+                          ('age', 'between', (0, 5)), ('age', 'prefix', 'x')]:
+            self.assertEqual(store.find_ids(condition), scan.find_ids(condition))
+        rid = store.insert(dict(age=[2]))
+        self.assertEqual(store.find_ids(('age', '==', [2])), [rid])
+        store.delete(rid)
+        self.assertEqual(store.find_ids(('age', '==', [2])), [])
+        empty = RecordStore([dict(age=None)])
+        empty.add_index('age', sorted=True)
+        self.assertEqual(empty.find_ids(('age', '==', None)), [0])
+
+
+    def test_insert_atomic(self):
+        class Failing(object):
+            def __lt__(self, other):
+                raise ValueError("comparison failed")
+        store = RecordStore([dict(a=1, b=1)])
+        store.add_index('a')
+        store.add_index('b', sorted=True)
+        with self.assertRaises(ValueError):
+            store.insert(dict(a=2, b=Failing()))
+        self.assertEqual(store.find_ids(('a', '==', 2)), [])
+        self.assertEqual(len(store), 1)
+
+
+    def test_set_nested_plain_dict(self):
+        store = RecordStore([dict(addr=dict(zip='1'))])
+        store.add_index('addr.zip')
+        store.set_nested(0, 'addr.zip', '2')
+        self.assertEqual(store.find_ids(('addr.zip', '==', '2')), [0])
+
+
+    def test_unknown_operator_raise(self):
+        with self.assertRaises(ValueError):
+            self.scan.find(('age', '~', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
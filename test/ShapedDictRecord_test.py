@@ -0,0 +1,151 @@
+import io
+import pickle
+import unittest
+from copy import deepcopy
+
+from parameterized import parameterized
+
+from spinward.core.DictRecord import DictRecord
+from spinward.core.RecordStore import RecordStore
+from spinward.core.dict_util import compile_path, dict_get_nested, dict_project, dict_set_nested
+from spinward.core.record_pickle import dumps_records, loads_records
+from spinward.core.ShapedDictRecord import EMPTY_SHAPE, SHAPE_CACHE_SIZE, RecordShape, ShapedDictRecord
+
+
+class ShapedDictRecordTest(unittest.TestCase):
+
+    _dict0 = dict(
+        a=1,
+        b=dict(f=1, g=2),
+        c=3,
+    )
+
+
+    def test_shared_shape(self):
+        rec0 = ShapedDictRecord(a=1, b=2)
+        rec1 = ShapedDictRecord(a=3, b=4)
+        self.assertIs(rec0._shape, rec1._shape)
+        rec1['c'] = 5
+        rec0.c = 6
+        self.assertIs(rec0._shape, rec1._shape)
+        self.assertIs(RecordShape.for_keys(['a', 'b', 'c']), rec0._shape)
+
+
+    def test_shapes_bounded(self):
+        records = [ShapedDictRecord({'unique_%d' % (idx,): idx, 'x': 1}) for idx in range(2 * SHAPE_CACHE_SIZE)]
+        shape = records[0]._shape
+        self.assertIs(RecordShape.for_keys(['unique_0', 'x']), shape)
+        del records
+        # Only the most recently created shapes are kept without records
+        self.assertLessEqual(sum(key.startswith('unique_') for key in EMPTY_SHAPE._transitions), SHAPE_CACHE_SIZE)
+        self.assertIs(RecordShape.for_keys(['unique_0', 'x']), shape)
+
+
+    def test_dict_api(self):
+        rec = ShapedDictRecord.from_dict(self._dict0)
+        self.assertEqual(rec, self._dict0)
+        self.assertEqual(list(rec), ['a', 'b', 'c'])
+        self.assertEqual(len(rec), 3)
+        self.assertEqual(rec.b.g, 2)
+        self.assertEqual(rec['a'], 1)
+        self.assertTrue(isinstance(rec.b, ShapedDictRecord))
+        self.assertFalse(hasattr(rec, 'bogus'))
+        with self.assertRaises(KeyError):
+            rec['bogus']
+
+
+    def test_delete(self):
+        rec = ShapedDictRecord(a=1, b=2, c=3)
+        del rec['b']
+        self.assertEqual(rec, dict(a=1, c=3))
+        self.assertIs(rec._shape, RecordShape.for_keys(['a', 'c']))
+        del rec['a']
+        del rec['c']
+        self.assertIs(rec._shape, EMPTY_SHAPE)
+
+
+    def test_as_dict(self):
+        rec = ShapedDictRecord.from_dict(self._dict0)
+        actual = rec.as_dict()
+        self.assertEqual(actual, self._dict0)
+        self.assertIs(type(actual['b']), dict)
+
+
+    @parameterized.expand([  # keys, default, expected
+        ('b.g', None, 2),
+        ('b.z', None, None),
+        ('a.z', 5, 5),
+    ])
+    def test_get_nested(self, keys, default, expected):
+        rec = ShapedDictRecord.from_dict(self._dict0)
+        self.assertEqual(rec.get_nested(keys.split('.'), default), expected)
+
+
+    def test_set_nested(self):
+        rec = ShapedDictRecord.from_dict(self._dict0)
+        rec.set_nested(['b', 'x', 'y'], 7)
+        self.assertEqual(rec.as_dict(), dict(a=1, b=dict(f=1, g=2, x=dict(y=7)), c=3))
+        with self.assertRaises(KeyError):
+            rec.set_nested(['a', 'x'], 1)
+        with self.assertRaises(KeyError):
+            rec.set_nested(['d', 'x'], 1, extend=False)
+
+
+    def test_update_recursive(self):
+        update = dict(b=dict(g=5, h=dict(z=1)), d=4)
+        rec = ShapedDictRecord.from_dict(deepcopy(self._dict0))
+        rec.update_recursive(update)
+        expected = DictRecord.from_dict(deepcopy(self._dict0))
+        expected.update_recursive(update)
+        self.assertEqual(rec.as_dict(), expected.as_dict())
+        self.assertTrue(isinstance(rec.b.h, ShapedDictRecord))
+
+
+    def test_pretty_string(self):
+        rec = ShapedDictRecord.from_dict(self._dict0)
+        expected = DictRecord.from_dict(deepcopy(self._dict0))
+        self.assertEqual(rec.pretty_string(keys=['a', 'c']), expected.pretty_string(keys=['a', 'c']))
+        self.assertEqual(rec.pretty_string_recursive(), expected.pretty_string_recursive())
+        self.assertEqual(list(rec.iter_pretty_rows()), list(expected.iter_pretty_rows()))
+        actual, out = io.StringIO(), io.StringIO()
+        rec.dump_recursive(file=actual)
+        expected.dump_recursive(file=out)
+        self.assertEqual(actual.getvalue(), out.getvalue())
+
+
+    def test_copy_or(self):
+        rec = ShapedDictRecord.from_dict(self._dict0)
+        other = rec.copy()
+        other.a = 5
+        self.assertEqual(rec.a, 1)
+        self.assertIs(other.b, rec.b)
+        self.assertEqual((rec | {'d': 4}).as_dict(), dict(self._dict0, d=4))
+        self.assertEqual(({'a': 0, 'd': 4} | rec).as_dict(), dict(self._dict0, d=4))
+        rec |= {'a': 2}
+        self.assertEqual(rec.a, 2)
+
+
+    def test_dict_util(self):
+        records = [ShapedDictRecord.from_dict({'id': idx, 'addr': {'zip': '%05d' % (idx,)}}) for idx in range(3)]
+        self.assertEqual(dict_get_nested(records[1], ['addr', 'zip']), '00001')
+        self.assertEqual(compile_path('addr.zip').get(records[2]), '00002')
+        self.assertEqual(dict_project(records, ['id', 'addr.zip']), [[0, 1, 2], ['00000', '00001', '00002']])
+        dict_set_nested(records[0], ['addr', 'zip'], '99999')
+        self.assertEqual(records[0].addr.zip, '99999')
+        store = RecordStore(records)
+        store.add_index('addr.zip')
+        self.assertEqual(store.find(('addr.zip', '==', '00001')), [records[1]])
+        actual = loads_records(dumps_records(records))
+        self.assertEqual(actual, records)
+        self.assertTrue(all(isinstance(rec, ShapedDictRecord) for rec in actual))
+
+
+    def test_pickle(self):
+        rec = ShapedDictRecord.from_dict(self._dict0)
+        actual = pickle.loads(pickle.dumps(rec))
+        self.assertEqual(actual, rec)
+        self.assertIs(actual._shape, rec._shape)
+
+
+if __name__ == '__main__':
+    unittest.main()
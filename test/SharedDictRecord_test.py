@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from spinward.core.SharedDictRecord import SharedDictRecordRO
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _lookup(args):
+    record, keys = args
+    return record.get_nested(keys)
+
+
+class SharedDictRecordTest(unittest.TestCase):
+
+    _dict0 = dict(
+        zip_codes={'80301': 'Boulder', '10001': 'New York'},
+        rates=dict(tax=0.08, tiers=[1, 2, 3]),
+    )
+
+
+    def setUp(self):
+        self.shared = SharedDictRecordRO.publish(self._dict0)
+
+
+    def tearDown(self):
+        self.shared.unlink()
+
+
+    def test_read(self):
+        self.assertEqual(self.shared.zip_codes['80301'], 'Boulder')
+        self.assertEqual(self.shared.as_dict(), self._dict0)
+
+
+    def test_attach(self):
+        attached = SharedDictRecordRO.attach(self.shared.name)
+        self.assertEqual(attached.rates.tax, 0.08)
+        self.assertEqual(attached, self._dict0)
+        attached.close()
+
+
+    def test_pickle_by_name(self):
+        data = pickle.dumps(self.shared)
+        self.assertLess(len(data), 200)
+        actual = pickle.loads(data)
+        self.assertTrue(isinstance(actual, SharedDictRecordRO))
+        self.assertEqual(actual.name, self.shared.name)
+        self.assertEqual(actual.get_nested(['rates', 'tiers']), (1, 2, 3))
+        actual.close()
+
+
+    def test_attach_other_process(self):
+        # Attaching processes must not destroy the block when they exit.
+        script = ("import sys; from spinward.core.SharedDictRecord import SharedDictRecordRO; "
+                  "print(SharedDictRecordRO.attach(sys.argv[1]).zip_codes['80301'])")
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [_ROOT, env.get('PYTHONPATH')]))
+        for _ in range(2):
+            output = subprocess.run([sys.executable, '-c', script, self.shared.name], env=env,
+                                    check=True, capture_output=True, text=True)
+            self.assertEqual(output.stdout.strip(), 'Boulder')
+            self.assertEqual(output.stderr, '')
+
+
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), "requires fork")
+    def test_pool_workers(self):
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as pool:
+            actual = list(pool.map(_lookup, [(self.shared, ['zip_codes', '10001']),
+                                             (self.shared, ['rates', 'tax'])]))
+        self.assertEqual(actual, ['New York', 0.08])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import pickle
+import unittest
+
+from parameterized import parameterized
+
+from spinward.core.SlotRecord import SlotRecord, make_slot_record
+
+
+Point = make_slot_record('Point', {'x': None, 'y': None, 'meta': {'tag': None, 'extra': None}})
+Flat = make_slot_record('Flat', ['a', 'b', 'c'])
+Deep = make_slot_record('Deep', {'inner': {'leaf': {'value': None}}})
+
+
+class SlotRecordTest(unittest.TestCase):
+
+    _dict0 = dict(x=1, y=2, meta=dict(tag='a', extra=dict(f=1)))
+
+
+    def test_from_dict_as_dict_roundtrip(self):
+        rec = Point.from_dict(self._dict0)
+        self.assertTrue(isinstance(rec, SlotRecord))
+        self.assertTrue(isinstance(rec.meta, SlotRecord))
+        self.assertEqual(rec.meta.tag, 'a')
+        self.assertEqual(rec.as_dict(), self._dict0)
+
+
+    def test_no_instance_dict(self):
+        rec = Flat(1, 2, 3)
+        self.assertFalse(hasattr(rec, '__dict__'))
+        with self.assertRaises(AttributeError):
+            rec.d = 4
+
+
+    def test_missing_fields_default_none(self):
+        rec = Point.from_dict(dict(x=1))
+        self.assertEqual(rec.as_dict(), dict(x=1, y=None, meta=None))
+
+
+    def test_from_dict_unknown_key_raise(self):
+        with self.assertRaises(KeyError):
+            Flat.from_dict(dict(a=1, z=2))
+
+
+    def test_invalid_field_raise(self):
+        with self.assertRaises(ValueError):
+            make_slot_record('Bad', ['ok', 'not ok'])
+        with self.assertRaises(ValueError):
+            make_slot_record('Bad', ['a', 'a'])
+        for field in ('keys', 'get_nested', 'from_dict', 'as_dict', '_fields', '__init__', 'self'):
+            with self.assertRaises(ValueError):
+                make_slot_record('Bad', ['a', field])
+        with self.assertRaises(ValueError):
+            make_slot_record('Bad', {'a': ['keys']})
+
+
+    @parameterized.expand([  # keys, default, expected
+        ('x', None, 1),
+        ('meta.tag', None, 'a'),
+        ('meta.extra.f', None, 1),
+        ('meta.extra.z', 5, 5),
+        ('meta.bogus', None, None),
+        ('x.y', None, None),
+    ])
+    def test_get_nested(self, keys, default, expected):
+        rec = Point.from_dict(self._dict0)
+        self.assertEqual(rec.get_nested(keys.split('.'), default), expected)
+
+
+    def test_set_nested(self):
+        rec = Point.from_dict(dict(x=1))
+        rec.set_nested(['meta', 'tag'], 'b')
+        rec.set_nested(['meta', 'extra', 'g', 'h'], 2)
+        self.assertEqual(rec.as_dict(), dict(x=1, y=None, meta=dict(tag='b', extra=dict(g=dict(h=2)))))
+
+
+    def test_set_nested_keyerror(self):
+        rec = Point.from_dict(dict(x=1))
+        with self.assertRaises(KeyError):
+            rec.set_nested(['meta', 'tag'], 'b', extend=False)
+        with self.assertRaises(KeyError):
+            rec.set_nested(['bogus', 'tag'], 'b')
+        with self.assertRaises(KeyError):
+            rec.set_nested(['x', 'tag'], 'b')
+
+
+    def test_pretty_string(self):
+        rec = Flat(1, 'two', 3)
+        self.assertEqual(rec.pretty_string(), "a : 1\nb : 'two'\nc : 3")
+
+
+    def test_pickle(self):
+        rec = Flat(1, [2], 'three')
+        self.assertEqual(pickle.loads(pickle.dumps(rec)), rec)
+
+
+    def test_pickle_nested(self):
+        for rec in (Point.from_dict({'x': 1, 'meta': {'tag': 'a'}}),
+                    Deep.from_dict({'inner': {'leaf': {'value': 5}}})):
+            for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+                actual = pickle.loads(pickle.dumps(rec, protocol))
+                self.assertEqual(actual, rec)
+                self.assertEqual(actual.as_dict(), rec.as_dict())
+        self.assertIs(pickle.loads(pickle.dumps(Deep.from_dict({'inner': {'leaf': {}}}).inner.leaf)).__class__,
+                      Deep._nested['inner']._nested['leaf'])     # pylint: disable=protected-access
+
+
+    def test_as_dict_plain_nested_dict(self):
+        self.assertEqual(Point(meta={'tag': 1}).as_dict(), {'x': None, 'y': None, 'meta': {'tag': 1}})
+
+
+    def test_invalid_name_raise(self):
+        for name in ("O'Brien", 'not ok', 'class', ''):
+            with self.assertRaises(ValueError):
+                make_slot_record(name, ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
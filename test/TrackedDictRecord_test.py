@@ -0,0 +1,165 @@
+import pickle
+import unittest
+from copy import deepcopy
+
+from spinward.core.DictRecord import DictRecord
+from spinward.core.TrackedDictRecord import TrackedDictRecord
+from spinward.core.dict_util import DELTA_DELETE, DELTA_SET, compile_path, dict_patch, dict_set_many
+from spinward.core.dict_util import dict_set_nested, dict_unflatten, dict_update_recursive
+
+
+class TrackedDictRecordTest(unittest.TestCase):
+
+    _dict0 = dict(
+        a=1,
+        b=dict(f=1, g=dict(h=2)),
+        c=dict(x=3),
+    )
+
+
+    def setUp(self):
+        self.rec = TrackedDictRecord.from_dict(deepcopy(self._dict0))
+
+
+    def assertDeltaReproduces(self):
+        target = deepcopy(self._dict0)
+        dict_patch(target, self.rec.export_delta())
+        self.assertEqual(target, self.rec.as_dict())
+
+
+    def test_no_changes(self):
+        self.assertEqual(self.rec.export_delta(), [])
+        self.assertTrue(isinstance(self.rec.b.g, TrackedDictRecord))
+        self.assertEqual(self.rec, self._dict0)
+
+
+    def test_nested_setattr_setitem(self):
+        self.rec.b.g.h = 5
+        self.rec.c['y'] = 4
+        self.assertEqual(self.rec.export_delta(), [
+            (DELTA_SET, ('b', 'g', 'h'), 5),
+            (DELTA_SET, ('c', 'y'), 4),
+        ])
+        self.assertDeltaReproduces()
+
+
+    def test_set_nested_extend(self):
+        self.rec.set_nested(['d', 'e', 'f'], 6)
+        self.rec.d.e.g = 7
+        self.assertEqual(self.rec.export_delta(), [(DELTA_SET, ('d',), dict(e=dict(f=6, g=7)))])
+        self.assertDeltaReproduces()
+
+
+    def test_delete(self):
+        self.rec.b.g.h = 5
+        del self.rec.b.g
+        del self.rec['a']
+        self.assertEqual(self.rec.export_delta(), [
+            (DELTA_DELETE, ('b', 'g'), None),
+            (DELTA_DELETE, ('a',), None),
+        ])
+        self.assertDeltaReproduces()
+
+
+    def test_popitem_ior(self):
+        key, _ = self.rec.c.popitem()
+        self.rec |= dict(z=1)
+        level = self.rec.b
+        level |= [('f', 2)]
+        self.assertEqual(self.rec.export_delta(), [
+            (DELTA_DELETE, ('c', key), None),
+            (DELTA_SET, ('z',), 1),
+            (DELTA_SET, ('b', 'f'), 2),
+        ])
+        self.assertIsInstance(self.rec, TrackedDictRecord)
+        self.assertDeltaReproduces()
+
+
+    def test_update_recursive(self):
+        self.rec.update_recursive(dict(b=dict(g=dict(i=3)), d=4))
+        self.assertEqual(self.rec.changed_paths(), {('b', 'g', 'i'): DELTA_SET, ('d',): DELTA_SET})
+        expected = DictRecord.from_dict(deepcopy(self._dict0))
+        expected.update_recursive(dict(b=dict(g=dict(i=3)), d=4))
+        self.assertEqual(self.rec, expected)
+        self.assertDeltaReproduces()
+
+
+    def test_delta_values_are_copies(self):
+        self.rec.b = dict(new=[1])
+        delta = self.rec.export_delta()
+        self.rec.b.new.append(2)
+        self.assertEqual(delta, [(DELTA_SET, ('b',), dict(new=[1]))])
+        self.assertIs(type(delta[0][2]), dict)
+
+
+    def test_clear_changes(self):
+        self.rec.a = 2
+        self.rec.clear_changes()
+        self.assertEqual(self.rec.export_delta(), [])
+        self.rec.c.x = 9
+        self.assertEqual(self.rec.export_delta(), [(DELTA_SET, ('c', 'x'), 9)])
+
+
+    def test_apply_delta(self):
+        self.rec.b.g.h = 5
+        del self.rec.c
+        other = TrackedDictRecord.from_dict(deepcopy(self._dict0))
+        other.apply_delta(self.rec.export_delta())
+        self.assertEqual(other, self.rec)
+        self.assertEqual(other.export_delta(), self.rec.export_delta())
+
+
+    def test_dict_util_writers(self):
+        dict_set_nested(self.rec, ['d', 'e'], 1)
+        compile_path('x.y').set(self.rec, 2)
+        dict_set_many(self.rec, {'z.w': 3, 'b.g.i': 4, 'c.v.u': 5})
+        self.assertEqual(self.rec.d, dict(e=1))
+        self.assertEqual(self.rec.x, dict(y=2))
+        self.assertEqual(self.rec.z, dict(w=3))
+        self.assertEqual(self.rec.export_delta(), [
+            (DELTA_SET, ('d',), dict(e=1)),
+            (DELTA_SET, ('x',), dict(y=2)),
+            (DELTA_SET, ('z',), dict(w=3)),
+            (DELTA_SET, ('c', 'v'), dict(u=5)),
+            (DELTA_SET, ('b', 'g', 'i'), 4),
+        ])
+        self.assertDeltaReproduces()
+
+
+    def test_dict_util_copy_and_unflatten(self):
+        updated = dict_update_recursive(self.rec, dict(b=dict(g=dict(h=9))), in_place=False)
+        self.assertEqual(updated.b.g.h, 9)
+        self.assertEqual(self.rec.b.g.h, 2)
+        record = next(dict_unflatten([{'a.b.c': 1, 'a.d': 2}], record_class=TrackedDictRecord))
+        self.assertEqual(record, dict(a=dict(b=dict(c=1), d=2)))
+
+
+    def test_supersede(self):
+        self.rec.set_nested(['b', 'g', 'i'], 3)
+        self.rec.b.f = 2
+        self.rec.c.x = 4
+        del self.rec.b
+        self.assertEqual(self.rec.export_delta(), [
+            (DELTA_SET, ('c', 'x'), 4),
+            (DELTA_DELETE, ('b',), None),
+        ])
+        self.rec.b = dict(f=0)
+        self.rec.b.f = 1
+        self.assertEqual(self.rec.export_delta(), [
+            (DELTA_SET, ('c', 'x'), 4),
+            (DELTA_SET, ('b',), dict(f=1)),
+        ])
+        self.assertDeltaReproduces()
+
+
+    def test_pickle_copy(self):
+        self.rec.a = 2
+        for actual in (pickle.loads(pickle.dumps(self.rec)), deepcopy(self.rec)):
+            self.assertEqual(actual, self.rec)
+            self.assertEqual(actual.export_delta(), [])
+            actual.b.f = 0
+            self.assertEqual(actual.export_delta(), [(DELTA_SET, ('b', 'f'), 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
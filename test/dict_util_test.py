@@ -1,3 +1,4 @@
+import sys
 import unittest
 from copy import deepcopy
 
@@ -44,6 +45,32 @@ class dict_util_Test(unittest.TestCase):
         dict_update_recursive(dict0, dict1)
         self.assertEqual(dict0, expected)
 
+    def test_dict_update_recursive_copy(self):
+        dict0 = dict(a=1, b=dict(f=1, g=2), c=dict(h=dict(i=1)))
+        original = deepcopy(dict0)
+        dict1 = dict(b=dict(g=5, h=dict(j=1)), d=4)
+        actual = dict_update_recursive(dict0, dict1, in_place=False)
+        self.assertEqual(dict0, original)
+        self.assertEqual(actual, dict(a=1, b=dict(f=1, g=5, h=dict(j=1)), c=dict(h=dict(i=1)), d=4))
+        self.assertIsNot(actual['b'], dict0['b'])
+        self.assertIs(actual['c'], dict0['c'])
+        self.assertIs(actual['b']['h'], dict1['b']['h'])
+        self.assertIs(dict_update_recursive(dict0, dict1), dict0)
+        self.assertEqual(dict0, actual)
+
+
+    def test_dict_update_recursive_deep(self):
+        depth = 5 * sys.getrecursionlimit()
+        target, source = {}, {}
+        cur_target, cur_source = target, source
+        for _ in range(depth):
+            cur_target = cur_target.setdefault('a', {'t': 1})
+            cur_source = cur_source.setdefault('a', {})
+        cur_source['s'] = 2
+        dict_update_recursive(target, source)
+        self.assertEqual(cur_target, {'t': 1, 's': 2})
+
+
     _dict0 = dict(
             a   = 1,
             b   = dict(f=1, g=2),
@@ -57,6 +84,8 @@ class dict_util_Test(unittest.TestCase):
         (_dict0x1, 'b.x',   None,       _dict0),
         (_dict0x1, 'b.z',   None,       None),
         (_dict0x1, 'b.z',   _NOTHING,   None),
+        (_dict0x1, 'a.z',   'dflt',     'dflt'),
+        (_dict0x1, 'b.g.z', None,       None),
     ])
     def test_dict_get_nested(self, dct0, keys, default, expected, delim='.'):
         if isinstance(keys, str):
@@ -66,6 +95,8 @@ class dict_util_Test(unittest.TestCase):
         else:
             actual = dict_get_nested(dct0, keys, default)
         self.assertEqual(actual, expected)
+        compiled = compile_path(keys)
+        self.assertEqual(compiled.get(dct0) if default is _NOTHING else compiled.get(dct0, default), expected)
 
 
     _dict1x0 = deepcopy(_dict0)
@@ -86,8 +117,13 @@ class dict_util_Test(unittest.TestCase):
         if isinstance(keys, str):
             keys = keys.split(delim)
         actual = deepcopy(dct0)
+        keys_copy = list(keys)
         dict_set_nested(actual, keys, val, extend=extend)
         self.assertEqual(actual, expected)
+        self.assertEqual(keys, keys_copy)
+        actual = deepcopy(dct0)
+        compile_path(keys).set(actual, val, extend=extend)
+        self.assertEqual(actual, expected)
 
 
     @parameterized.expand([
@@ -100,6 +136,343 @@ class dict_util_Test(unittest.TestCase):
         actual['b']['g'] = 13
         with self.assertRaises(KeyError):
             dict_set_nested(actual, keys, 1234, extend=extend)
+        with self.assertRaises(KeyError):
+            compile_path(keys).set(actual, 1234, extend=extend)
+
+
+    def test_dict_delete_nested(self):
+        actual = deepcopy(self._dict0x1)
+        dict_delete_nested(actual, ['b', 'x', 'b'])
+        expected = deepcopy(self._dict0x1)
+        del expected['b']['x']['b']
+        self.assertEqual(actual, expected)
+        with self.assertRaises(KeyError):
+            dict_delete_nested(actual, ['b', 'x', 'b'])
+        with self.assertRaises(KeyError):
+            dict_delete_nested(actual, ['a', 'x'])
+
+
+    def test_compile_path(self):
+        compiled = compile_path('b.x.b')
+        self.assertIs(compile_path(('b', 'x', 'b')), compiled)
+        self.assertEqual(compiled.keys, ('b', 'x', 'b'))
+        actual = deepcopy(self._dict0x1)
+        self.assertEqual(compiled.get(actual), actual['b']['x']['b'])
+        compiled.delete(actual)
+        self.assertNotIn('b', actual['b']['x'])
+        with self.assertRaises(KeyError):
+            compiled.delete(actual)
+        with self.assertRaises(KeyError):
+            compile_path('a.x').delete(actual)
+        with self.assertRaises(KeyError):
+            compile_path([])
+        compile_path([1, 2]).set(actual, 3)
+        self.assertEqual(actual[1], {2: 3})
+
+
+    def test_dict_project(self):
+        records = [deepcopy(self._dict0x1), deepcopy(self._dict0), {'b': 5}, {}]
+        paths = ['a', 'b.g', ('b', 'x', 'b', 'f'), 'b', 'z.y']
+        columns = dict_project(records, paths, defaults=[0, 0, 0, None, 'd'])
+        self.assertEqual(columns, [
+            [1, 1, 0, 0],
+            [2, 2, 0, 0],
+            [1, 0, 0, 0],
+            [records[0]['b'], records[1]['b'], 5, None],
+            ['d', 'd', 'd', 'd'],
+        ])
+        self.assertEqual(dict_project(iter(records), ['b.g'])[0], [2, 2, None, None])
+        with self.assertRaises(ValueError):
+            dict_project(records, ['a'], defaults=[0, 1])
+
+
+    def test_dict_project_dtypes(self):
+        try:
+            import numpy
+        except ImportError:     # pragma: no cover
+            self.skipTest('numpy not installed')
+        ids, names = dict_project([dict(id=1, name='x'), dict(name='y')], ['id', 'name'],
+                                  defaults=[-1, None], dtypes=[numpy.int64, None])
+        self.assertEqual(ids.dtype, numpy.int64)
+        self.assertEqual(ids.tolist(), [1, -1])
+        self.assertEqual(names, ['x', 'y'])
+
+
+    def test_dict_diff(self):
+        source = dict(a=1, b=dict(f=1, g=dict(h=1)), c=dict(x=1), e=1)
+        target = dict_update_recursive(source, dict(b=dict(g=dict(i=2)), d=4, e=True), in_place=False)
+        del target['a']
+        self.assertEqual(dict_diff(source, target), [
+            (DELTA_DELETE, ('a',), None),
+            (DELTA_SET, ('e',), True),
+            (DELTA_SET, ('d',), 4),
+            (DELTA_SET, ('b', 'g', 'i'), 2),
+        ])
+        self.assertEqual(dict_diff(source, deepcopy(source)), [])
+        actual = deepcopy(source)
+        dict_patch(actual, dict_diff(source, target))
+        self.assertEqual(actual, target)
+
+
+    def test_dict_patch_inverse(self):
+        original = deepcopy(self._dict0x1)
+        actual = deepcopy(original)
+        inverse = dict_patch(actual, [
+            (DELTA_SET, ('b', 'x', 'b', 'g'), 5),
+            (DELTA_SET, ('n', 'm'), 1),
+            (DELTA_SET, ('n', 'o'), 2),
+            (DELTA_DELETE, ('a',), None),
+            (DELTA_DELETE, ('bogus',), None),
+        ], inverse=True)
+        self.assertEqual(actual['b']['x']['b']['g'], 5)
+        self.assertEqual(inverse, [
+            (DELTA_SET, ('a',), 1),
+            (DELTA_DELETE, ('n', 'o'), None),
+            (DELTA_DELETE, ('n',), None),
+            (DELTA_SET, ('b', 'x', 'b', 'g'), 2),
+        ])
+        self.assertIsNone(dict_patch(actual, inverse))
+        self.assertEqual(actual, original)
+        # Deletes of empty paths are ignored, and have no inverse
+        self.assertEqual(dict_patch(actual, [(DELTA_DELETE, (), None)], inverse=True), [])
+        self.assertEqual(dict_patch(actual, [(DELTA_SET, ('a',), 2), (DELTA_DELETE, (), None)], inverse=True),
+                         [(DELTA_SET, ('a',), 1)])
+
+
+    def test_dict_fingerprint(self):
+        value = dict(a=1, b=dict(f=1.5, g=[1, 'x', None, dict(h=True)]), c=(1, 2), d={3, 4}, e=b'z')
+        reordered = dict(reversed(list(deepcopy(value).items())))
+        self.assertEqual(dict_fingerprint(value), dict_fingerprint(reordered))
+        self.assertEqual(len(dict_fingerprint(value)), 16)
+        for other in [dict(value, a=True), dict(value, a=1.0), dict(value, a='1'), dict(value, c=[1, 2]),
+                      dict(value, b=dict(f=1.5, g=[1, 'x', None, dict(h=1)])), dict(value, f=None)]:
+            self.assertNotEqual(dict_fingerprint(other), dict_fingerprint(value))
+        with self.assertRaises(TypeError):
+            dict_fingerprint(dict(a=object()))
+
+
+    def test_fingerprint_cache(self):
+        from spinward.core.DictRecord import DictRecord
+        cache = FingerprintCache()
+        value = DictRecord.from_dict(dict(a=1, b=dict(c=dict(d=1), e=2), f=dict(g=3)))
+        fingerprint = dict_fingerprint(value, cache)
+        self.assertEqual(fingerprint, dict_fingerprint(value))
+        self.assertEqual(len(cache), 4)
+
+        value.b.c.set_nested(['d'], 2)
+        self.assertEqual(len(cache), 1)     # only f is still memoized
+        self.assertNotEqual(dict_fingerprint(value, cache), fingerprint)
+        self.assertEqual(dict_fingerprint(value, cache), dict_fingerprint(deepcopy(value)))
+
+        for change in [lambda: dict_set_nested(value, ['f', 'x', 'y'], 1),
+                       lambda: compile_path('b.e').set(value, 5),
+                       lambda: dict_delete_nested(value, ['b', 'c', 'd']),
+                       lambda: dict_update_recursive(value, dict(f=dict(g=4))),
+                       lambda: dict_patch(value, [(DELTA_SET, ('b', 'c'), 1)]),
+                       lambda: setattr(value.b, 'e', 6)]:
+            change()
+            self.assertEqual(dict_fingerprint(value, cache), dict_fingerprint(deepcopy(value)))
+
+        value['f']['g'] = 7
+        fingerprint_invalidate(value['f'])
+        self.assertEqual(dict_fingerprint(value, cache), dict_fingerprint(deepcopy(value)))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+    def test_fingerprint_cache_dict_record_items(self):
+        from spinward.core.DictRecord import DictRecord
+        cache = FingerprintCache()
+        value = DictRecord.from_dict(dict(a=dict(b=1, c=2), d=dict(e=3)))
+        fingerprint = dict_fingerprint(value, cache)
+        # Item-level dict methods do not invalidate; the changed dict is invalidated explicitly.
+        self.assertIs(DictRecord.__setitem__, dict.__setitem__)
+        value.a['b'] = 2
+        self.assertEqual(dict_fingerprint(value, cache), fingerprint)
+        cache.invalidate(value.a)
+        self.assertEqual(dict_fingerprint(value, cache), dict_fingerprint(deepcopy(value)))
+
+
+    def test_dict_flatten(self):
+        records = [deepcopy(self._dict0x1), dict(a=dict(), b={1: 2}), {}]
+        rows = dict_flatten(iter(records))
+        self.assertEqual(next(rows), {'a': 1, 'b.f': 1, 'b.g': 2, 'b.x.a': 1, 'b.x.b.f': 1, 'b.x.b.g': 2,
+                                      'b.x.c': 3, 'c': 3})
+        self.assertEqual(list(rows), [{'a': {}, 'b.1': 2}, {}])
+        self.assertEqual(list(dict_flatten([dict(a=dict(b=1))], delimiter='/')), [{'a/b': 1}])
+        self.assertEqual(list(dict_flatten([{1: 'a'}, {True: 'b'}, {1.0: 'c'}])), [{'1': 'a'}, {'True': 'b'}, {'1.0': 'c'}])
+
+
+    @parameterized.expand([
+        ({'a.b': 1, 'a': {'b': 2}},),
+        ({'a': {'b': 2}, 'a.b': 1},),
+        ({1: 'a', '1': 'b'},),
+    ])
+    def test_dict_flatten_conflict_raise(self, record):
+        with self.assertRaises(KeyError):
+            list(dict_flatten([record]))
+
+
+    def test_dict_unflatten(self):
+        records = [deepcopy(self._dict0x1), dict(a=dict(), b={'1': 2}), {}]
+        self.assertEqual(list(dict_unflatten(dict_flatten(records))), records)
+        from spinward.core.DictRecord import DictRecord
+        rec = next(dict_unflatten([{'a.b': 1, 'a.c.d': 2}], record_class=DictRecord))
+        self.assertEqual(rec.a.c.d, 2)
+        self.assertIsInstance(rec.a, DictRecord)
+
+
+    @parameterized.expand([
+        ({'a': 1, 'a.b': 2},),
+        ({'a.b': 2, 'a': 1},),
+        ({'a.b': 2, 'a.b.c': 1},),
+    ])
+    def test_dict_unflatten_conflict_raise(self, row):
+        with self.assertRaises(KeyError):
+            list(dict_unflatten([row]))
+
+
+    _payload = dict(
+        id=0,
+        orders=[dict(id=1, items=[dict(sku='a', id=11), dict(sku='b')]), dict(id=2, items=[dict(sku='c')])],
+        meta=dict(x_id=5, y_id=6, y=dict(id=7)),
+    )
+
+    @parameterized.expand([
+        ('orders.*.items.*.sku',    [(('orders', 0, 'items', 0, 'sku'), 'a'), (('orders', 0, 'items', 1, 'sku'), 'b'),
+                                     (('orders', 1, 'items', 0, 'sku'), 'c')]),
+        ('**.id',                   [(('id',), 0), (('orders', 0, 'id'), 1), (('orders', 0, 'items', 0, 'id'), 11),
+                                     (('orders', 1, 'id'), 2), (('meta', 'y', 'id'), 7)]),
+        ('orders.1.id',             [(('orders', 1, 'id'), 2)]),
+        ('meta.*_id',               [(('meta', 'x_id'), 5), (('meta', 'y_id'), 6)]),
+        ('meta.y.**',               [(('meta', 'y'), dict(id=7)), (('meta', 'y', 'id'), 7)]),
+        ('bogus.*',                 []),
+        (('meta', 'y', 'id'),       [(('meta', 'y', 'id'), 7)]),
+    ])
+    def test_compile_pattern(self, pattern, expected):
+        self.assertEqual(sorted(compile_pattern(pattern).match(self._payload), key=repr), sorted(expected, key=repr))
+        self.assertEqual(sorted(compile_pattern(pattern).values(self._payload), key=repr),
+                         sorted((value for _, value in expected), key=repr))
+
+
+    def test_compile_pattern_prunes(self):
+        visited = []
+
+        class Recording(dict):
+            def items(self):
+                visited.append(self)
+                return super(Recording, self).items()
+
+        target = dict(a=Recording(x=1), b=dict(c=Recording(y=2)))
+        self.assertEqual(compile_pattern('b.*.y').values(target), [2])
+        self.assertEqual(visited, [])       # literal keys are looked up, not searched for
+        self.assertEqual(compile_pattern('b.**.y').values(target), [2])
+        self.assertEqual(visited, [target['b']['c']])
+        self.assertIs(compile_pattern('b.*.y'), compile_pattern('b.*.y'))
+
+
+    def test_dict_set_many(self):
+        actual = deepcopy(self._dict0)
+        dict_set_many(actual, {'b.x.y': 1, 'b.x.z': 2, ('b', 'g'): 3, 'c': dict(d=4), 'e.f': 5})
+        self.assertEqual(actual, dict(a=1, b=dict(f=1, g=3, x=dict(y=1, z=2)), c=dict(d=4), e=dict(f=5)))
+        dict_set_many(actual, [(('b', 'x', 'y'), 6), ('b.f', 7)], extend=False)
+        self.assertEqual(actual['b'], dict(f=7, g=3, x=dict(y=6, z=2)))
+
+
+    def test_dict_set_many_read_only(self):
+        from spinward.core.DictRecord import DictRecordRO
+        actual = DictRecordRO(a=1)
+        for values in [{'a': 2}, {'b': 3}, {'c.d': 4}]:
+            with self.assertRaises(KeyError):
+                dict_set_many(actual, values)
+        self.assertEqual(actual, dict(a=1))
+
+
+    @parameterized.expand([
+        ({'b.x': 1, 'b.x.y': 2}, True),
+        ({'b.x.y': 2, 'b.x': 1}, True),
+        ([('b.x', 1), (('b', 'x'), 2)], True),
+        ({'b.z': 1, 'a.x': 2}, True),
+        ({'b.z': 1, 'n.x': 2}, False),
+    ])
+    def test_dict_set_many_keyerror(self, values, extend):
+        actual = deepcopy(self._dict0)
+        with self.assertRaises(KeyError):
+            dict_set_many(actual, values, extend=extend)
+        self.assertEqual(actual, self._dict0)
+
+
+    def _merged(self, layers):
+        expected = {}
+        for layer in deepcopy(layers):
+            dict_update_recursive(expected, layer)
+        return expected
+
+
+    def test_layered_dict(self):
+        layers = [
+            dict(a=1, b=dict(f=1, g=dict(h=1)), c=dict(x=1)),
+            dict(b=dict(g=dict(i=2)), c=3, d=dict(y=2)),
+            dict(b=dict(f=3), c=dict(z=3)),
+        ]
+        view = LayeredDict(layers)
+        self.assertEqual(view.as_dict(), self._merged(layers))
+        self.assertEqual(view, self._merged(layers))
+        self.assertEqual(list(view), ['a', 'b', 'c', 'd'])
+        self.assertIsInstance(view['b'], LayeredDict)
+        self.assertIs(view['b'], view['b'])
+        self.assertEqual(view['b']['g'], dict(h=1, i=2))
+        self.assertEqual(view['c'], dict(z=3))
+        self.assertNotIn('bogus', view)
+        with self.assertRaises(KeyError):
+            view['bogus']       # pylint: disable=pointless-statement
+
+
+    def test_layered_dict_invalidate(self):
+        layers = [dict(a=1, b=dict(f=1), d=dict(y=1)), dict(b=2, c=dict(x=1)), dict(b=dict(g=3))]
+        view = LayeredDict(layers)
+        self.assertEqual(view['b'], dict(g=3))
+        cached_d = view['d']
+
+        del layers[1]['b']
+        view.invalidate(1)
+        self.assertEqual(view['b'], dict(f=1, g=3))
+        self.assertIs(view['d'], cached_d)
+        cached_c = view['c']
+
+        view.set_layer(0, dict(a=5, e=6))
+        self.assertEqual(view.as_dict(), self._merged(view.layers))
+        self.assertIs(view['c'], cached_c)
+
+        self.assertEqual(view.add_layer(dict(c=dict(y=2))), 3)
+        self.assertEqual(view['c'], dict(x=1, y=2))
+        self.assertEqual(view.as_dict(), self._merged(view.layers))
+
+
+    def test_layered_dict_negative_index(self):
+        view = LayeredDict([dict(x=1), dict(x=2)])
+        self.assertEqual(view['x'], 2)
+        view.set_layer(-1, {})
+        self.assertEqual(view['x'], 1)
+        view.layers[0]['x'] = 3
+        view.invalidate(-2)
+        self.assertEqual(view['x'], 3)
+        with self.assertRaises(IndexError):
+            view.set_layer(2, {})
+        with self.assertRaises(IndexError):
+            view.invalidate(-3)
+
+
+    def test_dict_patch(self):
+        actual = deepcopy(self._dict0)
+        dict_patch(actual, [
+            (DELTA_SET, ('b', 'x', 'y'), 5),
+            (DELTA_DELETE, ('a',), None),
+            (DELTA_DELETE, ('bogus', 'path'), None),
+        ])
+        self.assertEqual(actual, dict(b=dict(f=1, g=2, x=dict(y=5)), c=3))
+        with self.assertRaises(ValueError):
+            dict_patch(actual, [('bogus', ('a',), None)])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,81 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from parameterized import parameterized
+
+from spinward.core.DictRecord import DictRecord, DictRecordRO
+from spinward.core.DictRecordBatch import DictRecordBatch
+from spinward.core.record_loader import load_csv, load_jsonl
+
+
+class record_loader_Test(unittest.TestCase):
+
+    _dicts = [dict(id=idx, name='n%d' % idx, addr=dict(zip='%05d' % idx)) for idx in range(25)]
+    _jsonl = ''.join(json.dumps(dct) + '\n' for dct in _dicts) + '\n'
+    _csv = 'id,name,qty\n' + ''.join('%d,"n,%d",%d\n' % (idx, idx, idx * 2) for idx in range(25))
+
+
+    @parameterized.expand([
+        (0,),
+        (2,),
+    ])
+    def test_load_jsonl(self, workers):
+        actual = list(load_jsonl(io.StringIO(self._jsonl), workers=workers, chunk_size=4))
+        self.assertEqual(actual, self._dicts)
+        self.assertTrue(isinstance(actual[0], DictRecord))
+        self.assertTrue(isinstance(actual[0].addr, DictRecord))
+
+
+    def test_load_jsonl_path_record_class(self):
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(fd, 'w') as out:
+            out.write(self._jsonl)
+        try:
+            actual = list(load_jsonl(path, record_class=DictRecordRO))
+        finally:
+            os.remove(path)
+        self.assertEqual(actual, self._dicts)
+        self.assertTrue(isinstance(actual[3].addr, DictRecordRO))
+
+
+    def test_load_jsonl_schema(self):
+        actual = list(load_jsonl(io.StringIO(self._jsonl), schema={('addr', 'zip'): int, 'name': str.upper}))
+        self.assertEqual(actual[7].addr.zip, 7)
+        self.assertEqual(actual[7].name, 'N7')
+
+
+    def test_load_jsonl_not_object_raise(self):
+        with self.assertRaises(ValueError):
+            list(load_jsonl(io.StringIO('[1, 2]\n')))
+
+
+    @parameterized.expand([
+        (0,),
+        (2,),
+    ])
+    def test_load_csv(self, workers):
+        actual = list(load_csv(io.StringIO(self._csv), schema={'id': int, 'qty': int},
+                               workers=workers, chunk_size=3))
+        self.assertEqual(len(actual), 25)
+        self.assertEqual(actual[5], dict(id=5, name='n,5', qty=10))
+
+
+    def test_load_csv_fieldnames_missing_fields(self):
+        actual = list(load_csv(io.StringIO('1,2\n3\n'), fieldnames=['a', 'b'], record_class=dict))
+        self.assertEqual(actual, [dict(a='1', b='2'), dict(a='3', b=None)])
+
+
+    def test_batches(self):
+        actual = list(load_jsonl(io.StringIO(self._jsonl), batch_size=10, chunk_size=4))
+        self.assertEqual([len(batch) for batch in actual], [10, 10, 5])
+        self.assertEqual(sum(actual, []), self._dicts)
+        actual = list(load_csv(io.StringIO(self._csv), batch_size=10, batch_factory=DictRecordBatch.from_records))
+        self.assertTrue(isinstance(actual[0], DictRecordBatch))
+        self.assertEqual(actual[2][4].id, '24')
+
+
+if __name__ == '__main__':
+    unittest.main()
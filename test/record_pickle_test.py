@@ -0,0 +1,40 @@
+import pickle
+import unittest
+
+from spinward.core.DictRecord import DictRecord, DictRecordRO
+from spinward.core.record_pickle import dumps_records, loads_records, pack_records, unpack_records
+
+
+class record_pickle_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [DictRecord(id=idx, name='n%d' % idx, sub=DictRecord(x=idx)) for idx in range(10)]
+        self.records.append(DictRecordRO(id=10, other=True))
+        self.records.append(dict(plain=1))
+
+
+    def test_roundtrip(self):
+        actual = loads_records(dumps_records(self.records))
+        self.assertEqual(actual, self.records)
+        self.assertEqual([type(rec) for rec in actual], [type(rec) for rec in self.records])
+        self.assertTrue(isinstance(actual[0].sub, DictRecord))
+
+
+    def test_shared_key_table(self):
+        packed = pack_records(self.records)
+        shapes = packed[1]
+        self.assertEqual(len(shapes), 3)
+        self.assertEqual(unpack_records(packed), self.records)
+
+
+    def test_smaller_than_plain_pickle(self):
+        records = [DictRecord(id=idx, name='n%d' % idx, value=idx * 0.5) for idx in range(1000)]
+        self.assertLess(len(dumps_records(records)), len(pickle.dumps(records, pickle.HIGHEST_PROTOCOL)))
+
+
+    def test_empty(self):
+        self.assertEqual(loads_records(dumps_records([])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()